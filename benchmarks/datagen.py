@@ -0,0 +1,107 @@
+"""Deterministic synthetic POI configs for the benchmarks.
+
+The same (size, layout, seed) always produces the same file. POIs are
+uniform over the map or clustered around a few hot spots; visitor activity
+and POI popularity both follow a Zipf-like skew. Large configs are written
+as JSON Lines one record at a time, so 10M-row files need no extra memory.
+"""
+import datetime
+import json
+import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Iterator, List, Tuple
+
+TYPES = {
+    "park": ["has_playground", "area"],
+    "museum": ["opening_hours", "ticket"],
+    "cafe": ["seats"],
+    "beach": ["blue_flag", "length"],
+    "monument": ["year"],
+}
+LAYOUTS = ("uniform", "clustered")
+CLUSTERS = 24
+CLUSTER_SPREAD = 30.0
+FIRST_DAY = datetime.date(2023, 1, 1).toordinal()
+DAYS = 730
+
+def split(size: int) -> Tuple[int, int, int]:
+    """Rows of a config of `size` rows as (POIs, visitors, visits)."""
+    pois = max(2, size // 10)
+    visitors = max(1, size // 20)
+    return pois, visitors, max(0, size - pois - visitors)
+
+def _attributes(rnd: random.Random, type_name: str) -> Dict[str, object]:
+    values = {
+        "has_playground": rnd.random() < 0.4, "area": rnd.randint(1, 500),
+        "opening_hours": rnd.choice(["9-17", "10-18", "8-20"]), "ticket": round(rnd.uniform(0, 30), 2),
+        "seats": rnd.randint(4, 120), "blue_flag": rnd.random() < 0.3, "length": rnd.randint(50, 5000),
+        "year": rnd.randint(1200, 2020),
+    }
+    return {a: values[a] for a in TYPES[type_name]}
+
+def poi_records(n: int, layout: str = "uniform", seed: int = 1) -> Iterator[dict]:
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}")
+    rnd = random.Random(seed)
+    centers = [(rnd.uniform(50, 950), rnd.uniform(50, 950)) for _ in range(CLUSTERS)]
+    names = list(TYPES)
+    for pid in range(1, n + 1):
+        if layout == "uniform":
+            x, y = rnd.randrange(1000), rnd.randrange(1000)
+        else:
+            cx, cy = centers[rnd.randrange(CLUSTERS)]
+            x = min(999, max(0, round(rnd.gauss(cx, CLUSTER_SPREAD))))
+            y = min(999, max(0, round(rnd.gauss(cy, CLUSTER_SPREAD))))
+        t = names[rnd.randrange(len(names))]
+        yield {"id": pid, "name": f"{t}-{pid}", "type": t, "x": x, "y": y, "attributes": _attributes(rnd, t)}
+
+def visitor_records(n: int, seed: int = 1) -> Iterator[dict]:
+    rnd = random.Random(seed + 1)
+    for vid in range(1, n + 1):
+        yield {"id": vid, "name": f"visitor-{vid}", "nationality": rnd.choice(["AE", "DE", "FR", "IN", "JP", "US"])}
+
+def _zipf(n: int, skew: float) -> List[float]:
+    return list(accumulate(1.0 / (i + 1) ** skew for i in range(n)))
+
+def visit_records(n: int, n_visitors: int, n_pois: int, skew: float = 1.1, seed: int = 1) -> Iterator[dict]:
+    rnd = random.Random(seed + 2)
+    # rank -> id shuffles keep the busiest visitors and POIs spread over the id range
+    visitors = list(range(1, n_visitors + 1))
+    pois = list(range(1, n_pois + 1))
+    rnd.shuffle(visitors)
+    rnd.shuffle(pois)
+    v_cum, p_cum = _zipf(n_visitors, skew), _zipf(n_pois, skew)
+    for _ in range(n):
+        vid = visitors[min(n_visitors - 1, bisect_left(v_cum, rnd.random() * v_cum[-1]))]
+        pid = pois[min(n_pois - 1, bisect_left(p_cum, rnd.random() * p_cum[-1]))]
+        day = datetime.date.fromordinal(FIRST_DAY + rnd.randrange(DAYS))
+        rec = {"visitor_id": vid, "poi_id": pid, "date": day.strftime("%d/%m/%Y")}
+        if rnd.random() < 0.7:
+            rec["rating"] = rnd.randint(1, 10)
+        yield rec
+
+def records(size: int, layout: str = "uniform", skew: float = 1.1, seed: int = 1) -> Iterator[Tuple[str, dict]]:
+    """(section, record) pairs of a config of `size` rows, in load order."""
+    n_pois, n_visitors, n_visits = split(size)
+    for name, attrs in TYPES.items():
+        yield "poi_types", {"name": name, "attributes": attrs}
+    for rec in poi_records(n_pois, layout, seed):
+        yield "pois", rec
+    for rec in visitor_records(n_visitors, seed):
+        yield "visitors", rec
+    for rec in visit_records(n_visits, n_visitors, n_pois, skew, seed):
+        yield "visits", rec
+
+def write_config(path: str, size: int, layout: str = "uniform", skew: float = 1.1, seed: int = 1):
+    """Write a config of `size` rows; `.jsonl` paths are streamed, anything else is one JSON document."""
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for section, rec in records(size, layout, skew, seed):
+                f.write(json.dumps({section: rec}, separators=(",", ":")))
+                f.write("\n")
+        else:
+            data = {"poi_types": [], "pois": [], "visitors": [], "visits": []}
+            for section, rec in records(size, layout, skew, seed):
+                data[section].append(rec)
+            json.dump(data, f, separators=(",", ":"))
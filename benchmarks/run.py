@@ -0,0 +1,193 @@
+"""Benchmark runner for POIRegistry.
+
+    python -m benchmarks.run --sizes 1000,100000 --layout clustered --out bench.json
+    python -m benchmarks.run --sizes 1000,100000 --compare bench.json
+
+For every size a config is generated (see datagen.py), loaded, and each
+query and mutation is timed call by call. Results hold throughput,
+latency percentiles and the tracemalloc peak of a separate pass, and are
+saved as JSON; --compare reports the p50 ratio against an earlier file and
+exits with status 1 when something got slower than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from poi_system import POIRegistry, load_config
+from poi_system.attr_index import Between
+
+from . import datagen
+
+# (name, builder); a builder returns the calls to time, prepared up front
+Benchmark = Tuple[str, Callable[[], List[Callable[[], object]]]]
+
+def _centers(rnd: random.Random, n: int) -> List[Tuple[int, int]]:
+    return [(rnd.randrange(1000), rnd.randrange(1000)) for _ in range(n)]
+
+def _queries(r: POIRegistry, rnd: random.Random, n: int) -> List[Benchmark]:
+    types = list(datagen.TYPES)
+    vids = list(r.visitors)
+    batch = _centers(rnd, n)
+    return [
+        ("closest_pair", lambda: [r.closest_pair] * max(1, n // 50)),
+        ("closest_pair_by_type", lambda: [lambda t=t: r.closest_pair(t) for t in types]),
+        ("count_pois_per_type", lambda: [r.count_pois_per_type] * n),
+        ("list_pois_by_type", lambda: [lambda t=t: r.list_pois_by_type(t) for t in types]),
+        ("pois_within_radius", lambda: [lambda c=c: r.pois_within_radius(c, 25) for c in _centers(rnd, n)]),
+        ("k_closest", lambda: [lambda c=c: r.k_closest(c, 10) for c in _centers(rnd, n)]),
+        ("at_exact_radius", lambda: [lambda c=c: r.at_exact_radius(c, 30) for c in _centers(rnd, n)]),
+        ("batch_within_radius", lambda: [lambda: r.batch_within_radius(batch, 25)]),
+        ("batch_k_closest", lambda: [lambda: r.batch_k_closest(batch, 10)]),
+        ("query_pois", lambda: [lambda c=c: r.query_pois(c, r=50, type_name="park", where={"has_playground": True, "area": Between(100, None)})
+                                for c in _centers(rnd, n)]),
+        ("visits_for_visitor", lambda: [lambda v=v: r.visits_for_visitor(v) for v in rnd.sample(vids, min(n, len(vids)))]),
+        ("number_of_visitors_per_poi", lambda: [r.number_of_visitors_per_poi] * max(1, n // 50)),
+        ("number_of_pois_per_visitor", lambda: [r.number_of_pois_per_visitor] * max(1, n // 50)),
+        ("visitors_per_poi_in_march", lambda: [lambda: r.number_of_visitors_per_poi("01/03/2024", "31/03/2024")] * max(1, n // 50)),
+        ("top_k_visitors_by_poi_count", lambda: [lambda: r.top_k_visitors_by_poi_count(10)] * n),
+        ("top_k_pois_by_visitor_count", lambda: [lambda: r.top_k_pois_by_visitor_count(10)] * n),
+        ("coverage_fairness", lambda: [lambda m=m: r.coverage_fairness(m, 2) for m in range(1, max(2, n // 50))]),
+    ]
+
+def _mutations(r: POIRegistry, rnd: random.Random, n: int) -> List[Benchmark]:
+    # net effect is nil except for the added visits: new POIs are deleted again
+    first = max(r.used_poi_ids, default=0) + 1
+    new_ids = list(range(first, first + n))
+    vids, pids = list(r.visitors), list(r.pois)
+    new_vids = range(max(vids, default=0) + 1, max(vids, default=0) + 1 + n)
+    types = list(datagen.TYPES)
+    return [
+        ("add_poi", lambda: [lambda i=i: r.add_poi(i, f"new-{i}", rnd.choice(types), rnd.randrange(1000), rnd.randrange(1000), {})
+                             for i in new_ids]),
+        ("delete_poi", lambda: [lambda i=i: r.delete_poi(i) for i in new_ids]),
+        ("add_visitor", lambda: [lambda i=i: r.add_visitor(i, f"new-{i}", "XX") for i in new_vids]),
+        # first visits move ids out of count 0, the largest leaderboard group
+        ("add_first_visit", lambda: [lambda v=v, p=p: r.add_visit(v, p, "15/06/2024", 5)
+                                     for v, p in zip(new_vids, rnd.choices(pids, k=n))]),
+        ("add_visit", lambda: [lambda v=v, p=p: r.add_visit(v, p, "15/06/2024", 5)
+                               for v, p in zip(rnd.choices(vids, k=n), rnd.choices(pids, k=n))]),
+        ("bulk_add_visits", lambda: [lambda: r.bulk_add_visits([(v, p, "16/06/2024", None)
+                                                                 for v, p in zip(rnd.choices(vids, k=n), rnd.choices(pids, k=n))])]),
+        ("rename_attribute", lambda: [lambda i=i: r.rename_attribute("cafe", "seats" if i % 2 == 0 else "chairs",
+                                                                       "chairs" if i % 2 == 0 else "seats") for i in range(10)]),
+        ("add_delete_attribute", lambda: [lambda: (r.add_attribute("beach", "tmp"), r.delete_attribute("beach", "tmp"))] * 10),
+    ]
+
+def _percentile(sorted_samples: List[float], q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+def _measure(name: str, calls: List[Callable[[], object]]) -> Dict[str, object]:
+    samples = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for call in calls:
+        t0 = clock()
+        call()
+        samples.append(clock() - t0)
+    total = (clock() - start) / 1e9
+    samples.sort()
+    return {
+        "name": name, "ops": len(calls), "total_s": round(total, 6),
+        "throughput_ops_s": round(len(calls) / total, 2) if total else None,
+        "p50_us": _percentile(samples, 0.50) / 1e3, "p95_us": _percentile(samples, 0.95) / 1e3,
+        "p99_us": _percentile(samples, 0.99) / 1e3, "max_us": samples[-1] / 1e3 if samples else 0.0,
+    }
+
+def _peak(calls: List[Callable[[], object]]) -> int:
+    # separate pass: tracemalloc slows everything down, so it never overlaps timing
+    tracemalloc.start()
+    try:
+        for call in calls:
+            call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run(sizes: List[int], layout: str, seed: int, ops: int, memory: bool, only: str, data_dir: str) -> List[dict]:
+    results = []
+    for size in sizes:
+        path = os.path.join(data_dir, f"poi-{layout}-{size}-{seed}.jsonl")
+        if not os.path.exists(path):
+            datagen.write_config(path, size, layout, seed=seed)
+
+        def tagged(res):
+            res.update(size=size, layout=layout)
+            results.append(res)
+            print(f"{size:>10} {res['name']:<30} p50 {res['p50_us']:>12.1f}us  p99 {res['p99_us']:>12.1f}us"
+                  + (f"  peak {res['peak_bytes'] / 1e6:.1f}MB" if "peak_bytes" in res else ""), flush=True)
+
+        registry = POIRegistry()
+        res = _measure("load_config", [lambda: load_config(path, registry)])
+        res["rows_s"] = round(size / res["total_s"], 1) if res["total_s"] else None
+        if memory:
+            res["peak_bytes"] = _peak([lambda: load_config(path, POIRegistry())])
+        tagged(res)
+        registry.create_attribute_index("park", "has_playground")
+
+        rnd = random.Random(seed)
+        for group in (_queries, _mutations):
+            for name, build in group(registry, rnd, ops):
+                if only and only not in name:
+                    continue
+                calls = build()
+                res = _measure(name, calls)
+                if memory and group is _queries:
+                    res["peak_bytes"] = _peak(calls[:20])
+                tagged(res)
+    return results
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> bool:
+    """Print p50 ratios against a saved run; returns True if nothing regressed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["name"], r["size"], r["layout"]): r for r in json.load(f)["results"]}
+    ok = True
+    for res in results:
+        old = base.get((res["name"], res["size"], res["layout"]))
+        if old is None or not old["p50_us"]:
+            continue
+        ratio = res["p50_us"] / old["p50_us"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        ok = ok and not flag
+        print(f"{res['size']:>10} {res['name']:<30} {old['p50_us']:>12.1f}us -> {res['p50_us']:>12.1f}us  x{ratio:.2f} {flag}")
+    return ok
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark POIRegistry operations on synthetic data")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated config sizes in rows")
+    parser.add_argument("--layout", choices=datagen.LAYOUTS, default="uniform")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ops", type=int, default=200, help="calls per query/mutation benchmark")
+    parser.add_argument("--only", default="", help="run only benchmarks whose name contains this")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--data-dir", help="keep generated configs here (default: a temporary directory)")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p50 ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        results = run(sizes, args.layout, args.seed, args.ops, not args.no_memory, args.only, data_dir)
+
+    if args.out:
+        meta = {"python": sys.version.split()[0], "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=1)
+    if args.compare:
+        return 0 if compare(results, args.compare, args.threshold) else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
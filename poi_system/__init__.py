@@ -1,2 +1,5 @@
 from .storage import *
 from .config_loader import *
+from .parallel import ParallelExecutor
+from .concurrency import ConcurrentRegistry, AsyncRegistry
+from .sharding import ShardedRegistry
@@ -0,0 +1,94 @@
+from bisect import bisect_left, bisect_right, insort
+from math import inf
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .model import POI
+
+class Between(NamedTuple):
+    """Attribute predicate lo <= value <= hi on numeric values; None leaves an end open."""
+    lo: Optional[float] = None
+    hi: Optional[float] = None
+
+def _numeric(value) -> bool:
+    # bools are ints in Python but are not treated as numbers here; NaN never matches
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+def matches(value, predicate) -> bool:
+    """Whether an attribute value satisfies a `where` predicate (a value or Between)."""
+    if isinstance(predicate, Between):
+        return (_numeric(value) and (predicate.lo is None or value >= predicate.lo)
+                and (predicate.hi is None or value <= predicate.hi))
+    return value == predicate
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+class AttributeIndex:
+    """Secondary index on one attribute of the POIs of one type.
+
+    A hash index maps each (hashable) value to its POIs for equality, and
+    numeric values are also kept sorted as `(value, id, poi)` so Between
+    ranges are found by binary search. Missing attributes index as None.
+    """
+
+    def __init__(self, attr: str, pois: Iterable[POI] = ()):
+        self.attr = attr
+        self.by_value: Dict[object, Dict[int, POI]] = {}
+        self.ordered: List[Tuple[float, int, POI]] = []
+        self.extend(pois)
+
+    def extend(self, pois: Iterable[POI]):
+        """Add many POIs, sorting the numeric entries once."""
+        entries = []
+        for poi in pois:
+            value = poi.attributes.get(self.attr)
+            if _hashable(value):
+                self.by_value.setdefault(value, {})[poi.id] = poi
+            if _numeric(value):
+                entries.append((value, poi.id, poi))
+        if entries:
+            # the sorted prefix is one run for the merge sort
+            self.ordered.extend(entries)
+            self.ordered.sort()
+
+    def add(self, poi: POI):
+        value = poi.attributes.get(self.attr)
+        if _hashable(value):
+            self.by_value.setdefault(value, {})[poi.id] = poi
+        if _numeric(value):
+            insort(self.ordered, (value, poi.id, poi))
+
+    def remove(self, poi: POI):
+        value = poi.attributes.get(self.attr)
+        if _hashable(value):
+            bucket = self.by_value[value]
+            del bucket[poi.id]
+            if not bucket:
+                del self.by_value[value]
+        if _numeric(value):
+            del self.ordered[bisect_left(self.ordered, (value, poi.id))]
+
+    def supports(self, predicate) -> bool:
+        return isinstance(predicate, Between) or _hashable(predicate)
+
+    def _span(self, predicate: Between) -> Tuple[int, int]:
+        lo = 0 if predicate.lo is None else bisect_left(self.ordered, (predicate.lo,))
+        hi = len(self.ordered) if predicate.hi is None else bisect_right(self.ordered, (predicate.hi, inf))
+        return lo, max(lo, hi)
+
+    def count(self, predicate) -> int:
+        """Number of POIs `lookup(predicate)` returns, without building them."""
+        if isinstance(predicate, Between):
+            lo, hi = self._span(predicate)
+            return hi - lo
+        return len(self.by_value.get(predicate, ()))
+
+    def lookup(self, predicate) -> Iterable[POI]:
+        if isinstance(predicate, Between):
+            lo, hi = self._span(predicate)
+            return [poi for _, _, poi in self.ordered[lo:hi]]
+        return list(self.by_value.get(predicate, {}).values())
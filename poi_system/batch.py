@@ -0,0 +1,192 @@
+from math import hypot, isqrt
+from typing import List, Sequence, Tuple, Union
+
+from .spatial import CELL_SIZE
+from .utils import GRID_SIZE, fle, sq_bounds
+
+try:  # optional: without NumPy the batch calls loop over the scalar queries
+    import numpy as np
+except ImportError:
+    np = None
+
+# Most (query, candidate POI) pairs materialised at once; queries are
+# processed in groups that stay under it, which bounds memory
+BATCH_PAIRS = 1 << 21
+
+Row = Tuple[int, str, Tuple[int, int], str, float]
+
+def _ranges(starts, counts):
+    """Concatenation of range(s, s + c) for each pair, and the pair each item came from."""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts, counts) + np.arange(int(counts.sum())) - offsets[owner], owner
+
+class CoordinateColumns:
+    """POI coordinates as NumPy columns grouped by grid cell.
+
+    Candidate generation is a join between the queries and the cells their
+    disc overlaps: cell bounds come from `cell_start`, and `cell_sums` (a 2D
+    prefix sum of the cell counts) sizes any block of cells in O(1) so
+    batches can be split before anything is materialised.
+    """
+
+    def __init__(self, pois, cell_size: int = CELL_SIZE):
+        self.cell_size = cell_size
+        self.ncells = (GRID_SIZE + cell_size - 1) // cell_size
+        pois = list(pois)
+        xs = np.array([p.x for p in pois], dtype=np.int64)
+        ys = np.array([p.y for p in pois], dtype=np.int64)
+        cells = (xs // cell_size) * self.ncells + ys // cell_size
+        order = np.argsort(cells, kind="stable")
+        self.xs, self.ys = xs[order], ys[order]
+        self.ids = np.array([p.id for p in pois], dtype=np.int64)[order]
+        # result rows are these prefixes plus the distance
+        self.prefixes = [(p.id, p.name, (p.x, p.y), p.type_name) for p in (pois[i] for i in order.tolist())]
+        counts = np.bincount(cells, minlength=self.ncells * self.ncells)
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+        sums = np.zeros((self.ncells + 1, self.ncells + 1), dtype=np.int64)
+        sums[1:, 1:] = counts.reshape(self.ncells, self.ncells).cumsum(0).cumsum(1)
+        self.cell_sums = sums
+
+    def __len__(self):
+        return len(self.prefixes)
+
+    def blocks(self, x0, y0, reach):
+        """Clipped cell block [cx0, cx1] x [cy0, cy1] covering each query's square of half-side `reach`."""
+        n = self.ncells - 1
+        cs = self.cell_size
+        return (np.clip((x0 - reach) // cs, 0, n), np.clip((x0 + reach) // cs, 0, n),
+                np.clip((y0 - reach) // cs, 0, n), np.clip((y0 + reach) // cs, 0, n))
+
+    def block_count(self, cx0, cx1, cy0, cy1):
+        s = self.cell_sums
+        return s[cx1 + 1, cy1 + 1] - s[cx0, cy1 + 1] - s[cx1 + 1, cy0] + s[cx0, cy0]
+
+    def candidates(self, x0, y0, reach):
+        """(query, POI position, squared distance) for every POI in the cells around each query."""
+        cx0, cx1, cy0, cy1 = self.blocks(x0, y0, reach)
+        ny = cy1 - cy0 + 1
+        k, q = _ranges(np.zeros_like(ny), (cx1 - cx0 + 1) * ny)
+        cells = (cx0[q] + k // ny[q]) * self.ncells + cy0[q] + k % ny[q]
+        start = self.cell_start[cells]
+        pos, owner = _ranges(start, self.cell_start[cells + 1] - start)
+        q = q[owner]
+        dx = self.xs[pos] - x0[q]
+        dy = self.ys[pos] - y0[q]
+        return q, pos, dx * dx + dy * dy
+
+    def groups(self, x0, y0, reach):
+        """Split the queries into slices whose candidate pairs fit in BATCH_PAIRS."""
+        sizes = self.block_count(*self.blocks(x0, y0, reach))
+        lo, total = 0, 0
+        for i, size in enumerate(sizes.tolist()):
+            if total and total + size > BATCH_PAIRS:
+                yield slice(lo, i)
+                lo, total = i, 0
+            total += size
+        yield slice(lo, len(sizes))
+
+def _integer_centers(registry, centers) -> List[bool]:
+    for c in centers:
+        registry._check_center(c)
+    return [type(x) is int and type(y) is int for x, y in centers]
+
+def _emit(cols, q, pos, x0, y0, out, slots):
+    # pairs arrive ordered by (query, d2, id): for integer centres and
+    # coordinates that is the scalar (distance, id, name) order
+    prefixes = cols.prefixes
+    for qi, p in zip(q.tolist(), pos.tolist()):
+        row = prefixes[p]
+        x, y = row[2]
+        out[slots[qi]].append(row + (hypot(x0[qi] - x, y0[qi] - y),))
+
+def within_radius(registry, centers: Sequence[Tuple[int, int]], radii: Union[float, Sequence[float]]) -> List[List[Row]]:
+    if isinstance(radii, (int, float)):
+        radii = [radii] * len(centers)
+    if len(radii) != len(centers):
+        raise ValueError("Need one radius per center.")
+    if np is None or not registry.pois:
+        return [registry.pois_within_radius(c, r) for c, r in zip(centers, radii)]
+
+    integer = _integer_centers(registry, centers)
+    eps = registry.epsilon
+    out: List[List[Row]] = [[] for _ in centers]
+    slots, bounds = [], []
+    for i, (c, r) in enumerate(zip(centers, radii)):
+        below, above = sq_bounds(r + eps)
+        if not integer[i]:
+            out[i] = registry.pois_within_radius(c, r)
+        elif above > 0:
+            slots.append(i)
+            bounds.append((centers[i][0], centers[i][1], below, above, r))
+    if not slots:
+        return out
+
+    cols = registry._coordinate_columns()
+    x0, y0, below, above = (np.array(col, dtype=np.int64) for col in list(zip(*bounds))[:4])
+    reach = np.array([isqrt(a) + 1 for a in above.tolist()], dtype=np.int64)
+    for g in cols.groups(x0, y0, reach):
+        q, pos, d2 = cols.candidates(x0[g], y0[g], reach[g])
+        registry._scanned += len(q)
+        keep = d2 < above[g][q]
+        q, pos, d2 = q[keep], pos[keep], d2[keep]
+        # the arrays decide everything clear of the radius; the few pairs near
+        # it are settled exactly as pois_within_radius does, with fle on hypot
+        edge = np.flatnonzero(d2 > below[g][q])
+        if len(edge):
+            xs0, ys0 = x0[g], y0[g]
+            keep = np.ones(len(q), dtype=bool)
+            for j, qi, p in zip(edge.tolist(), q[edge].tolist(), pos[edge].tolist()):
+                d = hypot(int(xs0[qi] - cols.xs[p]), int(ys0[qi] - cols.ys[p]))
+                keep[j] = fle(d, bounds[g.start + qi][4], eps)
+            q, pos, d2 = q[keep], pos[keep], d2[keep]
+        order = np.lexsort((cols.ids[pos], d2, q))
+        _emit(cols, q[order], pos[order], x0[g].tolist(), y0[g].tolist(), out, slots[g])
+    return out
+
+def k_closest(registry, centers: Sequence[Tuple[int, int]], k: int) -> List[List[Row]]:
+    if np is None or not registry.pois or k <= 0:
+        return [registry.k_closest(c, k) for c in centers]
+
+    integer = _integer_centers(registry, centers)
+    out: List[List[Row]] = [[] for _ in centers]
+    slots = []
+    for i, c in enumerate(centers):
+        if integer[i]:
+            slots.append(i)
+        else:
+            out[i] = registry.k_closest(c, k)
+    if not slots:
+        return out
+
+    cols = registry._coordinate_columns()
+    k = min(k, len(cols))
+    x0 = np.array([centers[i][0] for i in slots], dtype=np.int64)
+    y0 = np.array([centers[i][1] for i in slots], dtype=np.int64)
+    # grow each query's square of cells (in whole cells around its own) until
+    # it holds k POIs; every point of it lies within 2 * ((h + 1) * cell)^2
+    cs = cols.cell_size
+    h = np.zeros(len(slots), dtype=np.int64)
+    while True:
+        cx, cy = x0 // cs, y0 // cs
+        n = cols.ncells - 1
+        short = cols.block_count(np.clip(cx - h, 0, n), np.clip(cx + h, 0, n),
+                                 np.clip(cy - h, 0, n), np.clip(cy + h, 0, n)) < k
+        if not short.any():
+            break
+        h[short] = h[short] * 2 + 1
+    limit = 2 * ((h + 1) * cs) ** 2
+    reach = np.array([isqrt(v) + 1 for v in limit.tolist()], dtype=np.int64)
+    for g in cols.groups(x0, y0, reach):
+        q, pos, d2 = cols.candidates(x0[g], y0[g], reach[g])
+        registry._scanned += len(q)
+        keep = d2 <= limit[g][q]
+        q, pos, d2 = q[keep], pos[keep], d2[keep]
+        order = np.lexsort((cols.ids[pos], d2, q))
+        q, pos = q[order], pos[order]
+        # first k pairs of each query
+        first = np.searchsorted(q, np.arange(g.stop - g.start))
+        rank = np.arange(len(q)) - first[q]
+        keep = rank < k
+        _emit(cols, q[keep], pos[keep], x0[g].tolist(), y0[g].tolist(), out, slots[g])
+    return out
@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from math import hypot, inf
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+CacheInfo = namedtuple("CacheInfo", "hits misses invalidations maxsize currsize")
+
+# POIs added at once beyond which spatial entries are dropped wholesale
+# instead of being checked point by point
+REGION_CHECK_LIMIT = 64
+
+_MISS = object()
+
+class QueryCache:
+    """Bounded LRU of query results with scoped invalidation.
+
+    Every entry records the generation of the scopes it depends on ("poi",
+    "visit", "schema", "type_names"); a mutation bumps its scope and the
+    stale entries are dropped when next looked up. Spatial entries instead
+    carry a disc `(x0, y0, reach)` and are dropped only by POI changes
+    inside it. Safe to share between reader threads.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.generations: Dict[str, int] = {"poi": 0, "visit": 0, "schema": 0, "type_names": 0}
+        # key -> (value, ((scope, generation), ...), region or None)
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, deps, _ = entry
+            if all(self.generations[s] == g for s, g in deps):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.invalidations += 1
+        self.misses += 1
+        return _MISS
+
+    def put(self, key, value, scopes: Tuple[str, ...], region: Optional[Tuple[float, float, float]] = None):
+        with self._lock:
+            self._put(key, value, scopes, region)
+
+    def _put(self, key, value, scopes, region):
+        self._entries[key] = (value, tuple((s, self.generations[s]) for s in scopes), region)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, scopes: Iterable[str], points: Tuple[Tuple[int, int], ...] = ()):
+        """Bump `scopes` and drop spatial entries whose disc holds any of `points`."""
+        with self._lock:
+            self._invalidate(scopes, points)
+
+    def _invalidate(self, scopes, points):
+        for s in scopes:
+            self.generations[s] += 1
+        if not points:
+            return
+        stale = []
+        for key, (_, _, region) in self._entries.items():
+            if region is None:
+                continue
+            x0, y0, reach = region
+            if len(points) > REGION_CHECK_LIMIT or any(hypot(x - x0, y - y0) <= reach for x, y in points):
+                stale.append(key)
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.invalidations, self.maxsize, len(self._entries))
+
+def cached(*scopes: str, region: Optional[Callable] = None):
+    """Memoise a POIRegistry query in the registry's cache, if it has one.
+
+    `region(registry, args, result)` gives the disc a spatial result depends
+    on. Lists are returned as copies so callers cannot alter cached values.
+    """
+    def wrap(fn):
+        name = fn.__name__
+
+        @wraps(fn)
+        def method(self, *args, **kwargs):
+            cache = self._cache
+            if cache is None or kwargs:
+                return fn(self, *args, **kwargs)
+            key = (name,) + args
+            try:
+                value = cache.get(key)
+            except TypeError:  # unhashable arguments
+                return fn(self, *args)
+            if value is _MISS:
+                value = fn(self, *args)
+                cache.put(key, value, scopes, None if region is None else region(self, args, value))
+            return list(value) if isinstance(value, list) else value
+        return method
+    return wrap
+
+def disc_region(registry, args, result):
+    """Radius queries: the query disc, widened by epsilon."""
+    (x0, y0), r = args
+    return (x0, y0, r + registry.epsilon + 1e-9)
+
+def knn_region(registry, args, result):
+    """k closest: the disc out to the k-th result, or everything if fewer came back."""
+    (x0, y0), k = args
+    if len(result) < k or not result:
+        return (x0, y0, inf)
+    return (x0, y0, result[-1][4] + registry.epsilon + 1e-9)
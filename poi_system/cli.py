@@ -1,7 +1,11 @@
-from typing import Tuple
+import argparse
+import sys
+from typing import Optional, Tuple
 
 from .storage import POIRegistry, POIError
 from .config_loader import load_config
+from .instrument import format_report
+from .ops import run_script
 
 MENU_TEXT = """
 POI Management System (CLI)
@@ -29,11 +33,39 @@ POI Management System (CLI)
 21) Top-k visitors by distinct POIs
 22) Top-k POIs by distinct visitors
 23) Coverage fairness (m,t)
+24) Instrumentation stats (enables it on first use)
 0) Exit
 """
 
-def run_cli():
-    r = POIRegistry()
+def run_cli(data_dir: Optional[str] = None, cache_size: int = 0, instrument: bool = False,
+            script: Optional[str] = None, output: Optional[str] = None) -> int:
+    """Run the menu, or with `script` the JSON Lines operations in it ("-" for stdin).
+
+    Returns the number of failed script operations.
+    """
+    # with a data directory every mutation is logged there and survives restarts
+    r = POIRegistry.open(data_dir) if data_dir else POIRegistry()
+    if cache_size:
+        r.enable_cache(cache_size)
+    if instrument:
+        r.enable_instrumentation()
+    try:
+        if script is None:
+            _menu_loop(r)
+            return 0
+        src = sys.stdin if script == "-" else open(script, encoding="utf-8")
+        dst = sys.stdout if output in (None, "-") else open(output, "w", encoding="utf-8")
+        try:
+            return run_script(r, src, dst)
+        finally:
+            if src is not sys.stdin:
+                src.close()
+            if dst is not sys.stdout:
+                dst.close()
+    finally:
+        r.close()
+
+def _menu_loop(r: POIRegistry):
     print(MENU_TEXT)
     while True:
         try:
@@ -114,7 +146,8 @@ def run_cli():
                 for row in r.list_pois_by_type(t):
                     print(row)
             elif choice == "13":
-                res = r.closest_pair()
+                t = ask_str("Type filter (optional): ")
+                res = r.closest_pair(t or None)
                 print(res if res else "Need at least two POIs.")
             elif choice == "14":
                 for t,c in r.count_pois_per_type():
@@ -142,24 +175,31 @@ def run_cli():
                 for row in r.visits_for_visitor(vid):
                     print(row)
             elif choice == "19":
-                for row in r.number_of_visitors_per_poi():
+                for row in r.number_of_visitors_per_poi(*ask_dates()):
                     print(row)
             elif choice == "20":
-                for row in r.number_of_pois_per_visitor():
+                for row in r.number_of_pois_per_visitor(*ask_dates()):
                     print(row)
             elif choice == "21":
                 k = ask_int("k: ")
-                for row in r.top_k_visitors_by_poi_count(k):
+                for row in r.top_k_visitors_by_poi_count(k, *ask_dates()):
                     print(row)
             elif choice == "22":
                 k = ask_int("k: ")
-                for row in r.top_k_pois_by_visitor_count(k):
+                for row in r.top_k_pois_by_visitor_count(k, *ask_dates()):
                     print(row)
             elif choice == "23":
                 m = ask_int("m: ")
                 t = ask_int("t: ")
-                for row in r.coverage_fairness(m, t):
+                for row in r.coverage_fairness(m, t, *ask_dates()):
                     print(row)
+            elif choice == "24":
+                stats = r.instrumentation_stats()
+                if stats is None:
+                    r.enable_instrumentation()
+                    print("Instrumentation enabled; stats cover calls from now on.")
+                else:
+                    print(format_report(stats))
             elif choice == "0":
                 print("Bye.")
                 return
@@ -176,6 +216,11 @@ def ask_int(prompt: str) -> int:
 def ask_str(prompt: str) -> str:
     return input(prompt).strip()
 
+def ask_dates() -> Tuple[Optional[str], Optional[str]]:
+    date_from = ask_str("From date dd/mm/yyyy (optional): ")
+    date_to = ask_str("To date dd/mm/yyyy (optional): ")
+    return (date_from or None, date_to or None)
+
 def ask_xy() -> Tuple[int,int]:
     x = ask_int("x = ")
     y = ask_int("y = ")
@@ -183,4 +228,12 @@ def ask_xy() -> Tuple[int,int]:
 
 
 if __name__ == "__main__":
-    run_cli()
+    parser = argparse.ArgumentParser(description="POI Management System (CLI)")
+    parser.add_argument("--data-dir", help="persist the registry in this directory (snapshot + operation log)")
+    parser.add_argument("--cache-size", type=int, default=0, help="memoise up to this many query results (default: off)")
+    parser.add_argument("--instrument", action="store_true", help="record per-method timings from the start (see option 24)")
+    parser.add_argument("--script", help="run the JSON Lines operations in this file (\"-\" for stdin) instead of the menu")
+    parser.add_argument("--output", help="write --script results here instead of stdout")
+    args = parser.parse_args()
+    failed = run_cli(args.data_dir, args.cache_size, args.instrument, args.script, args.output)
+    sys.exit(1 if failed else 0)
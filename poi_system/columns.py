@@ -0,0 +1,170 @@
+import datetime
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+
+from .model import Visit
+
+DATE_FORMAT = "%d/%m/%Y"
+
+def _raw(column) -> memoryview:
+    return memoryview(column).cast("B")
+
+class VisitStore:
+    """Column-oriented storage for visits.
+
+    One row per visit in parallel arrays; dates are interned into a table of
+    distinct strings (kept exactly as given) with their ordinal day numbers,
+    so each distinct date is parsed once. Ratings use 0 for "none". Rows are
+    also bucketed by visitor and by day, so a date range only touches the
+    visits in it; rows loaded with extend_columns are bucketed on first use.
+    """
+
+    def __init__(self):
+        self.visitor_ids = array("q")
+        self.poi_ids = array("q")
+        self.date_codes = array("I")
+        self.ratings = array("b")
+        self.date_strings: List[str] = []
+        self.date_ordinals = array("i")
+        self._code_of: Dict[str, int] = {}
+        # the numeric columns are read-only views until the first append (see extend_columns)
+        self._borrowed = False
+        # visitor id -> row numbers, in insertion order
+        self._rows_by_visitor: Dict[int, array] = {}
+        # ordinal day -> row numbers, and the days with visits in ascending order
+        self._rows_by_day: Dict[int, array] = {}
+        self._days: List[int] = []
+        self._indexed = 0  # rows bucketed so far
+
+    def __len__(self):
+        return len(self.visitor_ids)
+
+    @property
+    def rows_by_visitor(self) -> Dict[int, array]:
+        self.index()
+        return self._rows_by_visitor
+
+    @property
+    def rows_by_day(self) -> Dict[int, array]:
+        self.index()
+        return self._rows_by_day
+
+    @property
+    def days(self) -> List[int]:
+        self.index()
+        return self._days
+
+    def index(self):
+        """Bucket the rows not bucketed yet."""
+        end = len(self.visitor_ids)
+        for row in range(self._indexed, end):
+            self._index_row(row)
+        self._indexed = end
+
+    def date_code(self, date: str) -> int:
+        """Code of a dd/mm/yyyy string, parsing it the first time it is seen."""
+        code = self._code_of.get(date) if type(date) is str else None
+        if code is None:
+            # raises exactly what strptime raises for bad input
+            day = datetime.datetime.strptime(date, DATE_FORMAT).date()
+            code = len(self.date_strings)
+            self._code_of[date] = code
+            self.date_strings.append(date)
+            self.date_ordinals.append(day.toordinal())
+        return code
+
+    def append(self, visitor_id: int, poi_id: int, date_code: int, rating: Optional[int]) -> int:
+        if self._borrowed:
+            self._own()
+        row = len(self.visitor_ids)
+        columns = (self.visitor_ids, self.poi_ids, self.date_codes, self.ratings)
+        try:
+            for col, value in zip(columns, (visitor_id, poi_id, date_code, rating or 0)):
+                col.append(value)
+        except (OverflowError, TypeError):
+            # keep the columns aligned
+            for col in columns:
+                del col[row:]
+            raise
+        if self._indexed == row:
+            self._index_row(row)
+            self._indexed += 1
+        return row
+
+    def _index_row(self, row: int):
+        vid = self.visitor_ids[row]
+        rows = self._rows_by_visitor.get(vid)
+        if rows is None:
+            rows = self._rows_by_visitor[vid] = array("L")
+        rows.append(row)
+        day = self.date_ordinals[self.date_codes[row]]
+        rows = self._rows_by_day.get(day)
+        if rows is None:
+            rows = self._rows_by_day[day] = array("L")
+            insort(self._days, day)
+        rows.append(row)
+
+    def _own(self):
+        # copies borrowed views into arrays that can grow
+        for name, typecode in (("visitor_ids", "q"), ("poi_ids", "q"), ("date_codes", "I"), ("ratings", "b")):
+            col = array(typecode)
+            col.frombytes(_raw(getattr(self, name)))
+            setattr(self, name, col)
+        self._borrowed = False
+
+    def rows_between(self, first: Optional[int] = None, last: Optional[int] = None) -> Iterator[int]:
+        """Rows dated within the ordinal days `first..last` (inclusive, None = open)."""
+        days = self.days
+        lo = 0 if first is None else bisect_left(days, first)
+        hi = len(days) if last is None else bisect_right(days, last)
+        for day in days[lo:hi]:
+            yield from self.rows_by_day[day]
+
+    def extend_columns(self, visitor_ids, poi_ids, date_codes, ratings, date_strings: List[str]):
+        """Append whole columns at once (e.g. from a snapshot).
+
+        Columns are buffers of the store's item types (arrays or memoryview
+        casts); codes index `date_strings`. An empty store keeps the buffers
+        themselves, so columns cast from a memory-mapped file stay shared
+        pages until the first append copies them. Otherwise they are copied
+        with a single memcpy each.
+        """
+        remap = array("I", [self.date_code(d) for d in date_strings])
+        identity = remap == array("I", range(len(remap)))
+        if not len(self.visitor_ids) and identity:
+            self.visitor_ids, self.poi_ids, self.date_codes, self.ratings = visitor_ids, poi_ids, date_codes, ratings
+            self._borrowed = True
+            return
+        if self._borrowed:
+            self._own()
+        self.visitor_ids.frombytes(_raw(visitor_ids))
+        self.poi_ids.frombytes(_raw(poi_ids))
+        if identity:
+            self.date_codes.frombytes(_raw(date_codes))
+        else:
+            self.date_codes.extend([remap[c] for c in date_codes])
+        self.ratings.frombytes(_raw(ratings))
+
+    def visit(self, row: int) -> Visit:
+        return Visit(visitor_id=self.visitor_ids[row], poi_id=self.poi_ids[row],
+                     date=self.date_strings[self.date_codes[row]], rating=self.ratings[row] or None)
+
+class VisitsByVisitor(Mapping):
+    """Read-only `visitor id -> [Visit]` view over a VisitStore.
+
+    Visits are materialised on access; only visitors with visits are keys.
+    """
+
+    def __init__(self, store: VisitStore):
+        self._store = store
+
+    def __getitem__(self, visitor_id: int) -> List[Visit]:
+        return [self._store.visit(row) for row in self._store.rows_by_visitor[visitor_id]]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._store.rows_by_visitor)
+
+    def __len__(self):
+        return len(self._store.rows_by_visitor)
@@ -0,0 +1,208 @@
+import asyncio, os, tempfile, threading
+from contextlib import contextmanager
+from functools import partial
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .exceptions import POIError
+from .storage import POIRegistry
+
+# Registry methods that change state; everything else public is a read
+MUTATORS = frozenset({
+    "add_poi_type", "delete_poi_type", "add_attribute", "delete_attribute", "rename_attribute",
+    "rename_type", "add_poi", "bulk_add_pois", "delete_poi", "add_visitor", "add_visit",
+    "bulk_add_visits", "create_attribute_index", "drop_attribute_index",
+})
+
+# Mutators whose first argument is an iterable of rows
+BULK = frozenset({"bulk_add_pois", "bulk_add_visits"})
+
+def _clone(registry: POIRegistry) -> POIRegistry:
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "clone.snap")
+        registry.save_snapshot(path)
+        copy = type(registry).load_snapshot(path)
+    if registry._cache is not None:
+        copy.enable_cache(registry._cache.maxsize)
+    return copy
+
+# Queries returning generators over the registry
+STREAMS = frozenset({"knn_join", "radius_join"})
+
+class _PinnedStream:
+    """Iterator over a stream that holds its registry version until exhausted or closed."""
+
+    def __init__(self, owner: "ConcurrentRegistry", side: int, rows: Iterator):
+        self._owner = owner
+        self._side = side
+        self._rows = rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._rows is None:
+            raise StopIteration
+        try:
+            return next(self._rows)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._rows is not None:
+            self._rows.close()
+            self._rows = None
+            self._owner._unpin(self._side)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+class ConcurrentRegistry:
+    """Snapshot-isolated POIRegistry for many reader threads and one writer.
+
+    Two copies of the registry are kept (a left-right scheme). Readers use
+    the published copy without blocking each other; the writer applies a
+    batch of mutations to the other copy and publishes it with one swap. The
+    batch is replayed on the old copy right away if no reader is on it, or
+    else before the next batch (which waits for those readers). A batch
+    therefore becomes visible all at once, and a reader never sees a
+    registry that is being modified.
+
+    Queries are available directly (`cr.k_closest(c0, 5)`); use `reading()`
+    to run several queries against the same version. The streaming joins
+    (STREAMS) keep their version until the stream is exhausted or closed. A
+    thread holding a version can apply one batch; a second one waits for
+    the version to be released. Mutators called on this object are applied
+    as one-operation batches.
+    """
+
+    def __init__(self, registry: Optional[POIRegistry] = None):
+        registry = POIRegistry() if registry is None else registry
+        if registry._log is not None:
+            raise POIError("Durable registries cannot be shared this way; close the log first.")
+        self._copies = [registry, _clone(registry)]
+        for copy in self._copies:
+            copy._settle()  # readers share a copy, so nothing may be left to build on first use
+        self._front = 0
+        self._readers = [0, 0]
+        self._state = threading.Condition()  # guards _front and _readers
+        self._writer = threading.Lock()
+        self._lagging: List[Tuple[str, tuple]] = []  # last batch, not yet replayed on the back copy
+        self.version = 0
+
+    def _pin(self) -> int:
+        with self._state:
+            side = self._front
+            self._readers[side] += 1
+        return side
+
+    def _unpin(self, side: int):
+        with self._state:
+            self._readers[side] -= 1
+            if not self._readers[side]:
+                self._state.notify_all()
+
+    @contextmanager
+    def reading(self) -> Iterator[POIRegistry]:
+        """The current version, kept stable (and unmodified) until the block exits."""
+        side = self._pin()
+        try:
+            yield self._copies[side]
+        finally:
+            self._unpin(side)
+
+    def apply(self, ops: Iterable[Tuple[str, tuple]]) -> List[Tuple[object, Optional[Exception]]]:
+        """Apply `(method, args)` mutations as one batch; returns `(result, error)` per op."""
+        ops = [(op, tuple(args)) for op, args in ops]
+        for op, _ in ops:
+            if op not in MUTATORS:
+                raise POIError(f"Not a mutation: {op}")
+        # each copy replays the batch, so single-pass row iterables are read once here
+        ops = [(op, (list(args[0]),) + args[1:] if op in BULK and args else args) for op, args in ops]
+        with self._writer:
+            back = 1 - self._front
+            with self._state:
+                while self._readers[back]:
+                    self._state.wait()
+            self._replay(back)
+            results = []
+            for op, args in ops:
+                try:
+                    results.append((getattr(self._copies[back], op)(*args), None))
+                except Exception as e:
+                    results.append((None, e))
+            with self._state:
+                self._front = back
+                self.version += 1
+                self._lagging = ops
+                # nobody can pin the old copy any more; if nobody is on it, catch it up now
+                idle = not self._readers[1 - back]
+            if idle:
+                self._replay(1 - back)
+        return results
+
+    def _replay(self, side: int):
+        # same operations on the same state give the same outcome, errors included
+        for op, args in self._lagging:
+            try:
+                getattr(self._copies[side], op)(*args)
+            except Exception:
+                pass
+        self._lagging = []
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(POIRegistry, name, None)):
+            raise AttributeError(name)
+        if name in MUTATORS:
+            def mutate(*args):
+                result, error = self.apply([(name, args)])[0]
+                if error is not None:
+                    raise error
+                return result
+            return mutate
+        if name in STREAMS:
+            def stream(*args, **kwargs):
+                side = self._pin()
+                try:
+                    rows = getattr(self._copies[side], name)(*args, **kwargs)
+                except BaseException:
+                    self._unpin(side)
+                    raise
+                return _PinnedStream(self, side, rows)
+            return stream
+
+        def query(*args, **kwargs):
+            with self.reading() as registry:
+                return getattr(registry, name)(*args, **kwargs)
+        return query
+
+class AsyncRegistry:
+    """asyncio front end: every call runs in `executor` (default: the loop's thread pool).
+
+    `await ar.pois_within_radius(c0, r)`; mutations go through the wrapped
+    ConcurrentRegistry's writer, so the event loop never blocks on a scan or
+    on a batch being published.
+    """
+
+    def __init__(self, registry: ConcurrentRegistry, executor=None):
+        self.registry = registry
+        self.executor = executor
+
+    async def apply(self, ops: Iterable[Tuple[str, tuple]]):
+        return await self._run(self.registry.apply, list(ops))
+
+    def __getattr__(self, name: str):
+        method = getattr(self.registry, name)
+
+        async def call(*args, **kwargs):
+            return await self._run(partial(method, *args, **kwargs))
+        return call
+
+    def _run(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
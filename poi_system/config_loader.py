@@ -1,11 +1,23 @@
 from typing import Dict, List
 from .exceptions import ConfigError
-import yaml 
+import yaml
 import json, os, datetime
+from functools import lru_cache
+
+# Records fed to the registry at a time by the streaming (JSON Lines) loader
+CHUNK_SIZE = 10000
+
+@lru_cache(maxsize=4096)
+def _check_date(s: str):
+    # dates repeat heavily across visits, so each distinct string is parsed once
+    datetime.datetime.strptime(s, "%d/%m/%Y")
 
 def _parse_date(s: str) -> str:
     try:
-        datetime.datetime.strptime(s, "%d/%m/%Y")
+        if type(s) is str:
+            _check_date(s)
+        else:
+            datetime.datetime.strptime(s, "%d/%m/%Y")
         return s
     except Exception as e:
         raise ConfigError(f"Invalid date format (expected dd/mm/yyyy): {s}") from e
@@ -16,60 +28,122 @@ def _try_yaml_or_json_load(text: str):
     except Exception:
         return json.loads(text)
 
-def load_config(path: str, registry) -> Dict[str, List[str]]:
+def _parse_poi_type(t) -> tuple:
+    name = t.get("name")
+    attrs = list(t.get("attributes", []))
+    if not name or not isinstance(attrs, list):
+        raise ConfigError("POI type must have 'name' and optional list 'attributes'.")
+    return (name, attrs)
+
+def _parse_poi(p) -> tuple:
+    pid = int(p.get("id"))
+    name = p.get("name")
+    tname = p.get("type")
+    x = int(p.get("x"))
+    y = int(p.get("y"))
+    attrs = dict(p.get("attributes", {}))
+    if name is None or tname is None:
+        raise ConfigError("POI requires 'id','name','type','x','y'.")
+    return (pid, name, tname, x, y, attrs)
+
+def _parse_visitor(v) -> tuple:
+    vid = int(v.get("id"))
+    name = v.get("name")
+    nat = v.get("nationality")
+    if name is None or nat is None:
+        raise ConfigError("Visitor requires 'id','name','nationality'.")
+    return (vid, name, nat)
+
+def _parse_visit(vv) -> tuple:
+    vid = int(vv.get("visitor_id"))
+    pid = int(vv.get("poi_id"))
+    date = _parse_date(vv.get("date"))
+    rating = vv.get("rating", None)
+    if rating is not None:
+        rating = int(rating)
+    return (vid, pid, date, rating)
+
+# section -> (record parser, registry method, whether it takes a batch of rows, warning prefix), in load order
+_SECTIONS = {
+    "poi_types": (_parse_poi_type, "add_poi_type", False, "Type skipped"),
+    "pois": (_parse_poi, "bulk_add_pois", True, "POI skipped"),
+    "visitors": (_parse_visitor, "add_visitor", False, "Visitor skipped"),
+    "visits": (_parse_visit, "bulk_add_visits", True, "Visit skipped"),
+}
+
+def _load_records(registry, section: str, records, warnings: Dict[str, List[str]]):
+    parse, method, bulk, prefix = _SECTIONS[section]
+    add = getattr(registry, method)
+    errors = {}  # record index -> error, reported in record order
+    if bulk:
+        rows, index = [], []
+        for i, rec in enumerate(records):
+            try:
+                rows.append(parse(rec))
+                index.append(i)
+            except Exception as e:
+                errors[i] = e
+        for j, e in add(rows):
+            errors[index[j]] = e
+    else:
+        for i, rec in enumerate(records):
+            try:
+                add(*parse(rec))
+            except Exception as e:
+                errors[i] = e
+    for i in sorted(errors):
+        warnings[section].append(f"{prefix}: {errors[i]}")
+
+def _load_jsonl(path: str, registry, warnings: Dict[str, List[str]], chunk_size: int):
+    # one record per line, wrapped in its section name: {"pois": {"id": 1, ...}}
+    section, chunk = None, []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError as e:
+                raise ConfigError(f"Invalid JSON on line {lineno}: {e}") from e
+            if not isinstance(rec, dict) or len(rec) != 1:
+                raise ConfigError(f"Line {lineno} must be an object with a single section key.")
+            (key, value), = rec.items()
+            if key not in _SECTIONS:
+                continue  # unknown sections are ignored, like unknown top-level keys
+            if key != section or len(chunk) >= chunk_size:
+                if chunk:
+                    _load_records(registry, section, chunk, warnings)
+                section, chunk = key, []
+            chunk.append(value)
+    if chunk:
+        _load_records(registry, section, chunk, warnings)
+
+def load_config(path: str, registry, chunk_size: int = CHUNK_SIZE) -> Dict[str, List[str]]:
+    """Load a config into `registry` and return the warnings per section.
+
+    The format follows the extension: `.yaml`/`.yml`, `.json`, or
+    `.jsonl`/`.ndjson` (JSON Lines, streamed in chunks of `chunk_size`
+    records with bounded memory). Other extensions are tried as YAML, then JSON.
+    """
     warnings = {"poi_types": [], "pois": [], "visitors": [], "visits": []}
 
     if not os.path.exists(path):
         raise ConfigError(f"File not found: {path}")
-    text = open(path, "r", encoding="utf-8").read()
-
-    data = _try_yaml_or_json_load(text)
-
-    for t in data.get("poi_types", []):
-        try:
-            name = t.get("name")
-            attrs = list(t.get("attributes", []))
-            if not name or not isinstance(attrs, list):
-                raise ConfigError("POI type must have 'name' and optional list 'attributes'.")
-            registry.add_poi_type(name, attrs)
-        except Exception as e:
-            warnings["poi_types"].append(f"Type skipped: {e}")
-
-    for p in data.get("pois", []):
-        try:
-            pid = int(p.get("id"))
-            name = p.get("name")
-            tname = p.get("type")
-            x = int(p.get("x"))
-            y = int(p.get("y"))
-            attrs = dict(p.get("attributes", {}))
-            if name is None or tname is None:
-                raise ConfigError("POI requires 'id','name','type','x','y'.")
-            registry.add_poi(pid, name, tname, x, y, attrs)
-        except Exception as e:
-            warnings["pois"].append(f"POI skipped: {e}")
-
-    for v in data.get("visitors", []):
-        try:
-            vid = int(v.get("id"))
-            name = v.get("name")
-            nat = v.get("nationality")
-            if name is None or nat is None:
-                raise ConfigError("Visitor requires 'id','name','nationality'.")
-            registry.add_visitor(vid, name, nat)
-        except Exception as e:
-            warnings["visitors"].append(f"Visitor skipped: {e}")
-
-    for vv in data.get("visits", []):
-        try:
-            vid = int(vv.get("visitor_id"))
-            pid = int(vv.get("poi_id"))
-            date = _parse_date(vv.get("date"))
-            rating = vv.get("rating", None)
-            if rating is not None:
-                rating = int(rating)
-            registry.add_visit(vid, pid, date, rating)
-        except Exception as e:
-            warnings["visits"].append(f"Visit skipped: {e}")
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        _load_jsonl(path, registry, warnings, chunk_size)
+        return warnings
+
+    with open(path, "r", encoding="utf-8") as f:
+        if ext in (".yaml", ".yml"):
+            data = yaml.safe_load(f)
+        elif ext == ".json":
+            data = json.load(f)
+        else:
+            data = _try_yaml_or_json_load(f.read())
+
+    for section in _SECTIONS:
+        _load_records(registry, section, data.get(section, []), warnings)
 
     return warnings
@@ -0,0 +1,141 @@
+import cProfile
+import time
+from functools import wraps
+from typing import Dict, List
+
+# Registry methods never wrapped: the instrumentation API itself, lifecycle
+# calls and alternate constructors
+UNWRAPPED = {"enable_instrumentation", "disable_instrumentation", "instrumentation_stats",
+             "attach_profiler", "cache_info", "enable_cache", "open", "load_snapshot", "close"}
+
+class MethodStats:
+    """Calls, latency histogram (power-of-two nanosecond buckets) and row counts of one method."""
+
+    __slots__ = ("calls", "total_ns", "max_ns", "buckets", "scanned", "returned")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets: Dict[int, int] = {}
+        self.scanned = 0
+        self.returned = 0
+
+    def record(self, ns: int, scanned: int = 0, returned: int = 0):
+        self.calls += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        b = ns.bit_length()
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.scanned += scanned
+        self.returned += returned
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, in microseconds."""
+        rank = q * self.calls
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min(self.max_ns, (1 << b) - 1) / 1e3
+        return self.max_ns / 1e3
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.calls / 1e3 if self.calls else 0.0,
+            "p50_us": self.percentile(0.5),
+            "p99_us": self.percentile(0.99),
+            "max_us": self.max_ns / 1e3,
+            # histogram keys are bucket upper bounds in microseconds
+            "histogram": {f"<{(1 << b) / 1e3:g}us": n for b, n in sorted(self.buckets.items())},
+            "rows_scanned": self.scanned,
+            "rows_returned": self.returned,
+        }
+
+class Instrumentation:
+    """Opt-in measurements for one registry, see POIRegistry.enable_instrumentation.
+
+    Public registry methods are shadowed by timing wrappers on the instance
+    only, so a registry without instrumentation runs the plain class
+    methods. Rows scanned come from counters the query paths bump once per
+    call (or per grid cell), rows returned from the length of the result.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.methods: Dict[str, MethodStats] = {}
+        self.profilers: Dict[str, object] = {}
+        self.wrapped: List[str] = []
+
+    def install(self):
+        cls = type(self.registry)
+        for name in dir(cls):
+            if name.startswith("_") or name in UNWRAPPED or not callable(getattr(cls, name)):
+                continue
+            setattr(self.registry, name, self._wrap(name, getattr(self.registry, name)))
+            self.wrapped.append(name)
+
+    def uninstall(self):
+        for name in self.wrapped:
+            delattr(self.registry, name)
+        self.wrapped.clear()
+
+    def stats(self, name: str) -> MethodStats:
+        s = self.methods.get(name)
+        if s is None:
+            s = self.methods[name] = MethodStats()
+        return s
+
+    def _wrap(self, name: str, method):
+        registry = self.registry
+        stats = self.stats(name)
+        clock = time.perf_counter_ns
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            before = registry._scanned + registry._grid.scanned
+            profiler = self.profilers.get(name)
+            t0 = clock()
+            if profiler is None:
+                result = method(*args, **kwargs)
+            else:
+                with profiler:
+                    result = method(*args, **kwargs)
+            ns = clock() - t0
+            returned = len(result) if isinstance(result, list) else 0
+            stats.record(ns, registry._scanned + registry._grid.scanned - before, returned)
+            return result
+        return timed
+
+    def attach_profiler(self, name: str, profiler=None):
+        if name not in self.wrapped:
+            raise ValueError(f"Unknown or unwrapped method: {name}")
+        self.profilers[name] = cProfile.Profile() if profiler is None else profiler
+        return self.profilers[name]
+
+    def report(self) -> Dict[str, object]:
+        registry = self.registry
+        cache = registry.cache_info()
+        return {
+            "methods": {name: s.summary() for name, s in sorted(self.methods.items()) if s.calls},
+            "query_plans": dict(registry._query_plans),
+            "cache": None if cache is None else cache._asdict(),
+        }
+
+def format_report(report: Dict[str, object]) -> str:
+    lines = [f"{'method':<32}{'calls':>8}{'total ms':>12}{'p50 us':>10}{'p99 us':>10}{'scanned':>12}{'returned':>10}"]
+    for name, s in sorted(report["methods"].items(), key=lambda e: -e[1]["total_ms"]):
+        lines.append(f"{name:<32}{s['calls']:>8}{s['total_ms']:>12.2f}{s['p50_us']:>10.1f}{s['p99_us']:>10.1f}"
+                     f"{s['rows_scanned']:>12}{s['rows_returned']:>10}")
+    if report["query_plans"]:
+        lines.append("query_pois sources: " + ", ".join(f"{k}={v}" for k, v in sorted(report["query_plans"].items())))
+    cache = report["cache"]
+    if cache is not None:
+        lookups = cache["hits"] + cache["misses"]
+        rate = cache["hits"] / lookups if lookups else 0.0
+        lines.append(f"cache: {cache['hits']} hits / {cache['misses']} misses ({rate:.0%}), "
+                     f"{cache['invalidations']} invalidated, {cache['currsize']}/{cache['maxsize']} entries")
+    return "\n".join(lines)
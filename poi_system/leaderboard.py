@@ -0,0 +1,97 @@
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+class Leaderboard:
+    """Ids ranked by a count that moves in steps of one.
+
+    Ids are bucketed by their current count and every bucket is kept sorted,
+    so the top k (count descending, then id ascending) is read in O(k). Ids
+    at count 0 (usually most of them) are not bucketed; top() only looks
+    for them when fewer than k ids have a count.
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.buckets: Dict[int, List[int]] = {}  # count > 0 -> ids
+        self.levels: List[int] = []  # counts with a non-empty bucket, ascending
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, id: int, count: int = 0):
+        self.counts[id] = count
+        if count:
+            self._place(id, count)
+
+    def extend(self, ids: Iterable[int], count: int = 0):
+        ids = list(ids)
+        if not ids:
+            return
+        for id in ids:
+            self.counts[id] = count
+        if not count:
+            return
+        bucket = self.buckets.get(count)
+        if bucket is None:
+            self.buckets[count] = sorted(ids)
+            insort(self.levels, count)
+        else:
+            bucket.extend(ids)
+            bucket.sort()
+
+    def remove(self, id: int):
+        c = self.counts.pop(id)
+        if c:
+            self._take(id, c)
+
+    def increment(self, id: int):
+        c = self.counts[id]
+        if c:
+            self._take(id, c)
+        self.counts[id] = c + 1
+        self._place(id, c + 1)
+
+    def increment_many(self, ids: Iterable[int]):
+        """increment() for every id, regrouping all buckets at once for large batches."""
+        ids = list(ids)
+        if len(ids) < len(self.counts):
+            for id in ids:
+                self.increment(id)
+            return
+        for id in ids:
+            self.counts[id] += 1
+        self.buckets = {}
+        for id, c in self.counts.items():
+            if c:
+                self.buckets.setdefault(c, []).append(id)
+        for bucket in self.buckets.values():
+            bucket.sort()
+        self.levels = sorted(self.buckets)
+
+    def top(self, k: int) -> List[Tuple[int, int]]:
+        out = []
+        for c in reversed(self.levels):
+            if len(out) >= k:
+                break
+            for id in self.buckets[c][:k - len(out)]:
+                out.append((id, c))
+        if len(out) < k:
+            zeros = (id for id, c in self.counts.items() if not c)
+            out += [(id, 0) for id in heapq.nsmallest(k - len(out), zeros)]
+        return out
+
+    def _place(self, id: int, c: int):
+        bucket = self.buckets.get(c)
+        if bucket is None:
+            self.buckets[c] = [id]
+            insort(self.levels, c)
+        else:
+            insort(bucket, id)
+
+    def _take(self, id: int, c: int):
+        bucket = self.buckets[c]
+        del bucket[bisect_left(bucket, id)]
+        if not bucket:
+            del self.buckets[c]
+            del self.levels[bisect_left(self.levels, c)]
@@ -8,7 +8,7 @@ class POIType:
     name: str
     attributes: List[str] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class POI:
     id: int
     name: str
@@ -24,13 +24,15 @@ class POI:
         if not in_bounds(self.x, self.y):
             raise ValueError(f"Coordinates must be within 0..999 inclusive: got ({self.x},{self.y})")
 
-@dataclass
+@dataclass(slots=True)
 class Visitor:
     id: int
     name: str
     nationality: str
 
-@dataclass(frozen=True)
+# Visits are stored in columns (see columns.VisitStore); Visit objects are
+# built on demand as views of a row
+@dataclass(frozen=True, slots=True)
 class Visit:
     visitor_id: int
     poi_id: int
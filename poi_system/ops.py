@@ -0,0 +1,199 @@
+"""Operations by menu number, executed in bulk (CLI --script mode, server).
+
+A request is a JSON object naming the operation by menu number or method
+name plus the fields the menu would prompt for:
+
+    {"op": 8, "id": 1, "name": "Park", "type": "park", "x": 3, "y": 4}
+    {"op": "k_closest", "x": 10, "y": 10, "k": 3}
+
+`c0` may be given as `"c0": [x, y]` instead of `x`/`y`. Responses are
+`{"op": n, "result": ...}` or `{"op": n, "error": "..."}`, with the
+request's `seq` echoed when present.
+"""
+import json
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+
+from .config_loader import load_config
+from .exceptions import POIError
+
+# Requests executed (and their output written) at a time in script mode
+CHUNK_SIZE = 4096
+
+_RANGE = [("date_from", None), ("date_to", None)]
+
+# menu option -> (method, fields, read-only); a field is a name or (name, default)
+OPS: Dict[int, Tuple[str, list, bool]] = {
+    1: ("load_config", ["path"], False),
+    2: ("add_poi_type", ["name", ("attributes", None)], False),
+    3: ("delete_poi_type", ["name"], False),
+    4: ("add_attribute", ["type", "attr"], False),
+    5: ("delete_attribute", ["type", "attr"], False),
+    6: ("rename_attribute", ["type", "old", "new"], False),
+    7: ("rename_type", ["old", "new"], False),
+    8: ("add_poi", ["id", "name", "type", "x", "y", ("attributes", None)], False),
+    9: ("delete_poi", ["id"], False),
+    10: ("add_visitor", ["id", "name", "nationality"], False),
+    11: ("add_visit", ["visitor_id", "poi_id", "date", ("rating", None)], False),
+    12: ("list_pois_by_type", ["type"], True),
+    13: ("closest_pair", [("type", None)], True),
+    14: ("count_pois_per_type", [], True),
+    15: ("pois_within_radius", ["c0", "r"], True),
+    16: ("k_closest", ["c0", "k"], True),
+    17: ("at_exact_radius", ["c0", "r"], True),
+    18: ("visits_for_visitor", ["visitor_id"], True),
+    19: ("number_of_visitors_per_poi", _RANGE, True),
+    20: ("number_of_pois_per_visitor", _RANGE, True),
+    21: ("top_k_visitors_by_poi_count", ["k"] + _RANGE, True),
+    22: ("top_k_pois_by_visitor_count", ["k"] + _RANGE, True),
+    23: ("coverage_fairness", ["m", "t"] + _RANGE, True),
+}
+_BY_NAME = {method: number for number, (method, _, _) in OPS.items()}
+
+def parse(request: dict) -> Tuple[int, tuple]:
+    """Menu number and positional arguments of a request."""
+    if not isinstance(request, dict):
+        raise POIError("Request must be a JSON object.")
+    op = request.get("op")
+    number = _BY_NAME.get(op, op)
+    if isinstance(number, str) and number.isdigit():
+        number = int(number)
+    if number not in OPS:
+        raise POIError(f"Unknown op: {op!r}")
+    args = []
+    for field in OPS[number][1]:
+        name, default = field if isinstance(field, tuple) else (field, KeyError)
+        if name == "c0" and "c0" not in request:
+            if "x" not in request or "y" not in request:
+                raise POIError("Missing field 'c0' (or 'x' and 'y').")
+            args.append((request["x"], request["y"]))
+        elif name in request:
+            value = request[name]
+            args.append(tuple(value) if name == "c0" else value)
+        elif default is KeyError:
+            raise POIError(f"Missing field '{name}'.")
+        else:
+            args.append(default)
+    return number, tuple(args)
+
+def _call(registry, number: int, args: tuple):
+    method = OPS[number][0]
+    if method == "load_config":
+        return load_config(args[0], registry)
+    return getattr(registry, method)(*args)
+
+def _response(request, number: Optional[int], result=None, error: Optional[Exception] = None) -> dict:
+    resp = {"op": number}
+    if isinstance(request, dict) and "seq" in request:
+        resp["seq"] = request["seq"]
+    if error is None:
+        resp["result"] = result
+    else:
+        resp["error"] = str(error) if isinstance(error, POIError) else f"{type(error).__name__}: {error}"
+    return resp
+
+def execute(registry, requests: List[dict]) -> List[dict]:
+    """Run requests in order and return one response per request.
+
+    Consecutive read-only requests form a run that sees the same state, so
+    within a run radius (15) and k-closest (16) queries are answered by the
+    batch APIs and repeated queries are computed once.
+    """
+    responses: List[Optional[dict]] = [None] * len(requests)
+    run: List[Tuple[int, int, tuple]] = []
+    for i, request in enumerate(requests):
+        try:
+            number, args = parse(request)
+        except Exception as e:
+            responses[i] = _response(request, request.get("op") if isinstance(request, dict) else None, error=e)
+            continue
+        if OPS[number][2]:
+            run.append((i, number, args))
+            continue
+        _run_reads(registry, requests, run, responses)
+        run = []
+        try:
+            responses[i] = _response(request, number, _call(registry, number, args))
+        except Exception as e:
+            responses[i] = _response(request, number, error=e)
+    _run_reads(registry, requests, run, responses)
+    return responses
+
+def _run_reads(registry, requests, run, responses):
+    # radius queries all go through one batch call, k-closest ones per k
+    groups: Dict[tuple, List[Tuple[int, int, tuple]]] = {}
+    rest = []
+    for item in run:
+        _, number, args = item
+        if number == 15:
+            groups.setdefault((15,), []).append(item)
+        elif number == 16 and isinstance(args[1], int):
+            groups.setdefault((16, args[1]), []).append(item)
+        else:
+            rest.append(item)
+
+    for key, items in groups.items():
+        centers = [args[0] for _, _, args in items]
+        try:
+            if key[0] == 15:
+                results = registry.batch_within_radius(centers, [args[1] for _, _, args in items])
+            else:
+                results = registry.batch_k_closest(centers, key[1])
+        except Exception:
+            rest.extend(items)  # some request is invalid: answer them one by one
+            continue
+        for (i, number, _), result in zip(items, results):
+            responses[i] = _response(requests[i], number, result)
+
+    done = {}
+    for i, number, args in rest:
+        key = (number, args)
+        try:
+            hit = done.get(key)
+        except TypeError:  # unhashable arguments
+            key, hit = None, None
+        if hit is None:
+            try:
+                hit = (_call(registry, number, args), None)
+            except Exception as e:
+                hit = (None, e)
+            if key is not None:
+                done[key] = hit
+        responses[i] = _response(requests[i], number, *hit)
+
+def _parse_line(line: str):
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {"op": None, "_error": f"Invalid JSON: {e}"}
+    if not isinstance(request, dict):
+        return {"op": None, "_error": "Request must be a JSON object."}
+    return request
+
+def run_script(registry, lines: Iterable[str], out: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Execute a JSON Lines stream of requests, writing JSON Lines responses.
+
+    Requests are read and answered `chunk_size` at a time, and each chunk's
+    output is written in one call. Returns the number of failed requests.
+    """
+    failed = 0
+    chunk = []
+
+    def flush():
+        nonlocal failed
+        bad = [i for i, req in enumerate(chunk) if "_error" in req]
+        responses = execute(registry, [req for req in chunk if "_error" not in req])
+        for i in bad:
+            responses.insert(i, {"op": None, "error": chunk[i]["_error"]})
+        failed += sum("error" in resp for resp in responses)
+        out.write("".join(json.dumps(resp, default=str, ensure_ascii=False) + "\n" for resp in responses))
+        out.flush()
+        chunk.clear()
+
+    for line in lines:
+        if line.strip():
+            chunk.append(_parse_line(line))
+            if len(chunk) >= chunk_size:
+                flush()
+    if chunk:
+        flush()
+    return failed
@@ -0,0 +1,156 @@
+import os, shutil, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .spatial import CELL_SIZE, find_closest_pair
+from .storage import POIRegistry
+from .utils import GRID_SIZE
+
+# Chunks of centres per worker for the batch queries (smooths out uneven chunks)
+CHUNKS_PER_WORKER = 4
+
+# Registry loaded from the current snapshot, per worker process
+_loaded: Dict[str, POIRegistry] = {}
+
+def _registry(path: str) -> POIRegistry:
+    if path not in _loaded:
+        _loaded.clear()
+        _loaded[path] = POIRegistry.load_snapshot(path)
+    return _loaded[path]
+
+def _closest_task(path: str, type_name: Optional[str], lo: int, hi: int):
+    registry = _registry(path)
+    pois = registry.pois if type_name is None else registry._by_type[type_name]
+    # rank is taken over all POIs so the pair can be ordered like closest_pair does
+    points = [(p.x, p.y, p.id, rank, p.name) for rank, p in enumerate(pois.values()) if lo <= p.x < hi]
+    return find_closest_pair(points, registry.epsilon)
+
+def _batch_task(path: str, method: str, centers, arg):
+    return getattr(_registry(path), method)(centers, arg)
+
+def _coverage_task(path: str, lo: int, hi: Optional[int], thresholds):
+    registry = _registry(path)
+    vids = sorted(v for v in registry.visitors if v >= lo and (hi is None or v < hi))
+    return registry._coverage_fairness(vids, thresholds)
+
+def _merge_pairs(results, eps: float):
+    # same rule as find_closest_pair, applied to the partial results in a fixed order
+    best = None
+    for res in results:
+        if res is None:
+            continue
+        p, q, d = res
+        key = (p[2], q[2]) if p[2] < q[2] else (q[2], p[2])
+        if best is None or d < best[0] - eps or (abs(d - best[0]) <= eps and key < best[1]):
+            best = (d, key, p, q)
+    return best
+
+class ParallelExecutor:
+    """Runs the heavy read-only queries of a registry on a process pool.
+
+    Workers map the registry from a binary snapshot (see snapshot.py) rather
+    than receiving it pickled; call refresh() after changing the registry.
+    Closest pair is split into vertical strips of the grid plus the bands
+    around their borders, batch queries into spatially grouped chunks of
+    centres, and coverage fairness into visitor-id ranges. Partial results
+    are merged in a fixed order, so answers equal the registry's own
+    methods for the snapshotted state.
+    """
+
+    def __init__(self, registry: POIRegistry, workers: Optional[int] = None, mp_context=None):
+        self.registry = registry
+        self.workers = workers or os.cpu_count() or 1
+        self._dir = tempfile.mkdtemp(prefix="poi-parallel-")
+        self._version = 0
+        self._path = None
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=mp_context)
+        self.refresh()
+
+    def refresh(self):
+        """Publish the registry's current state to the workers."""
+        self._version += 1
+        path = os.path.join(self._dir, f"registry-{self._version}.snap")
+        self.registry.save_snapshot(path)
+        old, self._path = self._path, path
+        if old is not None:
+            os.remove(old)  # workers still mapping it keep their copy
+
+    def close(self):
+        self._pool.shutdown()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def closest_pair(self, type_name: Optional[str] = None):
+        """Parallel POIRegistry.closest_pair."""
+        registry = self.registry
+        if type_name is not None:
+            registry._require_type(type_name)
+        pois = registry.pois if type_name is None else registry._by_type[type_name]
+        xs = sorted(p.x for p in pois.values())
+
+        # strips [bounds[i], bounds[i+1]) with about the same number of POIs
+        strips = max(1, min(self.workers, len(xs) // 2))
+        bounds = sorted({0} | {xs[i * len(xs) // strips] for i in range(1, strips)}) + [GRID_SIZE]
+        spans = list(zip(bounds, bounds[1:]))
+        best = _merge_pairs(self._map(_closest_task, [(type_name, lo, hi) for lo, hi in spans]), registry.epsilon)
+
+        # pairs across a border are at most w apart in x
+        w = 2 * GRID_SIZE if best is None else best[0] + registry.epsilon
+        bands = [(type_name, int(b - w), int(b + w) + 1) for b in bounds[1:-1]]
+        parts = [] if best is None else [(best[2], best[3], best[0])]
+        best = _merge_pairs(parts + self._map(_closest_task, bands), registry.epsilon)
+        if best is None:
+            return None
+
+        _, _, a, b = best
+        if a[3] > b[3]:
+            a, b = b, a
+        return ((a[2], a[4], (a[0], a[1])), (b[2], b[4], (b[0], b[1])), best[0])
+
+    def batch_within_radius(self, centers: List[Tuple[int, int]], radii):
+        """Parallel POIRegistry.batch_within_radius."""
+        if isinstance(radii, (int, float)):
+            radii = [radii] * len(centers)
+        if len(radii) != len(centers):
+            raise ValueError("Need one radius per center.")
+        return self._batch("batch_within_radius", centers, lambda idx: [radii[i] for i in idx])
+
+    def batch_k_closest(self, centers: List[Tuple[int, int]], k: int):
+        """Parallel POIRegistry.batch_k_closest."""
+        return self._batch("batch_k_closest", centers, lambda idx: k)
+
+    def coverage_fairness_batch(self, thresholds: List[Tuple[int, int]]):
+        """Parallel POIRegistry.coverage_fairness_batch."""
+        vids = sorted(self.registry.visitors)
+        parts = max(1, min(self.workers, len(vids)))
+        starts = [vids[i * len(vids) // parts] for i in range(parts)] if vids else [0]
+        ranges = [(lo, hi, thresholds) for lo, hi in zip(starts, starts[1:] + [None])]
+        results = [[] for _ in thresholds]
+        # ranges are in id order, so concatenating keeps the serial order
+        for part in self._map(_coverage_task, ranges):
+            for out, rows in zip(results, part):
+                out.extend(rows)
+        return results
+
+    def _batch(self, method: str, centers, arg_for):
+        for c in centers:
+            self.registry._check_center(c)
+        # centres of the same cell go to the same worker
+        order = sorted(range(len(centers)), key=lambda i: (centers[i][0] // CELL_SIZE, centers[i][1] // CELL_SIZE, i))
+        n = max(1, min(len(order), self.workers * CHUNKS_PER_WORKER))
+        chunks = [order[i * len(order) // n:(i + 1) * len(order) // n] for i in range(n)]
+        out = [None] * len(centers)
+        tasks = [(method, [centers[i] for i in idx], arg_for(idx)) for idx in chunks]
+        for idx, rows in zip(chunks, self._map(_batch_task, tasks)):
+            for i, res in zip(idx, rows):
+                out[i] = res
+        return out
+
+    def _map(self, fn, tasks) -> list:
+        futures = [self._pool.submit(fn, self._path, *task) for task in tasks]
+        return [f.result() for f in futures]
@@ -0,0 +1,199 @@
+"""Local query server: one warm registry shared over a TCP or Unix socket.
+
+    python -m poi_system.server --config pois.yaml --port 7878
+    python -m poi_system.server --data-dir ./data --unix /tmp/poi.sock
+
+The wire format is the JSON Lines request/response format of ops.py, one
+object per line in each direction. A connection may pipeline requests;
+its responses come back in request order. Requests from all connections
+that arrive within BATCH_WINDOW of each other are executed together, so
+runs of radius and k-closest queries are answered by the batch APIs.
+"""
+import argparse
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from .config_loader import load_config
+from .exceptions import POIError
+from .ops import OPS, _response, execute, parse
+from .storage import POIRegistry
+
+# How long the dispatcher waits for more requests before executing a batch
+BATCH_WINDOW = 0.002
+MAX_BATCH = 4096
+LINE_LIMIT = 1 << 20
+
+class Batcher:
+    """Collects requests from every connection and executes them in batches.
+
+    Batches run one at a time in a worker thread, so the registry is never
+    used concurrently and the event loop keeps accepting requests meanwhile.
+    Unless `writable`, only the read-only operations are served.
+    """
+
+    def __init__(self, registry: POIRegistry, window: float = BATCH_WINDOW,
+                 max_batch: int = MAX_BATCH, writable: bool = False):
+        self.registry = registry
+        self.window = window
+        self.max_batch = max_batch
+        self.writable = writable
+        self.pending: List[Tuple[dict, asyncio.Future]] = []
+        self.requests = 0
+        self.batches = 0
+        self._wakeup = asyncio.Event()
+
+    def submit(self, request) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if not self.writable:
+            try:
+                number, _ = parse(request)
+            except Exception:
+                pass  # execute reports it
+            else:
+                if not OPS[number][2]:
+                    future.set_result(_response(request, number, error=POIError("Server is read-only.")))
+                    return future
+        self.pending.append((request, future))
+        self._wakeup.set()
+        return future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            if len(self.pending) < self.max_batch:
+                await asyncio.sleep(self.window)
+            batch = self.pending[:self.max_batch]
+            del self.pending[:self.max_batch]
+            if not self.pending:
+                self._wakeup.clear()
+            try:
+                responses = await loop.run_in_executor(None, execute, self.registry, [req for req, _ in batch])
+            except Exception as e:
+                # not retried: the batch may have applied some of its mutations
+                responses = [_response(req, None, error=e) for req, _ in batch]
+            self.requests += len(batch)
+            self.batches += 1
+            for (_, future), resp in zip(batch, responses):
+                if not future.done():
+                    future.set_result(resp)
+
+class POIServer:
+    """asyncio server around one registry; `await start()`, then `await close()`."""
+
+    def __init__(self, registry: POIRegistry, host: str = "127.0.0.1", port: int = 0,
+                 path: Optional[str] = None, **batch_options):
+        self.registry = registry
+        self.host, self.port, self.path = host, port, path
+        self.batch_options = batch_options
+        self.batcher: Optional[Batcher] = None
+        self._server = None
+        self._dispatcher = None
+        self._connections = {}  # handler task -> (writer, reply sender task)
+
+    async def start(self):
+        self.batcher = Batcher(self.registry, **self.batch_options)
+        self._dispatcher = asyncio.ensure_future(self.batcher.run())
+        if self.path:
+            self._server = await asyncio.start_unix_server(self._serve, self.path, limit=LINE_LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._serve, self.host, self.port, limit=LINE_LIMIT)
+        return self
+
+    @property
+    def address(self):
+        """The bound (host, port), or the socket path."""
+        return self.path or self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        # closing the transports ends each handler's read loop; pending replies are dropped
+        for writer, sender in self._connections.values():
+            writer.transport.abort()
+            sender.cancel()  # it may be waiting on a reply that never comes
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._dispatcher.cancel()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        replies: asyncio.Queue = asyncio.Queue()
+        sender = asyncio.ensure_future(self._send(replies, writer))
+        task = asyncio.current_task()
+        self._connections[task] = (writer, sender)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # line over LINE_LIMIT
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    done = asyncio.get_running_loop().create_future()
+                    done.set_result({"op": None, "error": f"Invalid JSON: {e}"})
+                    replies.put_nowait(done)
+                    continue
+                replies.put_nowait(self.batcher.submit(request))
+        finally:
+            replies.put_nowait(None)
+            try:
+                await sender
+            finally:
+                del self._connections[task]
+
+    async def _send(self, replies: asyncio.Queue, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                future = await replies.get()
+                if future is None:
+                    break
+                resp = await future
+                writer.write((json.dumps(resp, default=str, ensure_ascii=False, separators=(",", ":")) + "\n").encode())
+                if replies.empty():
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a POI registry over a local socket")
+    parser.add_argument("--config", action="append", default=[], help="load this config at startup (repeatable)")
+    parser.add_argument("--data-dir", help="serve the durable registry in this directory")
+    parser.add_argument("--cache-size", type=int, default=0, help="memoise up to this many query results")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--writable", action="store_true", help="also accept mutations (options 1-11)")
+    parser.add_argument("--window", type=float, default=BATCH_WINDOW, help="request coalescing window in seconds")
+    args = parser.parse_args(argv)
+
+    registry = POIRegistry.open(args.data_dir) if args.data_dir else POIRegistry()
+    if args.cache_size:
+        registry.enable_cache(args.cache_size)
+    for path in args.config:
+        load_config(path, registry)
+
+    async def serve():
+        server = await POIServer(registry, args.host, args.port, args.unix,
+                                 window=args.window, writable=args.writable).start()
+        print(f"Serving {len(registry.pois)} POIs on {server.address}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import multiprocessing
+from math import hypot
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .exceptions import POIError
+from .parallel import _merge_pairs
+from .spatial import find_closest_pair
+from .storage import POIRegistry
+from .utils import EPSILON, GRID_SIZE, in_bounds
+
+Rect = Tuple[int, int, int, int]  # x0, x1, y0, y1 (upper bounds exclusive)
+
+# Worker-side commands besides the registry's own methods
+
+def _can_delete_type(registry: POIRegistry, name: str):
+    # the checks of delete_poi_type, without deleting
+    registry._require_type(name)
+    if registry._by_type[name]:
+        raise POIError(f"Cannot delete type '{name}': there are existing POIs of this type.")
+
+def _points(registry: POIRegistry, type_name: Optional[str]):
+    if type_name is not None:
+        registry._require_type(type_name)
+    pois = registry.pois if type_name is None else registry._by_type[type_name]
+    return [(p.x, p.y, p.id, p.name) for p in pois.values()]
+
+def _closest(registry: POIRegistry, type_name: Optional[str]):
+    return find_closest_pair(_points(registry, type_name), registry.epsilon)
+
+def _border_points(registry: POIRegistry, type_name: Optional[str], rect: Rect, w: float):
+    """Points within `w` of an edge the tile shares with another tile."""
+    x0, x1, y0, y1 = rect
+    return [p for p in _points(registry, type_name)
+            if (x0 > 0 and p[0] <= x0 + w) or (x1 < GRID_SIZE and p[0] >= x1 - 1 - w)
+            or (y0 > 0 and p[1] <= y0 + w) or (y1 < GRID_SIZE and p[1] >= y1 - 1 - w)]
+
+_COMMANDS = {"_can_delete_type": _can_delete_type, "_closest": _closest, "_border_points": _border_points}
+
+def _shard_main(conn, epsilon: float):
+    registry = POIRegistry(epsilon)
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        name, args = msg
+        try:
+            fn = _COMMANDS.get(name)
+            conn.send((fn(registry, *args) if fn else getattr(registry, name)(*args), None))
+        except Exception as e:
+            conn.send((None, e))
+    conn.close()
+
+class ShardedRegistry:
+    """POIs split over a grid of map tiles, each tile a POIRegistry in its own process.
+
+    The router keeps what must hold across tiles: the used POI ids, which
+    tile owns each POI, and the order POIs were added in (which decides the
+    order of the two POIs returned by closest_pair). The schema is copied to
+    every tile. Queries go only to the tiles they can touch: radius queries
+    to the tiles within reach of the disc, k_closest best-first from the
+    nearest tile until no other tile can beat the current k-th result, and
+    closest_pair to every tile plus one pass over the points near tile
+    borders. Results equal POIRegistry's for the same operations.
+
+    Only POI types and POIs are sharded; visitors and visits are not
+    supported.
+    """
+
+    def __init__(self, shape: Tuple[int, int] = (2, 2), epsilon: float = EPSILON, mp_context=None):
+        tx, ty = shape
+        if tx < 1 or ty < 1:
+            raise ValueError("Need at least one tile per axis.")
+        self.shape = (tx, ty)
+        self.epsilon = float(epsilon)
+        self._tw = -(-GRID_SIZE // tx)
+        self._th = -(-GRID_SIZE // ty)
+        self.tiles: List[Rect] = [(i * self._tw, min(GRID_SIZE, (i + 1) * self._tw),
+                                   j * self._th, min(GRID_SIZE, (j + 1) * self._th))
+                                  for i in range(tx) for j in range(ty)]
+        self.used_poi_ids: set = set()
+        self._owner: Dict[int, int] = {}  # poi id -> tile
+        self._seq: Dict[int, int] = {}    # poi id -> insertion number
+        self._next_seq = 0
+        ctx = mp_context or multiprocessing.get_context()
+        self._conns = []
+        self._procs = []
+        for _ in self.tiles:
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_shard_main, args=(child, self.epsilon), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    @classmethod
+    def from_registry(cls, registry: POIRegistry, shape: Tuple[int, int] = (2, 2), mp_context=None) -> "ShardedRegistry":
+        """Sharded copy of the types and POIs of `registry`, ids used before included."""
+        sharded = cls(shape, registry.epsilon, mp_context)
+        for t in registry.poi_types.values():
+            sharded.add_poi_type(t.name, list(t.attributes))
+        sharded.bulk_add_pois((p.id, p.name, p.type_name, p.x, p.y, p.attributes) for p in registry.pois.values())
+        sharded.used_poi_ids |= registry.used_poi_ids
+        return sharded
+
+    def close(self):
+        for conn, proc in zip(self._conns, self._procs):
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            proc.join()
+            conn.close()
+        self._conns = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._owner)
+
+    def tile_of(self, x: int, y: int) -> int:
+        return (x // self._tw) * self.shape[1] + y // self._th
+
+    def _scatter(self, calls: List[Tuple[int, str, tuple]]) -> list:
+        # send every (tile, command, args) first so the tiles work in parallel, then collect
+        for t, name, args in calls:
+            self._conns[t].send((name, args))
+        results = [self._conns[t].recv() for t, _, _ in calls]
+        for _, error in results:
+            if error is not None:
+                raise error
+        return [result for result, _ in results]
+
+    def _fan_out(self, tiles: Iterable[int], name: str, *args) -> list:
+        return self._scatter([(t, name, args) for t in tiles])
+
+    def _broadcast(self, name: str, *args):
+        # the schema is the same everywhere, so every tile gives the same outcome
+        return self._fan_out(range(len(self.tiles)), name, *args)[0]
+
+    def _mindist(self, t: int, x0: float, y0: float) -> float:
+        x_lo, x_hi, y_lo, y_hi = self.tiles[t]
+        return hypot(max(x_lo - x0, 0, x0 - (x_hi - 1)), max(y_lo - y0, 0, y0 - (y_hi - 1)))
+
+    def _check_center(self, c0):
+        x0, y0 = c0
+        if not in_bounds(int(x0), int(y0)):
+            raise POIError("c0 must be within 0..999.")
+
+    # schema
+
+    def add_poi_type(self, name: str, attributes: Optional[List[str]] = None):
+        self._broadcast("add_poi_type", name, attributes)
+
+    def delete_poi_type(self, name: str):
+        self._fan_out(range(len(self.tiles)), "_can_delete_type", name)
+        self._broadcast("delete_poi_type", name)
+
+    def add_attribute(self, type_name: str, attr: str):
+        self._broadcast("add_attribute", type_name, attr)
+
+    def delete_attribute(self, type_name: str, attr: str):
+        self._broadcast("delete_attribute", type_name, attr)
+
+    def rename_attribute(self, type_name: str, old: str, new: str):
+        self._broadcast("rename_attribute", type_name, old, new)
+
+    def rename_type(self, old: str, new: str):
+        self._broadcast("rename_type", old, new)
+
+    # POIs
+
+    def _route(self, x, y) -> int:
+        # invalid coordinates go to tile 0, which rejects them with the usual errors
+        if isinstance(x, int) and isinstance(y, int) and in_bounds(x, y):
+            return self.tile_of(x, y)
+        return 0
+
+    def _added(self, id: int, tile: int):
+        self.used_poi_ids.add(id)
+        self._owner[id] = tile
+        self._seq[id] = self._next_seq
+        self._next_seq += 1
+
+    def add_poi(self, id: int, name: str, type_name: str, x: int, y: int, attributes: Optional[Dict[str, object]] = None):
+        if id in self.used_poi_ids:
+            raise POIError(f"POI id {id} has been used before and cannot be reused.")
+        tile = self._route(x, y)
+        self._fan_out([tile], "add_poi", id, name, type_name, x, y, attributes)
+        self._added(id, tile)
+
+    def bulk_add_pois(self, rows: Iterable[tuple]) -> List[Tuple[int, Exception]]:
+        """Add `(id, name, type_name, x, y, attributes)` rows, one bulk_add_pois per tile."""
+        rows = [tuple(row) for row in rows]
+        ids = [row[0] if row else None for row in rows]
+        if len(set(ids)) < len(ids) or any(len(row) < 5 for row in rows):
+            # whether a repeated id is accepted depends on the rows before it
+            errors = []
+            for i, row in enumerate(rows):
+                try:
+                    self.add_poi(*row)
+                except Exception as e:
+                    errors.append((i, e))
+            return errors
+
+        errors = []
+        by_tile: Dict[int, List[int]] = {}
+        for i, row in enumerate(rows):
+            if row[0] in self.used_poi_ids:
+                errors.append((i, POIError(f"POI id {row[0]} has been used before and cannot be reused.")))
+            else:
+                by_tile.setdefault(self._route(row[3], row[4]), []).append(i)
+        tiles = list(by_tile)
+        calls = [(t, "bulk_add_pois", ([rows[i] for i in by_tile[t]],)) for t in tiles]
+        for t, rejected in zip(tiles, self._scatter(calls)):
+            errors.extend((by_tile[t][j], e) for j, e in rejected)
+        errors.sort(key=lambda e: e[0])
+        failed = {i for i, _ in errors}
+        tile_of_row = {i: t for t in tiles for i in by_tile[t]}
+        # insertion order is row order, as in POIRegistry
+        for i in sorted(set(tile_of_row) - failed):
+            self._added(rows[i][0], tile_of_row[i])
+        return errors
+
+    def delete_poi(self, id: int):
+        tile = self._owner.get(id, 0)
+        self._fan_out([tile], "delete_poi", id)
+        del self._owner[id]
+        del self._seq[id]
+
+    # queries
+
+    def list_pois_by_type(self, type_name: str):
+        out = [row for part in self._fan_out(range(len(self.tiles)), "list_pois_by_type", type_name) for row in part]
+        out.sort(key=lambda x: (x[0], x[1]))
+        return out
+
+    def count_pois_per_type(self) -> List[Tuple[str, int]]:
+        totals: Dict[str, int] = {}
+        for part in self._fan_out(range(len(self.tiles)), "count_pois_per_type"):
+            for t, n in part:
+                totals[t] = totals.get(t, 0) + n
+        return sorted(totals.items())
+
+    def _disc_query(self, name: str, c0, r: float):
+        self._check_center(c0)
+        x0, y0 = c0
+        reach = r + self.epsilon
+        tiles = [t for t in range(len(self.tiles)) if self._mindist(t, x0, y0) <= reach] or [self.tile_of(int(x0), int(y0))]
+        out = [row for part in self._fan_out(tiles, name, c0, r) for row in part]
+        out.sort(key=lambda x: (x[4], x[0], x[1]))
+        return out
+
+    def pois_within_radius(self, c0: Tuple[int, int], r: float):
+        return self._disc_query("pois_within_radius", c0, r)
+
+    def at_exact_radius(self, c0: Tuple[int, int], r: float):
+        return self._disc_query("at_exact_radius", c0, r)
+
+    def k_closest(self, c0: Tuple[int, int], k: int):
+        self._check_center(c0)
+        if k <= 0:
+            return []
+        x0, y0 = c0
+        order = sorted(range(len(self.tiles)), key=lambda t: (self._mindist(t, x0, y0), t))
+        best: list = []
+        for t in order:
+            # no point of this tile (or of any later one) can beat the k-th
+            if len(best) >= k and self._mindist(t, x0, y0) > best[-1][4] + self.epsilon:
+                break
+            best = sorted(best + self._fan_out([t], "k_closest", c0, k)[0], key=lambda x: (x[4], x[0]))[:k]
+        return best
+
+    def closest_pair(self, type_name: Optional[str] = None):
+        eps = self.epsilon
+        tiles = range(len(self.tiles))
+        parts = self._fan_out(tiles, "_closest", type_name)
+        best = _merge_pairs(parts, eps)
+
+        # a pair across tiles has both points within w of their tiles' shared borders
+        if len(self.tiles) > 1:
+            w = 2 * GRID_SIZE if best is None else best[0] + eps
+            border = [p for part in self._scatter([(t, "_border_points", (type_name, self.tiles[t], w)) for t in tiles])
+                      for p in part]
+            parts = [] if best is None else [(best[2], best[3], best[0])]
+            best = _merge_pairs(parts + [find_closest_pair(border, eps)], eps)
+        if best is None:
+            return None
+
+        _, _, a, b = best
+        if self._seq[a[2]] > self._seq[b[2]]:
+            a, b = b, a
+        return ((a[2], a[3], (a[0], a[1])), (b[2], b[3], (b[0], b[1])), best[0])
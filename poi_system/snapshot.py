@@ -0,0 +1,166 @@
+import json, mmap, os, pickle, struct, sys
+from array import array
+from typing import Dict, List, Tuple
+
+from .exceptions import ConfigError
+
+# Layout (all header fields little-endian):
+#   header   magic, format version, number of sections
+#   table    one (name, offset, length) entry per section
+#   sections each padded to 8 bytes so numeric columns can be cast in place
+# Numeric columns are native `array` dumps; `meta.byteorder` records which.
+MAGIC = b"POISNAP1"
+VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<8sQQ")
+
+def _json(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def save_snapshot(registry, path: str, meta: Dict[str, object] = None):
+    """Write `registry` to `path` as a binary snapshot (atomically replaced)."""
+    type_codes = {name: i for i, name in enumerate(registry.poi_types)}
+    pois = list(registry.pois.values())
+
+    visits = registry._visits
+
+    info = {"byteorder": sys.byteorder, "epsilon": registry.epsilon,
+            "attr_indexes": registry.attribute_indexes()}
+    info.update(meta or {})
+    sections: List[Tuple[bytes, bytes]] = [
+        (b"meta", _json(info)),
+        (b"types", _json([[t.name, t.attributes] for t in registry.poi_types.values()])),
+        (b"poi_id", array("q", [p.id for p in pois]).tobytes()),
+        (b"poi_x", array("H", [p.x for p in pois]).tobytes()),
+        (b"poi_y", array("H", [p.y for p in pois]).tobytes()),
+        (b"poi_type", array("I", [type_codes[p.type_name] for p in pois]).tobytes()),
+        (b"poi_name", _json([p.name for p in pois])),
+        # attribute values are whatever the config held (YAML may give dates etc.)
+        (b"poi_attr", pickle.dumps([p.attributes for p in pois], protocol=pickle.HIGHEST_PROTOCOL)),
+        (b"used_ids", array("q", sorted(registry.used_poi_ids)).tobytes()),
+        (b"vis_id", array("q", list(registry.visitors)).tobytes()),
+        (b"vis_text", _json([[v.name, v.nationality] for v in registry.visitors.values()])),
+        (b"dates", _json(visits.date_strings)),
+        (b"v_vid", visits.visitor_ids.tobytes()),
+        (b"v_pid", visits.poi_ids.tobytes()),
+        (b"v_date", visits.date_codes.tobytes()),
+        (b"v_rate", visits.ratings.tobytes()),
+    ]
+
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    table = []
+    for name, blob in sections:
+        offset += -offset % 8
+        table.append(_ENTRY.pack(name, offset, len(blob)))
+        offset += len(blob)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+        f.write(b"".join(table))
+        for name, blob in sections:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class _Reader:
+    """Sections of a memory-mapped snapshot; numeric columns are zero-copy views."""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise ConfigError(f"File not found: {path}")
+        if os.path.getsize(path) < _HEADER.size:
+            raise ConfigError(f"Not a POI snapshot: {path}")
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.map)
+        self.views = []
+        magic, version, count = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ConfigError(f"Not a POI snapshot (or unsupported version): {path}")
+        self.sections = {}
+        for i in range(count):
+            name, off, length = _ENTRY.unpack_from(self.buf, _HEADER.size + i * _ENTRY.size)
+            self.sections[name.rstrip(b"\0").decode()] = (off, length)
+        self.meta = self.json("meta")
+        self.swap = self.meta.get("byteorder", sys.byteorder) != sys.byteorder
+
+    def raw(self, name: str) -> memoryview:
+        off, length = self.sections[name]
+        view = self.buf[off:off + length]
+        self.views.append(view)
+        return view
+
+    def column(self, name: str, typecode: str):
+        if self.swap:
+            col = array(typecode, self.raw(name))
+            col.byteswap()
+            return col
+        view = self.raw(name).cast(typecode)
+        self.views.append(view)
+        return view
+
+    def json(self, name: str):
+        return json.loads(bytes(self.raw(name)))
+
+    def pickled(self, name: str):
+        return pickle.loads(self.raw(name))
+
+    def close(self, keep=()):
+        """Release the views, except `keep`; the file stays mapped while those live."""
+        kept = {id(view) for view in keep}
+        for view in reversed(self.views):
+            if id(view) not in kept:
+                view.release()
+        self.buf.release()
+        if not kept:
+            self.map.close()
+
+def load_snapshot(path: str, registry_factory):
+    """Build a registry from a snapshot written by save_snapshot.
+
+    `registry_factory(epsilon=...)` creates the empty registry. Snapshots
+    are trusted files: the attribute section is pickled.
+    """
+    snap = _Reader(path)
+    visit_columns = ()
+    try:
+        registry = registry_factory(epsilon=snap.meta["epsilon"])
+        types = snap.json("types")
+        for name, attrs in types:
+            registry.add_poi_type(name, attrs)
+
+        type_names = [name for name, _ in types]
+        names, attrs = snap.json("poi_name"), snap.pickled("poi_attr")
+        rows = zip(snap.column("poi_id", "q"), names, snap.column("poi_type", "I"),
+                   snap.column("poi_x", "H"), snap.column("poi_y", "H"), attrs)
+        registry.bulk_add_pois([(pid, name, type_names[code], x, y, a)
+                                for pid, name, code, x, y, a in rows])
+        registry.used_poi_ids.update(snap.column("used_ids", "q"))
+        for type_name, attr in snap.meta.get("attr_indexes", []):
+            registry.create_attribute_index(type_name, attr)
+
+        for vid, (name, nat) in zip(snap.column("vis_id", "q"), snap.json("vis_text")):
+            registry.add_visitor(vid, name, nat)
+
+        # the store uses the visit columns in place (until its first append); they
+        # were validated when first added and may point at POIs deleted since
+        visit_columns = (snap.column("v_vid", "q"), snap.column("v_pid", "q"),
+                         snap.column("v_date", "I"), snap.column("v_rate", "b"))
+        registry._load_visit_columns(*visit_columns, snap.json("dates"))
+        return registry
+    except BaseException:
+        visit_columns = ()
+        raise
+    finally:
+        snap.close(keep=visit_columns)
+
+def read_snapshot_meta(path: str) -> Dict[str, object]:
+    snap = _Reader(path)
+    try:
+        return snap.meta
+    finally:
+        snap.close()
@@ -0,0 +1,221 @@
+from heapq import heappush, heapreplace
+from math import floor, hypot, isqrt
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .model import POI
+from .utils import GRID_SIZE, EPSILON
+
+# Side of a grid cell in map units; 1000/20 = 50x50 buckets
+CELL_SIZE = 20
+
+# Widest range of integer squared radii at_exact_radius walks as lattice
+# circles before falling back to scanning the cells of the ring
+LATTICE_MAX_CIRCLES = 16
+
+# Slack added to cell pruning bounds so float rounding in hypot can never
+# drop a cell that holds a matching point
+_CELL_SLACK = 1e-7
+
+class GridIndex:
+    """Uniform grid of cell buckets over the 1000x1000 map."""
+
+    def __init__(self, cell_size: int = CELL_SIZE):
+        self.cell_size = cell_size
+        self.ncells = (GRID_SIZE + cell_size - 1) // cell_size
+        self.cells: List[Dict[int, POI]] = [{} for _ in range(self.ncells * self.ncells)]
+        # coordinate hash for exact lattice lookups
+        self.at: Dict[Tuple[int,int], Dict[int, POI]] = {}
+        # POIs handed out by within/nearest/on_circles (for instrumentation)
+        self.scanned = 0
+
+    def _cell(self, x: int, y: int) -> int:
+        return (x // self.cell_size) * self.ncells + (y // self.cell_size)
+
+    def add(self, poi: POI):
+        self.cells[self._cell(poi.x, poi.y)][poi.id] = poi
+        self.at.setdefault((poi.x, poi.y), {})[poi.id] = poi
+
+    def remove(self, poi: POI):
+        self.cells[self._cell(poi.x, poi.y)].pop(poi.id, None)
+        here = self.at.get((poi.x, poi.y))
+        if here is not None:
+            here.pop(poi.id, None)
+            if not here:
+                del self.at[(poi.x, poi.y)]
+
+    def within(self, x0: float, y0: float, outer: float, inner: float = None) -> Iterator[POI]:
+        """POIs in every cell overlapping the disc of radius `outer` around (x0,y0).
+
+        If `inner` is given, cells lying entirely inside the disc of radius
+        `inner` are skipped as well. The result is a superset of the matching
+        points; callers still apply their exact predicate.
+        """
+        for cell in self._cells_within(x0, y0, outer, inner):
+            yield from cell.values()
+
+    def count_within(self, x0: float, y0: float, outer: float) -> int:
+        """Number of POIs within(x0, y0, outer) would yield."""
+        return sum(len(cell) for cell in self._cells_within(x0, y0, outer))
+
+    def _cells_within(self, x0: float, y0: float, outer: float, inner: float = None) -> Iterator[Dict[int, POI]]:
+        if not outer >= 0:  # also rejects NaN
+            return
+        cs, n = self.cell_size, self.ncells
+        # no two map points are 2*GRID_SIZE apart, and inf would overflow floor()
+        outer = min(outer, 2 * GRID_SIZE) + _CELL_SLACK
+        lo_x = max(0, floor((x0 - outer) / cs))
+        hi_x = min(n - 1, floor((x0 + outer) / cs))
+        lo_y = max(0, floor((y0 - outer) / cs))
+        hi_y = min(n - 1, floor((y0 + outer) / cs))
+        if inner is not None:
+            inner -= _CELL_SLACK
+        for cx in range(lo_x, hi_x + 1):
+            x_min, x_max = cx * cs, cx * cs + cs - 1
+            near_x = max(0, x_min - x0, x0 - x_max)
+            far_x = max(abs(x0 - x_min), abs(x0 - x_max))
+            row = cx * n
+            for cy in range(lo_y, hi_y + 1):
+                y_min, y_max = cy * cs, cy * cs + cs - 1
+                near_y = max(0, y_min - y0, y0 - y_max)
+                if hypot(near_x, near_y) > outer:
+                    continue
+                if inner is not None:
+                    far_y = max(abs(y0 - y_min), abs(y0 - y_max))
+                    if hypot(far_x, far_y) < inner:
+                        continue
+                cell = self.cells[row + cy]
+                self.scanned += len(cell)
+                yield cell
+
+    def on_circles(self, x0: int, y0: int, lo: int, hi: int) -> Iterator[POI]:
+        """POIs whose integer squared distance to (x0,y0) lies in [lo, hi].
+
+        Enumerates the lattice points on each circle dx^2 + dy^2 = d2 and
+        looks them up in the coordinate hash, so the cost depends on the
+        radius, not on how many POIs are stored.
+        """
+        at = self.at
+        for d2 in range(max(0, lo), hi + 1):
+            for dx in range(isqrt(d2) + 1):
+                rest = d2 - dx * dx
+                dy = isqrt(rest)
+                if dy * dy != rest:
+                    continue
+                for pt in {(x0 + dx, y0 + dy), (x0 - dx, y0 + dy), (x0 + dx, y0 - dy), (x0 - dx, y0 - dy)}:
+                    here = at.get(pt)
+                    if here:
+                        self.scanned += len(here)
+                        yield from here.values()
+
+    def nearest(self, x0: float, y0: float, k: int, accept: Optional[Callable[[POI], bool]] = None) -> List[Tuple[float, POI]]:
+        """The k POIs closest to (x0,y0) as `(distance, poi)`, ordered by distance then id.
+
+        Only POIs for which `accept(poi)` is true count, if it is given.
+
+        Cells are visited in square rings around the cell of (x0,y0) while a
+        bounded max-heap keeps the best k; the search stops once no unvisited
+        cell can hold a point closer than the current k-th.
+        """
+        if k <= 0:
+            return []
+        cs, n = self.cell_size, self.ncells
+        cx0 = min(n - 1, max(0, floor(x0 / cs)))
+        cy0 = min(n - 1, max(0, floor(y0 / cs)))
+        heap = []  # (-d, -id, poi): the root is the current k-th best
+        ring = 0
+        while True:
+            for idx in self._ring(cx0, cy0, ring):
+                cell = self.cells[idx]
+                self.scanned += len(cell)
+                for p in cell.values():
+                    if accept is not None and not accept(p):
+                        continue
+                    item = (-hypot(x0 - p.x, y0 - p.y), -p.id, p)
+                    if len(heap) < k:
+                        heappush(heap, item)
+                    elif item > heap[0]:
+                        heapreplace(heap, item)
+
+            # smallest distance any point outside the visited square can have
+            gaps = []
+            if cx0 - ring > 0:
+                gaps.append(x0 - ((cx0 - ring) * cs - 1))
+            if cx0 + ring < n - 1:
+                gaps.append((cx0 + ring + 1) * cs - x0)
+            if cy0 - ring > 0:
+                gaps.append(y0 - ((cy0 - ring) * cs - 1))
+            if cy0 + ring < n - 1:
+                gaps.append((cy0 + ring + 1) * cs - y0)
+            if not gaps or (len(heap) == k and -heap[0][0] < min(gaps)):
+                break
+            ring += 1
+
+        heap.sort(reverse=True)
+        return [(-d, p) for d, _, p in heap]
+
+    def _ring(self, cx0: int, cy0: int, ring: int) -> Iterator[int]:
+        # indexes of the in-bounds cells at Chebyshev distance `ring` from (cx0,cy0)
+        n = self.ncells
+        if ring == 0:
+            yield cx0 * n + cy0
+            return
+        lo_y, hi_y = max(0, cy0 - ring), min(n - 1, cy0 + ring)
+        for cx in (cx0 - ring, cx0 + ring):
+            if 0 <= cx < n:
+                for cy in range(lo_y, hi_y + 1):
+                    yield cx * n + cy
+        for cx in range(max(0, cx0 - ring + 1), min(n - 1, cx0 + ring - 1) + 1):
+            for cy in (cy0 - ring, cy0 + ring):
+                if 0 <= cy < n:
+                    yield cx * n + cy
+
+def _by_y(p):
+    return p[1]
+
+def find_closest_pair(points: List[tuple], eps: float = EPSILON) -> Optional[tuple]:
+    """Closest pair of `(x, y, id, ...)` points by divide and conquer, O(n log n).
+
+    A pair wins if it is closer by more than `eps`; pairs whose distances
+    are within `eps` of each other go to the smallest (min id, max id).
+    Returns `(p, q, d)` or None when there are fewer than two points.
+    """
+    if len(points) < 2:
+        return None
+    px = sorted(points)
+    best = None  # (d, (min id, max id), p, q)
+
+    def consider(p, q):
+        nonlocal best
+        d = hypot(p[0] - q[0], p[1] - q[1])
+        key = (p[2], q[2]) if p[2] < q[2] else (q[2], p[2])
+        if best is None or d < best[0] - eps or (abs(d - best[0]) <= eps and key < best[1]):
+            best = (d, key, p, q)
+
+    def solve(lo, hi):
+        # returns px[lo:hi] sorted by y
+        if hi - lo <= 3:
+            pts = px[lo:hi]
+            for i in range(len(pts)):
+                for j in range(i + 1, len(pts)):
+                    consider(pts[i], pts[j])
+            pts.sort(key=_by_y)
+            return pts
+        mid = (lo + hi) // 2
+        xm = px[mid][0]
+        merged = solve(lo, mid) + solve(mid, hi)
+        merged.sort(key=_by_y)  # two sorted runs, merged in linear time
+
+        # pairs straddling the split; widened by eps so ties are not missed
+        w = best[0] + eps
+        strip = [p for p in merged if abs(p[0] - xm) <= w]
+        for i in range(len(strip)):
+            p = strip[i]
+            for j in range(i + 1, len(strip)):
+                q = strip[j]
+                if q[1] - p[1] > best[0] + eps:
+                    break
+                consider(p, q)
+        return merged
+
+    solve(0, len(px))
+    return best[2], best[3], best[0]
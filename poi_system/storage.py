@@ -1,21 +1,80 @@
-import datetime
-from typing import Dict, List, Optional, Tuple
-from collections import defaultdict
+import datetime, heapq
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections.abc import Mapping
 
 from .model import POIType, POI, Visitor, Visit
 from .exceptions import POIError
-from .utils import distance, feq, fle, EPSILON, in_bounds
+from .utils import distance, feq, fle, sq_bounds, EPSILON, ID_MAX, ID_MIN, in_bounds
+from . import batch
+from .attr_index import AttributeIndex, matches
+from .cache import QueryCache, CacheInfo, cached, disc_region, knn_region
+from .instrument import Instrumentation
+from .columns import DATE_FORMAT, VisitStore, VisitsByVisitor
+from .leaderboard import Leaderboard
+from .spatial import GridIndex, find_closest_pair, LATTICE_MAX_CIRCLES
+from .snapshot import save_snapshot, load_snapshot
+from .wal import OperationLog, open_registry
+
+def _ordinal(date: str) -> int:
+    try:
+        return datetime.datetime.strptime(date, DATE_FORMAT).date().toordinal()
+    except (TypeError, ValueError):
+        raise POIError(f"Invalid date (expected dd/mm/yyyy): {date}") from None
+
+def _check_id(kind: str, id: int):
+    if isinstance(id, int) and not ID_MIN <= id <= ID_MAX:
+        raise POIError(f"{kind} id {id} is out of range (ids must fit in 64 bits).")
+
+def _top_counts(counts: Dict[int, int], ids: Iterable[int], k: int) -> List[Tuple[int, int]]:
+    # count descending, then id; ids without any count fill up the tail with 0
+    top = heapq.nsmallest(k, counts.items(), key=lambda e: (-e[1], e[0]))
+    if len(top) < k:
+        top += [(i, 0) for i in heapq.nsmallest(k - len(top), (i for i in ids if i not in counts))]
+    return top
 
 class POIRegistry:
 
-    def __init__(self, epsilon: float = EPSILON):
+    def __init__(self, epsilon: float = EPSILON, cache_size: int = 0):
         self.epsilon = float(epsilon)
         self.poi_types: Dict[str, POIType] = {}
         self.pois: Dict[int, POI] = {}
         self.used_poi_ids: set[int] = set()  # "never reused" history
         self.visitors: Dict[int, Visitor] = {}
-        # if key doesn't exist, WHO CARES?????? just return empty list
-        self.visits_by_visitor: Dict[int, List[Visit]] = defaultdict(list)
+        # visits live in columns; visits_by_visitor is a read-only view over them
+        self._visits = VisitStore()
+        self.visits_by_visitor: Mapping[int, List[Visit]] = VisitsByVisitor(self._visits)
+        # cell buckets over the map, kept in sync by add_poi/delete_poi
+        self._grid = GridIndex()
+        # type name -> {poi id: POI}, one entry per existing type
+        self._by_type: Dict[str, Dict[int, POI]] = {}
+        # opt-in attribute indexes, type name -> {attribute -> index}
+        self._attr_indexes: Dict[str, Dict[str, AttributeIndex]] = {}
+        # live visit aggregates, value = number of visits behind each entry:
+        # visitor -> {poi id} (deleted POIs keep counting, as in the raw visits),
+        # existing POI -> {visitor id}, visitor -> {type of an existing visited POI}
+        self._pois_of_visitor: Dict[int, Dict[int, int]] = {}
+        self._visitors_of_poi: Dict[int, Dict[int, int]] = {}
+        self._types_of_visitor: Dict[int, Dict[str, int]] = {}
+        # distinct-count rankings behind the top-k queries
+        self._visitor_board = Leaderboard()
+        self._poi_board = Leaderboard()
+        # first visit row not yet counted in the aggregates (rows loaded from
+        # a snapshot are folded in on first use, see _fold_visits)
+        self._unfolded: Optional[int] = None
+        # coordinate columns for the batch queries, rebuilt after POI changes
+        self._coords = None
+        # operation log of a durable registry, see POIRegistry.open
+        self._log: Optional[OperationLog] = None
+        # memoised query results, see enable_cache
+        self._cache: Optional[QueryCache] = None
+        if cache_size:
+            self.enable_cache(cache_size)
+        # rows examined by non-grid query paths (the grid counts its own) and
+        # query_pois candidate sources, read by the instrumentation
+        self._scanned = 0
+        self._query_plans: Dict[str, int] = {}
+        self._instr: Optional[Instrumentation] = None
 
     def add_poi_type(self, name: str, attributes: Optional[List[str]] = None):
         if not name or not name.strip():
@@ -31,17 +90,23 @@ class POIRegistry:
                 seen.add(a)
                 attrs.append(a)
         self.poi_types[name] = POIType(name=name, attributes=attrs)
+        self._by_type[name] = {}
+        self._invalidate("schema")
+        self._log_op("add_poi_type", (name, attrs))
 
     def delete_poi_type(self, name: str):
         if name not in self.poi_types:
             raise POIError(f"Type '{name}' does not exist.")
 
         # Constraint: delete only if no POIs of that type exist
-        for p in self.pois.values():
-            if p.type_name == name:
-                raise POIError(f"Cannot delete type '{name}': there are existing POIs of this type.")
+        if self._by_type[name]:
+            raise POIError(f"Cannot delete type '{name}': there are existing POIs of this type.")
 
         del self.poi_types[name]
+        del self._by_type[name]
+        self._attr_indexes.pop(name, None)
+        self._invalidate("schema")
+        self._log_op("delete_poi_type", (name,))
 
     def add_attribute(self, type_name: str, attr: str):
         t = self._require_type(type_name)
@@ -50,20 +115,23 @@ class POIRegistry:
         t.attributes.append(attr)
 
         # Existing POIs of this type get None for the new attribute
-        for poi in self.pois.values():
-            if poi.type_name == type_name:
-                poi.attributes.setdefault(attr, None)
+        for poi in self._by_type[type_name].values():
+            poi.attributes.setdefault(attr, None)
+        self._invalidate("schema")
+        self._log_op("add_attribute", (type_name, attr))
 
     def delete_attribute(self, type_name: str, attr: str):
         t = self._require_type(type_name)
         if attr not in t.attributes:
             return
         t.attributes.remove(attr)
+        self._attr_indexes.get(type_name, {}).pop(attr, None)
 
         # Remove attribute from existing POIs
-        for poi in self.pois.values():
-            if poi.type_name == type_name:
-                poi.attributes.pop(attr, None)
+        for poi in self._by_type[type_name].values():
+            poi.attributes.pop(attr, None)
+        self._invalidate("schema")
+        self._log_op("delete_attribute", (type_name, attr))
 
     # Optional extension
     def rename_attribute(self, type_name: str, old: str, new: str):
@@ -77,14 +145,20 @@ class POIRegistry:
         # rename in schema
         idx = t.attributes.index(old)
         t.attributes[idx] = new
+        indexes = self._attr_indexes.get(type_name, {})
+        if old in indexes:
+            # POIs without `old` indexed as None and get None for `new`
+            index = indexes[new] = indexes.pop(old)
+            index.attr = new
 
         # migrate all POIs
-        for poi in self.pois.values():
-            if poi.type_name == type_name:
-                if old in poi.attributes:
-                    poi.attributes[new] = poi.attributes.pop(old)
-                else:
-                    poi.attributes.setdefault(new, None)
+        for poi in self._by_type[type_name].values():
+            if old in poi.attributes:
+                poi.attributes[new] = poi.attributes.pop(old)
+            else:
+                poi.attributes.setdefault(new, None)
+        self._invalidate("schema")
+        self._log_op("rename_attribute", (type_name, old, new))
 
     # Optional extension
     def rename_type(self, old: str, new: str):
@@ -92,14 +166,70 @@ class POIRegistry:
             raise POIError(f"Type '{old}' not found.")
         if new in self.poi_types:
             raise POIError(f"Type '{new}' already exists.")
+        self._fold_visits()
         t = self.poi_types.pop(old)
 
         self.poi_types[new] = POIType(name=new, attributes=list(t.attributes))
-        for poi in self.pois.values():
-            if poi.type_name == old:
-                poi.type_name = new
+        members = self._by_type.pop(old)
+        visitors = set()
+        for poi in members.values():
+            poi.type_name = new
+            visitors.update(self._visitors_of_poi[poi.id])
+        self._by_type[new] = members
+        if old in self._attr_indexes:
+            self._attr_indexes[new] = self._attr_indexes.pop(old)
+        for vid in visitors:
+            types = self._types_of_visitor[vid]
+            types[new] = types.pop(old)
+        self._coords = None
+        self._invalidate("schema", "type_names")
+        self._log_op("rename_type", (old, new))
 
     def add_poi(self, id: int, name: str, type_name: str, x: int, y: int, attributes: Optional[Dict[str, object]] = None):
+        poi = self._new_poi(id, name, type_name, x, y, attributes)
+        self._grid.add(poi)
+        self._by_type[type_name][id] = poi
+        for index in self._attr_indexes.get(type_name, {}).values():
+            index.add(poi)
+        self._visitors_of_poi[id] = {}
+        self._poi_board.add(id)
+        self._coords = None
+        self._invalidate("poi", points=((x, y),))
+        self._log_op("add_poi", (id, name, type_name, x, y, dict(poi.attributes)))
+
+    def bulk_add_pois(self, rows: Iterable[tuple]) -> List[Tuple[int, Exception]]:
+        """Add `(id, name, type_name, x, y, attributes)` rows in one batch.
+
+        Rows are validated exactly like add_poi; rejected rows are returned as
+        `(row index, error)` and the rest are indexed once at the end.
+        """
+        errors = []
+        added = []
+        for i, row in enumerate(rows):
+            try:
+                added.append(self._new_poi(*row))
+            except Exception as e:
+                errors.append((i, e))
+
+        for poi in added:
+            self._grid.add(poi)
+            self._by_type[poi.type_name][poi.id] = poi
+            self._visitors_of_poi[poi.id] = {}
+        for type_name, indexes in self._attr_indexes.items():
+            if indexes:
+                batch = [poi for poi in added if poi.type_name == type_name]
+                for index in indexes.values():
+                    index.extend(batch)
+        self._poi_board.extend(poi.id for poi in added)
+        self._coords = None
+        if added:
+            self._invalidate("poi", points=tuple((p.x, p.y) for p in added))
+            self._log_op("bulk_add_pois", ([(p.id, p.name, p.type_name, p.x, p.y, dict(p.attributes)) for p in added],))
+        return errors
+
+    def _new_poi(self, id: int, name: str, type_name: str, x: int, y: int, attributes: Optional[Dict[str, object]] = None) -> POI:
+        # validates and stores the POI; secondary indexes are up to the caller
+        _check_id("POI", id)
         if id in self.used_poi_ids:
             raise POIError(f"POI id {id} has been used before and cannot be reused.")
         if id in self.pois:
@@ -118,71 +248,267 @@ class POIRegistry:
         for a in t.attributes:
             poi_attrs.setdefault(a, None)
 
-        self.pois[id] = POI(id=id, name=name, type_name=type_name, x=x, y=y, attributes=poi_attrs)
+        # type_name shares the schema's string instead of one copy per POI
+        poi = POI(id=id, name=name, type_name=t.name, x=x, y=y, attributes=poi_attrs)
+        self.pois[id] = poi
         self.used_poi_ids.add(id)
+        return poi
 
     def delete_poi(self, id: int):
         if id not in self.pois:
             raise POIError(f"POI id {id} not found.")
-        del self.pois[id]
+        self._fold_visits()
+        poi = self.pois.pop(id)
+        self._grid.remove(poi)
+        del self._by_type[poi.type_name][id]
+        for index in self._attr_indexes.get(poi.type_name, {}).values():
+            index.remove(poi)
+        self._poi_board.remove(id)
+        self._coords = None
+        for vid in self._visitors_of_poi.pop(id):
+            types = self._types_of_visitor[vid]
+            types[poi.type_name] -= 1
+            if not types[poi.type_name]:
+                del types[poi.type_name]
         # note: id remains in used_poi_ids and cannot be reused
+        self._invalidate("poi", points=((poi.x, poi.y),))
+        self._log_op("delete_poi", (id,))
 
     def add_visitor(self, id: int, name: str, nationality: str):
+        _check_id("Visitor", id)
         if id in self.visitors:
             raise POIError(f"Visitor id {id} already exists.")
         self.visitors[id] = Visitor(id=id, name=name, nationality=nationality)
+        self._pois_of_visitor[id] = {}
+        self._types_of_visitor[id] = {}
+        self._visitor_board.add(id)
+        self._invalidate("visit")
+        self._log_op("add_visitor", (id, name, nationality))
 
     def add_visit(self, visitor_id: int, poi_id: int, date: str, rating: Optional[int] = None):
+        code = self._check_visit(visitor_id, poi_id, date, rating)
+        self._fold_visits()
+        self._visits.append(visitor_id, poi_id, code, rating)
+        new_poi, new_visitor = self._count_visit(visitor_id, poi_id)
+        if new_poi:
+            self._visitor_board.increment(visitor_id)
+        if new_visitor:
+            self._poi_board.increment(poi_id)
+        self._invalidate("visit")
+        self._log_op("add_visit", (visitor_id, poi_id, date, rating))
+
+    def bulk_add_visits(self, rows: Iterable[tuple]) -> List[Tuple[int, Exception]]:
+        """Add `(visitor_id, poi_id, date, rating)` rows in one batch.
+
+        Rows are validated exactly like add_visit, but each distinct date
+        string is parsed only once and the leaderboards are updated once at
+        the end. Rejected rows are returned as `(row index, error)`.
+        """
+        errors = []
+        accepted = []
+        self._fold_visits()
+        start = len(self._visits)
+        for i, row in enumerate(rows):
+            try:
+                visitor_id, poi_id, date, rating = row
+                code = self._check_visit(visitor_id, poi_id, date, rating)
+            except Exception as e:
+                errors.append((i, e))
+                continue
+            self._visits.append(visitor_id, poi_id, code, rating)
+            accepted.append(row)
+
+        self._count_rows(start)
+        self._invalidate("visit")
+        if accepted:
+            self._log_op("bulk_add_visits", ([tuple(row) for row in accepted],))
+        return errors
+
+    def _count_rows(self, start: int):
+        # folds visit rows start.. of the store into the aggregates; rows may
+        # reference POIs deleted since (e.g. from a snapshot), which count
+        # like any other past visit
+        moved_visitors, moved_pois = [], []
+        vids, pids = self._visits.visitor_ids, self._visits.poi_ids
+        for row in range(start, len(vids)):
+            visitor_id, poi_id = vids[row], pids[row]
+            new_poi, new_visitor = self._count_visit(visitor_id, poi_id)
+            if new_poi:
+                moved_visitors.append(visitor_id)
+            if new_visitor:
+                moved_pois.append(poi_id)
+
+        self._visitor_board.increment_many(moved_visitors)
+        self._poi_board.increment_many(moved_pois)
+
+    def _load_visit_columns(self, visitor_ids, poi_ids, date_codes, ratings, date_strings: List[str]):
+        start = len(self._visits)
+        self._visits.extend_columns(visitor_ids, poi_ids, date_codes, ratings, date_strings)
+        if self._unfolded is None:
+            self._unfolded = start
+        self._invalidate("visit")
+
+    def _fold_visits(self):
+        # brings the aggregates up to date; the answers they give do not
+        # change, so cached results stay valid
+        if self._unfolded is not None:
+            start, self._unfolded = self._unfolded, None
+            self._count_rows(start)
+
+    def _settle(self):
+        """Build everything that is otherwise built on first use, so reads never write."""
+        self._fold_visits()
+        self._visits.index()
+
+    def _check_visit(self, visitor_id: int, poi_id: int, date: str, rating: Optional[int]) -> int:
+        # validates a visit and returns the interned date code
         if visitor_id not in self.visitors:
             raise POIError(f"Visitor {visitor_id} not found.")
         if poi_id not in self.pois:
             raise POIError(f"POI {poi_id} not found.")
 
-        datetime.datetime.strptime(date, "%d/%m/%Y")
+        code = self._visits.date_code(date)
         if rating is not None:
             if not (isinstance(rating, int) and 1 <= rating <= 10):
                 raise POIError("Rating must be integer 1..10 if provided.")
-        self.visits_by_visitor[visitor_id].append(Visit(visitor_id=visitor_id, poi_id=poi_id, date=date, rating=rating))
+        return code
+
+    def _count_visit(self, visitor_id: int, poi_id: int) -> Tuple[bool, bool]:
+        # updates the aggregates for a stored visit; returns whether it is the
+        # visitor's first visit to this POI and the POI's first by this visitor
+        pois = self._pois_of_visitor[visitor_id]
+        new_poi = poi_id not in pois
+        pois[poi_id] = pois.get(poi_id, 0) + 1
+        visitors = self._visitors_of_poi.get(poi_id)
+        if visitors is None:  # POI deleted since
+            return new_poi, False
+        if new_poi:
+            types = self._types_of_visitor[visitor_id]
+            type_name = self.pois[poi_id].type_name
+            types[type_name] = types.get(type_name, 0) + 1
+        new_visitor = visitor_id not in visitors
+        visitors[visitor_id] = visitors.get(visitor_id, 0) + 1
+        return new_poi, new_visitor
+
+    @classmethod
+    def open(cls, directory: str, epsilon: Optional[float] = None, **log_options) -> "POIRegistry":
+        """Durable registry kept in `directory`.
+
+        Recovers from the last checkpoint snapshot plus the log tail, then
+        appends every mutation to the operation log (see wal.OperationLog
+        for `log_options`). Call close() when done.
+        """
+        return open_registry(cls, directory, epsilon, **log_options)
+
+    def checkpoint(self):
+        """Compact the operation log into a snapshot."""
+        if self._log is None:
+            raise POIError("Registry has no operation log; use POIRegistry.open.")
+        self._log.checkpoint(self)
+
+    def close(self):
+        """Flush and close the operation log, if any."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _log_op(self, op: str, args: tuple):
+        if self._log is not None and self._log.append(op, args):
+            self._log.checkpoint(self)
+
+    def enable_cache(self, maxsize: int = 1024):
+        """Memoise repeated queries in an LRU of `maxsize` results (0 turns it off).
+
+        Results stay valid until a mutation they depend on: spatial queries
+        are only dropped by POI changes inside their disc, visitor statistics
+        only by visits and visitors.
+        """
+        self._cache = QueryCache(maxsize) if maxsize > 0 else None
+
+    def cache_info(self) -> Optional[CacheInfo]:
+        """Hit/miss/invalidation counters and size of the cache, None when disabled."""
+        return None if self._cache is None else self._cache.info()
+
+    def enable_instrumentation(self):
+        """Record per-method calls, latency histograms and rows scanned/returned.
+
+        Methods are wrapped on this instance only; without instrumentation
+        the registry runs unwrapped. See instrumentation_stats().
+        """
+        if self._instr is None:
+            self._instr = Instrumentation(self)
+            self._instr.install()
+
+    def disable_instrumentation(self):
+        if self._instr is not None:
+            self._instr.uninstall()
+            self._instr = None
+
+    def instrumentation_stats(self) -> Optional[Dict[str, object]]:
+        """Per-method stats, query_pois sources and cache counters; None when disabled."""
+        return None if self._instr is None else self._instr.report()
+
+    def attach_profiler(self, method: str, profiler=None):
+        """Run each call of `method` inside `profiler` and return it.
+
+        `profiler` is any reusable context manager (e.g. one that starts a
+        sampling profiler); the default is a cProfile.Profile that
+        accumulates over calls. Enables instrumentation if needed.
+        """
+        self.enable_instrumentation()
+        return self._instr.attach_profiler(method, profiler)
+
+    def _invalidate(self, *scopes: str, points: Tuple[Tuple[int,int], ...] = ()):
+        if self._cache is not None:
+            self._cache.invalidate(scopes, points)
+
+    def save_snapshot(self, path: str):
+        """Write the registry to a binary snapshot file (see snapshot.py)."""
+        save_snapshot(self, path)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "POIRegistry":
+        """Registry rebuilt from a file written by save_snapshot."""
+        return load_snapshot(path, cls)
 
     def list_pois_by_type(self, type_name: str) -> List[Tuple[int, str, Tuple[int,int], Dict[str,object]]]:
         self._require_type(type_name)
         out = []
-        for p in self.pois.values():
-            if p.type_name == type_name:
-                out.append((p.id, p.name, (p.x, p.y), dict(p.attributes)))
+        self._scanned += len(self._by_type[type_name])
+        for p in self._by_type[type_name].values():
+            out.append((p.id, p.name, (p.x, p.y), dict(p.attributes)))
 
         out.sort(key=lambda x: (x[0], x[1]))
         return out
 
-    def closest_pair(self):
-        items = list(self.pois.values())
+    @cached("poi", "schema")
+    def closest_pair(self, type_name: Optional[str] = None):
+        if type_name is not None:
+            self._require_type(type_name)
 
-        if len(items) < 2:
-            return None
-
-        best = None
+        # rank keeps the registry order of the two POIs in the result
+        pois = self.pois if type_name is None else self._by_type[type_name]
+        points = [(p.x, p.y, p.id, rank) for rank, p in enumerate(pois.values())]
+        self._scanned += len(points)
 
-        for i in range(len(items)):
-            for j in range(i+1, len(items)):
-                p1, p2 = items[i], items[j]
-                d = distance((p1.x,p1.y), (p2.x,p2.y))
-                if best is None or d < best[2] - self.epsilon or (feq(d, best[2], self.epsilon) and (min(p1.id,p2.id),max(p1.id,p2.id)) < (min(best[0].id,best[1].id),max(best[0].id,best[1].id))):
-                    best = (p1, p2, d)
+        res = find_closest_pair(points, self.epsilon)
+        if res is None:
+            return None
 
-        p1, p2, dist = best
+        a, b, dist = res
+        if a[3] > b[3]:
+            a, b = b, a
+        p1, p2 = self.pois[a[2]], self.pois[b[2]]
 
         return ((p1.id, p1.name, (p1.x,p1.y)), (p2.id, p2.name, (p2.x,p2.y)), dist)
 
+    @cached("poi", "schema")
     def count_pois_per_type(self) -> List[Tuple[str,int]]:
-        counts = {t:0 for t in self.poi_types}
-
-        for p in self.pois.values():
-            counts[p.type_name] = counts.get(p.type_name, 0) + 1
-
-        out = list(counts.items())
+        out = [(t, len(self._by_type[t])) for t in self.poi_types]
         out.sort(key=lambda x: (x[0]))  # alphabetical by type
         return out
 
+    @cached("type_names", region=disc_region)
     def pois_within_radius(self, c0: Tuple[int,int], r: float) -> List[Tuple[int,str,Tuple[int,int],str,float]]:
         x0, y0 = c0
 
@@ -190,26 +516,38 @@ class POIRegistry:
             raise POIError("c0 must be within 0..999.")
 
         out = []
-        for p in self.pois.values():
-            d = distance((x0,y0),(p.x,p.y))
-            if fle(d, r, self.epsilon):
-                out.append((p.id, p.name, (p.x,p.y), p.type_name, d))
+        if isinstance(x0, int) and isinstance(y0, int):
+            # integer fast path: squared distances decide all but the rows
+            # right at the boundary, hypot is only computed for returned rows
+            below, above = sq_bounds(r + self.epsilon)
+            for p in self._grid.within(x0, y0, r + self.epsilon):
+                dx, dy = p.x - x0, p.y - y0
+                d2 = dx*dx + dy*dy
+                if d2 >= above:
+                    continue
+                d = distance((x0,y0),(p.x,p.y))
+                if d2 <= below or fle(d, r, self.epsilon):
+                    out.append((p.id, p.name, (p.x,p.y), p.type_name, d))
+        else:
+            for p in self._grid.within(x0, y0, r + self.epsilon):
+                d = distance((x0,y0),(p.x,p.y))
+                if fle(d, r, self.epsilon):
+                    out.append((p.id, p.name, (p.x,p.y), p.type_name, d))
 
         out.sort(key=lambda x: (x[4], x[0], x[1]))  # by distance, then id, then name
 
         return out
 
+    @cached("type_names", region=knn_region)
     def k_closest(self, c0: Tuple[int,int], k: int) -> List[Tuple[int,str,Tuple[int,int],str,float]]:
         x0,y0 = c0
         if not in_bounds(int(x0), int(y0)):
             raise POIError("c0 must be within 0..999.")
-        arr = []
-        for p in self.pois.values():
-            d = distance((x0,y0),(p.x,p.y))
-            arr.append((p.id, p.name, (p.x,p.y), p.type_name, d))
-        arr.sort(key=lambda x: (x[4], x[0], x[1]))
-        return arr[:max(0,k)]
 
+        # expanding rings of grid cells with a bounded heap; ordered by distance, then id
+        return [(p.id, p.name, (p.x,p.y), p.type_name, d) for d, p in self._grid.nearest(x0, y0, k)]
+
+    @cached("type_names", region=disc_region)
     def at_exact_radius(self, c0: Tuple[int, int], r: float) \
         -> List[Tuple[int, str, Tuple[int, int], str, float]]:
         x0, y0 = c0
@@ -218,7 +556,21 @@ class POIRegistry:
 
         out = []
 
-        for p in self.pois.values():
+        if isinstance(x0, int) and isinstance(y0, int):
+            # squared distances that can possibly be within eps of r
+            lo = sq_bounds(r - self.epsilon)[0] + 1
+            hi = sq_bounds(r + self.epsilon)[1] - 1
+            if hi - lo < LATTICE_MAX_CIRCLES:
+                # narrow ring (e.g. integer r): walk the lattice points on it
+                candidates = self._grid.on_circles(x0, y0, lo, hi)
+            else:
+                candidates = (p for p in self._grid.within(x0, y0, r + self.epsilon, r - self.epsilon)
+                              if lo <= (p.x - x0)**2 + (p.y - y0)**2 <= hi)
+        else:
+            # only cells intersecting the ring r-eps <= d <= r+eps can match
+            candidates = self._grid.within(x0, y0, r + self.epsilon, r - self.epsilon)
+
+        for p in candidates:
             d = distance((x0, y0),(p.x, p.y))
             if feq(d, r, self.epsilon):
                 out.append((p.id, p.name, (p.x, p.y), p.type_name, d))
@@ -226,94 +578,300 @@ class POIRegistry:
         out.sort(key=lambda x: (x[4], x[0], x[1]))
         return out
 
+    def batch_within_radius(self, centers: List[Tuple[int,int]], radii) -> List[List[Tuple[int,str,Tuple[int,int],str,float]]]:
+        """pois_within_radius for many centres at once (one radius, or one per centre).
+
+        With NumPy installed, integer centres are answered together: the
+        queries are joined against the grid cells as array operations and
+        only the matching rows are built in Python. Results are identical
+        to the scalar query.
+        """
+        return batch.within_radius(self, centers, radii)
+
+    def batch_k_closest(self, centers: List[Tuple[int,int]], k: int) -> List[List[Tuple[int,str,Tuple[int,int],str,float]]]:
+        """k_closest for many centres at once, vectorised like batch_within_radius."""
+        return batch.k_closest(self, centers, k)
+
+    def knn_join(self, k: int, type_name: Optional[str] = None, neighbour_type: Optional[str] = None) \
+        -> Iterator[Tuple[Tuple[int,str,Tuple[int,int]], List[Tuple[int,str,Tuple[int,int],str,float]]]]:
+        """For every POI (of `type_name`), its k nearest other POIs (of `neighbour_type`).
+
+        Yields `((id, name, (x, y)), rows)` in id order, rows as k_closest
+        returns them. Each search runs on the grid index, so a POI costs about
+        k plus the POIs of the cells around it rather than a scan of all POIs.
+        The registry must not change while the generator is being consumed.
+        """
+        left = self._join_side(type_name)
+        if neighbour_type is not None:
+            self._require_type(neighbour_type)
+        return self._knn_rows(left, k, neighbour_type)
+
+    def _knn_rows(self, left, k, neighbour_type):
+        for p in left:
+            if neighbour_type is None:
+                # p itself is within the k + 1 closest, whatever the ties
+                found = [(d, q) for d, q in self._grid.nearest(p.x, p.y, k + 1) if q is not p][:k]
+            else:
+                found = self._grid.nearest(p.x, p.y, k, lambda q: q.type_name == neighbour_type and q is not p)
+            yield (p.id, p.name, (p.x, p.y)), [(q.id, q.name, (q.x, q.y), q.type_name, d) for d, q in found]
+
+    def radius_join(self, d: float, type_name: Optional[str] = None, other_type: Optional[str] = None) \
+        -> Iterator[Tuple[Tuple[int,str,Tuple[int,int]], Tuple[int,str,Tuple[int,int]], float]]:
+        """All pairs of POIs at distance <= d (with epsilon), in closest_pair's format.
+
+        With `type_name` only pairs within that type are reported; with
+        `other_type` too, pairs of one POI of each type (that type's POI
+        second), or with `other_type` alone, pairs that include a POI of that
+        type. Pairs stream in order of their (first id, second id), the
+        first POI having the smaller id when both could come either way.
+        The registry must not change while the generator is being consumed.
+        """
+        left = self._join_side(type_name)
+        if other_type is not None:
+            self._require_type(other_type)
+        return self._radius_pairs(left, d, type_name, other_type)
+
+    def _radius_pairs(self, left, d, type_name, other_type):
+        eps = self.epsilon
+        below, above = sq_bounds(d + eps)
+        if other_type is None or other_type == type_name:
+            accept = lambda p, q: q.id > p.id and (type_name is None or q.type_name == type_name)
+        else:
+            # with type_name None, p may be of other_type too: report that pair once
+            accept = lambda p, q: q.type_name == other_type and (q.id > p.id or p.type_name != other_type)
+        for p in left:
+            found = []
+            for q in self._grid.within(p.x, p.y, d + eps):
+                if not accept(p, q):
+                    continue
+                dx, dy = q.x - p.x, q.y - p.y
+                d2 = dx*dx + dy*dy
+                if d2 >= above:
+                    continue
+                dist = distance((p.x, p.y), (q.x, q.y))
+                if d2 <= below or fle(dist, d, eps):
+                    found.append((q.id, dist, q))
+            found.sort(key=lambda e: e[0])
+            for _, dist, q in found:
+                yield (p.id, p.name, (p.x, p.y)), (q.id, q.name, (q.x, q.y)), dist
+
+    def _join_side(self, type_name: Optional[str]) -> List[POI]:
+        if type_name is not None:
+            self._require_type(type_name)
+        pois = self.pois if type_name is None else self._by_type[type_name]
+        return sorted(pois.values(), key=lambda p: p.id)
+
+    def create_attribute_index(self, type_name: str, attr: str):
+        """Index `attr` of the POIs of `type_name` for query_pois (see attr_index.py)."""
+        t = self._require_type(type_name)
+        if attr not in t.attributes:
+            raise POIError(f"Attribute '{attr}' not found in type '{type_name}'.")
+        indexes = self._attr_indexes.setdefault(type_name, {})
+        if attr not in indexes:
+            indexes[attr] = AttributeIndex(attr, self._by_type[type_name].values())
+            self._log_op("create_attribute_index", (type_name, attr))
+
+    def drop_attribute_index(self, type_name: str, attr: str):
+        indexes = self._attr_indexes.get(type_name, {})
+        if indexes.pop(attr, None) is not None:
+            if not indexes:
+                del self._attr_indexes[type_name]
+            self._log_op("drop_attribute_index", (type_name, attr))
+
+    def attribute_indexes(self) -> List[Tuple[str, str]]:
+        return sorted((t, a) for t, indexes in self._attr_indexes.items() for a in indexes)
+
+    def query_pois(self, c0: Tuple[int,int], r: Optional[float] = None, k: Optional[int] = None,
+                   type_name: Optional[str] = None, where: Optional[Dict[str, object]] = None) \
+        -> List[Tuple[int,str,Tuple[int,int],str,float]]:
+        """POIs within `r` of c0, or the `k` closest to it, that match a type and attribute predicates.
+
+        `where` maps attribute names to a value (equality) or an
+        attr_index.Between range. Rows and order are those of
+        pois_within_radius/k_closest. The search starts from the smallest
+        candidate source: an attribute index, the members of the type, or
+        the grid cells around c0.
+        """
+        if (r is None) == (k is None):
+            raise POIError("Give exactly one of r and k.")
+        self._check_center(c0)
+        if type_name is not None:
+            self._require_type(type_name)
+        where = dict(where or {})
+        x0, y0 = c0
+
+        def accept(p: POI) -> bool:
+            return ((type_name is None or p.type_name == type_name)
+                    and all(matches(p.attributes.get(a), want) for a, want in where.items()))
+
+        # (estimated size, POIs, name) of the most selective non-spatial source
+        source = None
+        if type_name is not None:
+            members = self._by_type[type_name]
+            source = (len(members), members.values, "type")
+            for attr, want in where.items():
+                index = self._attr_indexes.get(type_name, {}).get(attr)
+                if index is not None and index.supports(want) and index.count(want) < source[0]:
+                    source = (index.count(want), lambda index=index, want=want: index.lookup(want), "index")
+        if r is not None:
+            scanned = self._grid.count_within(x0, y0, r + self.epsilon)
+        else:
+            # a ring search visits about k / (share of POIs that match) POIs
+            scanned = len(self.pois) if source is None else k * len(self.pois) / max(1, source[0])
+
+        plan = "grid" if source is None or scanned <= source[0] else source[2]
+        self._query_plans[plan] = self._query_plans.get(plan, 0) + 1
+        if plan == "grid":
+            if k is not None:
+                return [(p.id, p.name, (p.x,p.y), p.type_name, d) for d, p in self._grid.nearest(x0, y0, k, accept)]
+            candidates = self._grid.within(x0, y0, r + self.epsilon)
+        else:
+            candidates = list(source[1]())
+            self._scanned += len(candidates)
+
+        out = []
+        for p in candidates:
+            if accept(p):
+                d = distance((x0,y0),(p.x,p.y))
+                if r is None or fle(d, r, self.epsilon):
+                    out.append((p.id, p.name, (p.x,p.y), p.type_name, d))
+        out.sort(key=lambda x: (x[4], x[0], x[1]))
+        return out if k is None else out[:max(0, k)]
+
+    def _check_center(self, c0: Tuple[int,int]):
+        x0, y0 = c0
+        if not in_bounds(int(x0), int(y0)):
+            raise POIError("c0 must be within 0..999.")
+
+    def _coordinate_columns(self) -> "batch.CoordinateColumns":
+        if self._coords is None:
+            self._coords = batch.CoordinateColumns(self.pois.values())
+        return self._coords
+
     def visits_for_visitor(self, visitor_id: int) -> List[Tuple[int, str, str]]:
         if visitor_id not in self.visitors:
             raise POIError(f"Visitor {visitor_id} not found.")
 
         out = []
-        for v in self.visits_by_visitor.get(visitor_id, []):
-            poi = self.pois.get(v.poi_id)
+        store = self._visits
+        self._scanned += len(store.rows_by_visitor.get(visitor_id, ()))
+        for row in store.rows_by_visitor.get(visitor_id, ()):
+            poi = self.pois.get(store.poi_ids[row])
             if poi:
-                out.append((poi.id, poi.name, v.date))
+                out.append((poi.id, poi.name, store.date_strings[store.date_codes[row]]))
 
         # by poi id then name then date
         out.sort(key=lambda x: (x[0], x[1], x[2]))
         return out
 
-    def number_of_visitors_per_poi(self) -> List[Tuple[int, int]]:
-        visitor_sets = defaultdict(set)
-
-        for vid, visits in self.visits_by_visitor.items():
-            for v in visits:
-                visitor_sets[v.poi_id].add(vid)
-
-        out = [(pid, len(visitor_sets.get(pid,set()))) for pid in self.pois]
+    # The visitor statistics take an optional inclusive date range
+    # (dd/mm/yyyy, either end may be left open). Without one they read the
+    # live aggregates; with one they are computed from the day index over
+    # the visits in the range only.
+
+    @cached("visit", "poi")
+    def number_of_visitors_per_poi(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Tuple[int, int]]:
+        if date_from is None and date_to is None:
+            self._fold_visits()
+            visitors_of = self._visitors_of_poi
+        else:
+            _, visitors_of, _ = self._stats_between(date_from, date_to)
+        out = [(pid, len(visitors_of.get(pid, ()))) for pid in self.pois]
+        self._scanned += len(out)
         out.sort(key=lambda x: (x[0]))  # by poi id
         return out
 
-    def number_of_pois_per_visitor(self) -> List[Tuple[int, int]]:
-        poi_sets = defaultdict(set)
-        for vid, visits in self.visits_by_visitor.items():
-            for v in visits:
-                poi_sets[vid].add(v.poi_id)
-
-        out = [(vid, len(poi_sets.get(vid,set()))) for vid in self.visitors]
+    @cached("visit")
+    def number_of_pois_per_visitor(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Tuple[int, int]]:
+        if date_from is None and date_to is None:
+            self._fold_visits()
+            pois_of = self._pois_of_visitor
+        else:
+            pois_of, _, _ = self._stats_between(date_from, date_to)
+        out = [(vid, len(pois_of.get(vid, ()))) for vid in self.visitors]
+        self._scanned += len(out)
         out.sort(key=lambda x: (x[0]))  # by visitor id
         return out
 
-    def top_k_visitors_by_poi_count(self, k: int) -> List[Tuple[int, str, int]]:
-        counts = defaultdict(set)
-        for vid, visits in self.visits_by_visitor.items():
-            for v in visits:
-                counts[vid].add(v.poi_id)
-
-        items = []
-
-        for vid, vis in self.visitors.items():
-            c = len(counts.get(vid, set()))
-            items.append((vid, vis.name, c))
-
-        items.sort(key=lambda x: (-x[2], x[0], x[1]))
-        return items[:max(0,k)]
-
-    def top_k_pois_by_visitor_count(self, k: int) -> List[Tuple[int, str, int]]:
-        visitor_sets = defaultdict(set)
-
-        for vid, visits in self.visits_by_visitor.items():
-            for v in visits:
-                visitor_sets[v.poi_id].add(vid)
-
-        items = []
-
-        for pid, poi in self.pois.items():
-            c = len(visitor_sets.get(pid, set()))
-            items.append((pid, poi.name, c))
-
-        items.sort(key=lambda x: (-x[2], x[0], x[1]))
-        return items[:max(0,k)]
-
-    def coverage_fairness(self, m: int, t: int) -> List[Tuple[int, str, str, int, int]]:
-        poi_sets = defaultdict(set)
-        type_sets = defaultdict(set)
-
-        for vid, visits in self.visits_by_visitor.items():
-            for v in visits:
-                poi_sets[vid].add(v.poi_id)
-                poi = self.pois.get(v.poi_id)
-                if poi:
-                    type_sets[vid].add(poi.type_name)
-
-        out = []
-
-        for vid, visitor in self.visitors.items():
-            np = len(poi_sets.get(vid,set()))
-            nt = len(type_sets.get(vid,set()))
-            if np >= m and nt >= t:
-                out.append((vid, visitor.name, visitor.nationality, np, nt))
-
-        # by id then name
-        out.sort(key=lambda x: (x[0], x[1]))
-        return out
+    @cached("visit")
+    def top_k_visitors_by_poi_count(self, k: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Tuple[int, str, int]]:
+        # count descending, then id (ids are unique, so name never decides)
+        if date_from is None and date_to is None:
+            self._fold_visits()
+            top = self._visitor_board.top(k)
+        else:
+            pois_of, _, _ = self._stats_between(date_from, date_to)
+            top = _top_counts({vid: len(s) for vid, s in pois_of.items()}, self.visitors, k)
+        return [(vid, self.visitors[vid].name, c) for vid, c in top]
+
+    @cached("visit", "poi")
+    def top_k_pois_by_visitor_count(self, k: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Tuple[int, str, int]]:
+        if date_from is None and date_to is None:
+            self._fold_visits()
+            top = self._poi_board.top(k)
+        else:
+            _, visitors_of, _ = self._stats_between(date_from, date_to)
+            top = _top_counts({pid: len(s) for pid, s in visitors_of.items()}, self.pois, k)
+        return [(pid, self.pois[pid].name, c) for pid, c in top]
+
+    @cached("visit", "poi")
+    def coverage_fairness(self, m: int, t: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Tuple[int, str, str, int, int]]:
+        return self.coverage_fairness_batch([(m, t)], date_from, date_to)[0]
+
+    def coverage_fairness_batch(self, thresholds: List[Tuple[int, int]], date_from: Optional[str] = None,
+                                date_to: Optional[str] = None) -> List[List[Tuple[int, str, str, int, int]]]:
+        """coverage_fairness for every (m, t) pair, in the order given."""
+        if date_from is None and date_to is None:
+            return self._coverage_fairness(sorted(self.visitors), thresholds)
+        pois_of, _, types_of = self._stats_between(date_from, date_to)
+        # visitors without visits in the range only qualify for m, t <= 0
+        everyone = any(m <= 0 and t <= 0 for m, t in thresholds)
+        return self._coverage_fairness(sorted(self.visitors if everyone else pois_of), thresholds, pois_of, types_of)
+
+    def _stats_between(self, date_from: Optional[str], date_to: Optional[str]):
+        # visitor -> {poi id}, existing POI -> {visitor id} and visitor ->
+        # {type of an existing POI}, like the live aggregates, over a date range
+        first, last = (None if d is None else _ordinal(d) for d in (date_from, date_to))
+        store, pois = self._visits, self.pois
+        vids, pids = store.visitor_ids, store.poi_ids
+        pois_of: Dict[int, set] = {}
+        visitors_of: Dict[int, set] = {}
+        types_of: Dict[int, set] = {}
+        rows = 0
+        for row in store.rows_between(first, last):
+            rows += 1
+            vid, pid = vids[row], pids[row]
+            pois_of.setdefault(vid, set()).add(pid)
+            poi = pois.get(pid)
+            if poi is not None:
+                visitors_of.setdefault(pid, set()).add(vid)
+                types_of.setdefault(vid, set()).add(poi.type_name)
+        self._scanned += rows
+        return pois_of, visitors_of, types_of
+
+    def _coverage_fairness(self, vids: List[int], thresholds: List[Tuple[int, int]],
+                           pois_of: Optional[Mapping] = None, types_of: Optional[Mapping] = None) -> List[List[Tuple[int, str, str, int, int]]]:
+        # one pass over the visitors builds id-ordered count columns; each pair is then just a filter
+        if pois_of is None:
+            self._fold_visits()
+        pois_of = self._pois_of_visitor if pois_of is None else pois_of
+        types_of = self._types_of_visitor if types_of is None else types_of
+        self._scanned += len(vids)
+        n_pois = array("l", [len(pois_of.get(vid, ())) for vid in vids])
+        n_types = array("l", [len(types_of.get(vid, ())) for vid in vids])
+
+        results = []
+        done = {}
+        for m, t in thresholds:
+            if (m, t) not in done:
+                out = []
+                for i in range(len(vids)):
+                    if n_pois[i] >= m and n_types[i] >= t:
+                        visitor = self.visitors[vids[i]]
+                        out.append((visitor.id, visitor.name, visitor.nationality, n_pois[i], n_types[i]))
+                done[(m, t)] = out
+            results.append(list(done[(m, t)]))
+        return results
 
     def _require_type(self, name: str) -> POIType:
         if name not in self.poi_types:
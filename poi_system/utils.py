@@ -1,13 +1,20 @@
-from math import hypot
+from math import ceil, floor, hypot
 from typing import Tuple
 
 GRID_MIN = 0
 GRID_MAX = 999
 GRID_SIZE = 1000
 
+# Ids are stored in 64-bit signed columns (visits, snapshots)
+ID_MIN = -2**63
+ID_MAX = 2**63 - 1
+
 # Floating point tolerance
 EPSILON: float = 1e-6
 
+# Largest squared distance between two grid points
+MAX_SQ_DISTANCE = 2 * GRID_MAX * GRID_MAX
+
 def distance(p1: Tuple[int,int], p2: Tuple[int,int]) -> float:
     """Euclidean distance between two integer grid points."""
     return hypot(p1[0]-p2[0], p1[1]-p2[1])
@@ -22,3 +29,17 @@ def fle(a: float, b: float, eps: float = EPSILON) -> bool:
 
 def in_bounds(x: int, y: int) -> bool:
     return (GRID_MIN <= x <= GRID_MAX) and (GRID_MIN <= y <= GRID_MAX)
+
+def sq_bounds(limit: float) -> Tuple[int,int]:
+    """Integer squared-distance bounds around `limit` as `(below, above)`.
+
+    Every integer d2 <= below has sqrt(d2) < limit and every d2 >= above has
+    sqrt(d2) > limit, with a margin far wider than float rounding; only the
+    few values in between need the float comparison.
+    """
+    if not limit >= 0:  # also NaN
+        return -1, 0
+    if limit > 2 * GRID_SIZE:
+        return MAX_SQ_DISTANCE, MAX_SQ_DISTANCE + 1
+    l2 = limit * limit
+    return floor(l2 * (1 - 1e-12)) - 1, ceil(l2 * (1 + 1e-12)) + 1
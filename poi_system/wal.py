@@ -0,0 +1,203 @@
+import os, pickle, struct, threading, zlib
+from typing import Iterator, Tuple
+
+from .snapshot import save_snapshot, load_snapshot, read_snapshot_meta
+
+SNAPSHOT_FILE = "registry.snap"
+LOG_FILE = "registry.log"
+
+# Record framing: payload length and CRC-32, then the pickled (lsn, op, args).
+# A torn or corrupt tail fails the length/CRC check and ends recovery there.
+_RECORD = struct.Struct("<II")
+
+def read_log(path: str) -> Iterator[Tuple[int, int, str, tuple]]:
+    """Yields `(end offset, lsn, op, args)` for every intact record in the log."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + _RECORD.size <= len(data):
+        length, crc = _RECORD.unpack_from(data, pos)
+        start, end = pos + _RECORD.size, pos + _RECORD.size + length
+        if end > len(data) or zlib.crc32(data[start:end]) != crc:
+            return
+        lsn, op, args = pickle.loads(data[start:end])
+        yield end, lsn, op, args
+        pos = end
+
+def _rows(op: str, args: tuple) -> int:
+    # what a record counts toward compact_every: bulk ops count their rows
+    return len(args[0]) if op.startswith("bulk_") else 1
+
+def _fsync_dir(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class OperationLog:
+    """Append-only log of registry mutations with group commit.
+
+    With `synchronous` (the default) append returns only once its record is
+    on disk: the first waiting thread writes every pending record with one
+    fsync while the others wait for it, so concurrent writers share syncs
+    and nothing acknowledged is lost in a crash. Otherwise records are
+    buffered and written once `sync_every` are pending, or by a background
+    flusher every `sync_interval` seconds, and up to that much acknowledged
+    work can be lost. After `compact_every` records (rows, for bulk
+    operations) the registry is checkpointed into a snapshot and the log
+    starts over. A failed write is cut off the file before it is retried.
+    """
+
+    def __init__(self, directory: str, lsn: int = 0, synchronous: bool = True, sync_every: int = 256,
+                 sync_interval: float = 0.05, compact_every: int = 100000):
+        self.directory = directory
+        self.path = os.path.join(directory, LOG_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.lsn = lsn
+        self.synced = lsn  # last lsn known to be on disk
+        self.synchronous = synchronous
+        self.sync_every = sync_every
+        self.compact_every = compact_every
+        self.since_checkpoint = 0
+        self._buf = []
+        self._lock = threading.Condition()
+        self._writing = False  # a sync is writing outside the lock
+        self._file = open(self.path, "ab")
+        self._end = os.fstat(self._file.fileno()).st_size  # end of the synced records
+        self._torn = False  # bytes of a failed write may follow _end
+        self._closed = threading.Event()
+        self._flusher = None
+        if sync_interval and not synchronous:
+            self._flusher = threading.Thread(target=self._flush_loop, args=(sync_interval,), daemon=True)
+            self._flusher.start()
+
+    def append(self, op: str, args: tuple) -> bool:
+        """Logs one mutation; returns True when a checkpoint is due."""
+        with self._lock:
+            self.lsn += 1
+            payload = pickle.dumps((self.lsn, op, args), protocol=pickle.HIGHEST_PROTOCOL)
+            self._buf.append(_RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+            self.since_checkpoint += _rows(op, args)
+            if self.synchronous:
+                lsn = self.lsn
+                while self.synced < lsn:
+                    if self._writing:
+                        self._lock.wait()  # the next sync may already cover this record
+                    else:
+                        self._sync_locked()
+            elif len(self._buf) >= self.sync_every:
+                self._sync_locked()
+        return self.since_checkpoint >= self.compact_every
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        # writes and fsyncs outside the lock so appends can queue up the next batch
+        while self._writing:
+            self._lock.wait()
+        if not self._buf:
+            return
+        batch, self._buf = self._buf, []
+        data = b"".join(batch)
+        end = self.lsn
+        self._writing = True
+        self._lock.release()
+        try:
+            if self._torn:
+                self._cut_torn()
+            self._torn = True
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._torn = False
+        except BaseException:
+            # retried by the next sync, after the partial write is cut off
+            self._lock.acquire()
+            self._buf[:0] = batch
+            raise
+        else:
+            self._lock.acquire()
+            self._end += len(data)
+            self.synced = end
+        finally:
+            self._writing = False
+            self._lock.notify_all()
+
+    def _cut_torn(self):
+        # recovery stops at the first bad record, so nothing may follow a torn one
+        try:
+            self._file.close()
+        except OSError:
+            pass  # unwritten buffered bytes are dropped, the file is cut anyway
+        os.truncate(self.path, self._end)
+        self._file = open(self.path, "ab")
+        self._torn = False
+
+    def _flush_loop(self, interval: float):
+        while not self._closed.wait(interval):
+            self.sync()
+
+    def checkpoint(self, registry):
+        """Snapshot `registry` at the current lsn and start an empty log."""
+        with self._lock:
+            self._sync_locked()
+            save_snapshot(registry, self.snapshot_path, meta={"lsn": self.lsn})
+            # records up to lsn are covered by the snapshot; recovery also skips
+            # them by lsn, so a crash before the truncation below is harmless
+            self._file.close()
+            tmp = self.path + ".tmp"
+            open(tmp, "wb").close()
+            os.replace(tmp, self.path)
+            _fsync_dir(self.directory)
+            self._file = open(self.path, "ab")
+            self._end = 0
+            self._torn = False
+            self.since_checkpoint = 0
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+
+def open_registry(registry_cls, directory: str, epsilon: float = None, **log_options):
+    """Recover the registry stored in `directory` and attach a log for new mutations.
+
+    Loads the last snapshot (if any) and replays only the log records
+    written after it. A torn tail from a crash is cut off.
+    """
+    os.makedirs(directory, exist_ok=True)
+    snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+    log_path = os.path.join(directory, LOG_FILE)
+
+    if os.path.exists(snapshot_path):
+        registry = load_snapshot(snapshot_path, registry_cls)
+        lsn = read_snapshot_meta(snapshot_path).get("lsn", 0)
+    else:
+        registry = registry_cls() if epsilon is None else registry_cls(epsilon=epsilon)
+        lsn = 0
+
+    good_end = 0
+    replayed = 0
+    for end, rec_lsn, op, args in read_log(log_path):
+        good_end = end
+        if rec_lsn <= lsn:
+            continue
+        getattr(registry, op)(*args)
+        lsn = rec_lsn
+        replayed += _rows(op, args)
+    if os.path.exists(log_path) and os.path.getsize(log_path) != good_end:
+        with open(log_path, "r+b") as f:
+            f.truncate(good_end)
+            os.fsync(f.fileno())
+
+    registry._log = OperationLog(directory, lsn=lsn, **log_options)
+    registry._log.since_checkpoint = replayed
+    return registry
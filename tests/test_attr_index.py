@@ -0,0 +1,79 @@
+import os
+import random
+import tempfile
+import unittest
+from poi_system import POIRegistry, POIError
+from poi_system.attr_index import Between, matches
+from poi_system.utils import distance, fle
+
+def brute(r, c0, rad=None, k=None, type_name=None, where=None):
+    rows = []
+    for p in r.pois.values():
+        if type_name is not None and p.type_name != type_name:
+            continue
+        if not all(matches(p.attributes.get(a), w) for a, w in (where or {}).items()):
+            continue
+        d = distance(c0, (p.x, p.y))
+        if rad is None or fle(d, rad, r.epsilon):
+            rows.append((p.id, p.name, (p.x, p.y), p.type_name, d))
+    rows.sort(key=lambda x: (x[4], x[0], x[1]))
+    return rows if k is None else rows[:k]
+
+class TestAttributeIndexes(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(8)
+        self.rnd = rnd
+        self.r = POIRegistry()
+        self.r.add_poi_type("park", ["playground", "size"])
+        self.r.add_poi_type("cafe", ["size"])
+        for i in range(1, 400):
+            attrs = {"playground": rnd.choice([True, False, None]), "size": rnd.choice([1, 2.5, 7, 12, "big"])}
+            self.r.add_poi(i, f"P{i}", rnd.choice(["park", "cafe"]), rnd.randint(0, 200), rnd.randint(0, 200), attrs)
+        self.r.create_attribute_index("park", "playground")
+        self.r.create_attribute_index("park", "size")
+
+    def check(self, type_name="park", attr="playground"):
+        for _ in range(30):
+            c0 = (self.rnd.randint(0, 200), self.rnd.randint(0, 200))
+            for where in ({attr: True}, {"size": Between(2, 10)}, {attr: None, "size": Between(lo=5)}, {}):
+                for t in (type_name, None):
+                    self.assertEqual(self.r.query_pois(c0, r=40, type_name=t, where=where), brute(self.r, c0, 40, type_name=t, where=where))
+                    self.assertEqual(self.r.query_pois(c0, k=5, type_name=t, where=where), brute(self.r, c0, k=5, type_name=t, where=where))
+
+    def test_queries_match_scan(self):
+        self.check()
+        self.assertEqual(self.r.query_pois((0, 0), r=1000, where={"size": "big"}), brute(self.r, (0, 0), 1000, where={"size": "big"}))
+        with self.assertRaises(POIError):
+            self.r.query_pois((0, 0), r=5, k=3)
+
+    def test_index_follows_schema_changes(self):
+        self.r.delete_poi(5)
+        self.r.add_poi(1000, "new", "park", 10, 10, {"playground": True, "size": 3})
+        self.r.rename_attribute("park", "playground", "swings")
+        self.assertEqual(self.r.attribute_indexes(), [("park", "size"), ("park", "swings")])
+        self.r.rename_type("park", "garden")
+        self.check("garden", "swings")
+        self.r.delete_attribute("garden", "size")
+        self.r.add_attribute("garden", "size")  # all None now, no stale index entries
+        self.assertEqual(self.r.attribute_indexes(), [("garden", "swings")])
+        self.assertEqual(self.r.query_pois((0, 0), r=1000, type_name="garden", where={"size": Between(0, 100)}), [])
+
+    def test_bulk_adds_keep_indexes_sorted(self):
+        rows = [(i, f"B{i}", self.rnd.choice(["park", "cafe"]), self.rnd.randint(0, 200), self.rnd.randint(0, 200),
+                 {"size": self.rnd.choice([0.5, 3, 7, 20, None])}) for i in range(500, 700)]
+        self.assertEqual([i for i, _ in self.r.bulk_add_pois(rows + [rows[0]])], [200])
+        ordered = self.r._attr_indexes["park"]["size"].ordered
+        self.assertEqual(ordered, sorted(ordered))
+        self.check()
+
+    def test_indexes_survive_snapshots(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "r.snap")
+            self.r.save_snapshot(path)
+            loaded = POIRegistry.load_snapshot(path)
+        self.assertEqual(loaded.attribute_indexes(), self.r.attribute_indexes())
+        self.assertEqual(loaded.query_pois((50, 50), k=10, type_name="park", where={"playground": False}),
+                         self.r.query_pois((50, 50), k=10, type_name="park", where={"playground": False}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+from poi_system import POIRegistry
+from poi_system import batch
+
+class TestBatchQueries(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(5)
+        self.r = POIRegistry()
+        self.r.add_poi_type("t", [])
+        for i in range(1, 600):
+            self.r.add_poi(i, f"P{i}", "t", rnd.randint(0, 99), rnd.randint(0, 99), {})
+        self.r.delete_poi(17)
+        self.centers = [(rnd.randint(0, 99), rnd.randint(0, 99)) for _ in range(40)] + [(0, 0), (50.5, 3.25)]
+        self.radii = [rnd.choice([0, 1, 5, 7.5, 10, 30, -1]) for _ in self.centers]
+
+    def check(self):
+        self.assertEqual(self.r.batch_within_radius(self.centers, self.radii),
+                         [self.r.pois_within_radius(c, rad) for c, rad in zip(self.centers, self.radii)])
+        self.assertEqual(self.r.batch_within_radius(self.centers, 12),
+                         [self.r.pois_within_radius(c, 12) for c in self.centers])
+        for k in (0, 1, 5, 40, 1000):
+            self.assertEqual(self.r.batch_k_closest(self.centers, k),
+                             [self.r.k_closest(c, k) for c in self.centers])
+
+    def test_batch_matches_scalar(self):
+        self.check()
+        self.r.add_poi(5000, "late", "t", 1, 1, {})  # columns are rebuilt after changes
+        self.check()
+
+    def test_without_numpy(self):
+        saved, batch.np = batch.np, None
+        try:
+            self.check()
+        finally:
+            batch.np = saved
+
+    def test_small_groups(self):
+        saved, batch.BATCH_PAIRS = batch.BATCH_PAIRS, 50
+        try:
+            self.check()
+        finally:
+            batch.BATCH_PAIRS = saved
+
+    def test_rows_follow_type_rename(self):
+        self.check()
+        self.r.rename_type("t", "u")
+        self.assertEqual(self.r.batch_k_closest([(5, 5)], 3)[0][0][3], "u")
+
+if __name__ == "__main__":
+    unittest.main()
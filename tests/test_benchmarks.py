@@ -0,0 +1,46 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from poi_system import POIRegistry, load_config
+from benchmarks import datagen, run
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generator_is_deterministic(self):
+        a = list(datagen.records(500, "clustered", seed=3))
+        self.assertEqual(a, list(datagen.records(500, "clustered", seed=3)))
+        self.assertNotEqual(a, list(datagen.records(500, "clustered", seed=4)))
+        with tempfile.TemporaryDirectory() as d:
+            r = POIRegistry()
+            path = os.path.join(d, "c.jsonl")
+            datagen.write_config(path, 500, "clustered", seed=3)
+            warnings = load_config(path, r)
+        self.assertEqual(sum(map(len, warnings.values())), 0)
+        self.assertEqual((len(r.pois), len(r.visitors), len(r._visits)), datagen.split(500))
+
+    def test_runner_writes_and_compares(self):
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, "bench.json")
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(run.main(["--sizes", "300", "--ops", "3", "--out", out, "--data-dir", d]), 0)
+            with open(out) as f:
+                results = json.load(f)["results"]
+
+            # baselines far slower and far faster than any real run
+            for scale, expected in ((1e6, 0), (1e-6, 1)):
+                baseline = os.path.join(d, f"baseline-{expected}.json")
+                with open(baseline, "w") as f:
+                    json.dump({"results": [dict(r, p50_us=r["p50_us"] * scale) for r in results]}, f)
+                with redirect_stdout(io.StringIO()) as printed:
+                    code = run.main(["--sizes", "300", "--ops", "3", "--no-memory", "--only", "k_closest",
+                                     "--compare", baseline, "--data-dir", d])
+                self.assertEqual(code, expected)
+                self.assertEqual("REGRESSION" in printed.getvalue(), bool(expected))
+        names = {r["name"] for r in results}
+        self.assertTrue({"load_config", "closest_pair", "k_closest", "add_poi", "coverage_fairness"} <= names)
+        self.assertTrue(all(r["p50_us"] <= r["p99_us"] for r in results))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+import unittest
+from poi_system import POIRegistry
+
+def build(cache_size):
+    r = POIRegistry(cache_size=cache_size)
+    r.add_poi_type("a", ["k"])
+    r.add_poi_type("b", [])
+    r.add_poi(1, "A", "a", 10, 10, {})
+    r.add_poi(2, "B", "b", 12, 10, {})
+    r.add_poi(3, "C", "a", 500, 500, {})
+    r.add_visitor(1, "V", "X")
+    r.add_visit(1, 1, "01/01/2024")
+    return r
+
+class TestQueryCache(unittest.TestCase):
+    def test_hits_and_copies(self):
+        r = build(16)
+        first = r.pois_within_radius((10, 10), 5)
+        first.clear()
+        self.assertEqual(len(r.pois_within_radius((10, 10), 5)), 2)
+        info = r.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+        self.assertIsNone(POIRegistry().cache_info())
+
+    def test_scoped_invalidation(self):
+        r = build(16)
+        r.pois_within_radius((10, 10), 5)
+        r.top_k_visitors_by_poi_count(3)
+        # far POI and visits leave the radius entry alone
+        r.add_poi(4, "D", "b", 900, 900, {})
+        r.add_visit(1, 2, "02/01/2024")
+        r.pois_within_radius((10, 10), 5)
+        self.assertEqual(r.cache_info().hits, 1)
+        self.assertEqual(r.top_k_visitors_by_poi_count(3), [(1, "V", 2)])
+        # a POI inside the disc drops it
+        r.add_poi(5, "E", "b", 14, 10, {})
+        self.assertEqual([p[0] for p in r.pois_within_radius((10, 10), 5)], [1, 2, 5])
+        r.rename_type("b", "c")
+        self.assertEqual(r.pois_within_radius((10, 10), 5)[1][3], "c")
+
+    def test_matches_uncached_under_mutations(self):
+        rnd = random.Random(4)
+        plain, memo = build(0), build(8)
+        pid = 10
+        for step in range(400):
+            op = rnd.random()
+            if op < 0.25:
+                pid += 1
+                args = (pid, f"P{pid}", rnd.choice("ab"), rnd.randint(0, 60), rnd.randint(0, 60), {})
+                plain.add_poi(*args); memo.add_poi(*args)
+            elif op < 0.35 and len(plain.pois) > 3:
+                victim = rnd.choice(sorted(plain.pois))
+                plain.delete_poi(victim); memo.delete_poi(victim)
+            elif op < 0.5:
+                visit = (1, rnd.choice(sorted(plain.pois)), "01/01/2024")
+                plain.add_visit(*visit); memo.add_visit(*visit)
+            else:
+                c0 = (rnd.randint(0, 60), rnd.randint(0, 60))
+                for q, args in (("pois_within_radius", (c0, 8)), ("k_closest", (c0, 3)),
+                                ("at_exact_radius", (c0, 5)), ("closest_pair", ()),
+                                ("count_pois_per_type", ()), ("top_k_pois_by_visitor_count", (3,)),
+                                ("number_of_visitors_per_poi", ()), ("coverage_fairness", (1, 1))):
+                    self.assertEqual(getattr(memo, q)(*args), getattr(plain, q)(*args), (step, q))
+        self.assertGreater(memo.cache_info().hits, 0)
+
+if __name__ == "__main__":
+    unittest.main()
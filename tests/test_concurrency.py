@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import unittest
+from poi_system import POIRegistry, POIError, ConcurrentRegistry, AsyncRegistry
+
+def base():
+    r = POIRegistry(cache_size=16)
+    r.add_poi_type("t", ["a"])
+    r.add_visitor(1, "V", "X")
+    return r
+
+class TestConcurrentRegistry(unittest.TestCase):
+    def test_batches_are_atomic_for_readers(self):
+        cr = ConcurrentRegistry(base())
+        errors = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                with cr.reading() as r:
+                    n = len(r.list_pois_by_type("t"))
+                    counts = dict(r.count_pois_per_type())
+                    near = r.k_closest((500, 500), 1000)
+                if n % 5 or counts["t"] != n or len(near) != n:
+                    errors.append((n, counts, len(near)))
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for b in range(40):
+            cr.apply([("add_poi", (b * 5 + i, f"P{b}-{i}", "t", b * 20 + i, i, {})) for i in range(5)])
+            if b % 10 == 9:
+                cr.apply([("rename_attribute", ("t", "a", "b")), ("rename_attribute", ("t", "b", "a"))])
+        done.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(cr.version, 44)
+
+    def test_copies_stay_identical(self):
+        cr = ConcurrentRegistry(base())
+        cr.add_poi(1, "A", "t", 1, 1, {"a": 3})
+        cr.add_visit(1, 1, "01/01/2024")
+        res = cr.apply([("add_poi", (1, "dup", "t", 2, 2, {})), ("delete_poi", (1,)), ("add_poi", (2, "B", "t", 3, 3, {}))])
+        self.assertIsInstance(res[0][1], POIError)
+        with self.assertRaises(POIError):
+            cr.delete_poi(1)
+        # generators are consumed once, not once per copy
+        cr.bulk_add_pois((i, f"G{i}", "t", i, i, {}) for i in range(10, 13))
+        cr.bulk_add_visits((1, i, "02/01/2024", None) for i in range(10, 13))
+        cr.add_poi(20, "C", "t", 5, 5, {})
+        a, b = cr._copies
+        self.assertEqual(len(a.pois), 5)
+        self.assertEqual(list(a.pois), list(b.pois))
+        for q in ("count_pois_per_type", "number_of_visitors_per_poi", "number_of_pois_per_visitor", "closest_pair"):
+            self.assertEqual(getattr(a, q)(), getattr(b, q)())
+        self.assertEqual(a.used_poi_ids, b.used_poi_ids)
+        self.assertEqual(cr.top_k_visitors_by_poi_count(1), [(1, "V", 4)])
+        with self.assertRaises(POIError):
+            cr.apply([("closest_pair", ())])
+
+    def test_streams_keep_their_version(self):
+        cr = ConcurrentRegistry(base())
+        cr.bulk_add_pois([(i, f"P{i}", "t", i, 0, {}) for i in range(1, 6)])
+        rows = cr.radius_join(100)
+        first = next(rows)
+        cr.add_poi(6, "new", "t", 3, 1, {})  # published, but not on the streamed copy
+        rest = list(rows)
+        self.assertEqual(len(rest) + 1, 10)
+        self.assertNotIn(6, {q[0] for _, q, _ in rest})
+        self.assertEqual(first[0][0], 1)
+
+        # a writer in another thread proceeds while a stream is open
+        stream = cr.knn_join(2)
+        next(stream)
+        writer = threading.Thread(target=lambda: cr.add_poi(7, "w", "t", 9, 9, {}))
+        writer.start()
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(sum(1 for _ in stream), 5)
+        stream.close()
+        cr.add_poi(8, "x", "t", 8, 8, {})  # replays the lagging batch on the released copy
+        a, b = cr._copies
+        self.assertEqual(sorted(a.pois), sorted(b.pois))
+        self.assertEqual(len(list(cr.knn_join(1))), 8)
+
+    def test_async_wrappers(self):
+        ar = AsyncRegistry(ConcurrentRegistry(base()))
+
+        async def main():
+            await ar.add_poi(1, "A", "t", 10, 10, {})
+            await ar.apply([("add_poi", (2, "B", "t", 12, 10, {}))])
+            return await asyncio.gather(ar.pois_within_radius((10, 10), 5), ar.closest_pair())
+
+        within, pair = asyncio.run(main())
+        self.assertEqual([row[0] for row in within], [1, 2])
+        self.assertEqual(pair[2], 2.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,4 @@
-import unittest, json, os
+import unittest, json, os, tempfile
 from poi_system import POIRegistry, load_config
 
 class TestConfigLoader(unittest.TestCase):
@@ -23,5 +23,67 @@ class TestConfigLoader(unittest.TestCase):
         v = r.visits_for_visitor(1)
         self.assertEqual(len(v), 1)
 
+    def test_jsonl_stream_matches_json(self):
+        data = {
+            "poi_types":[{"name":"park","attributes":["a1"]}, {"name":"park"}, {"attributes":[]}],
+            "pois":[{"id": i, "name":f"P{i}","type":"park","x": i, "y": 2*i} for i in range(1, 30)]
+                   + [{"id": 3, "name":"dup","type":"park","x": 1, "y": 1},
+                      {"id": 99, "name":"far","type":"park","x": 1000, "y": 1},
+                      {"id": 98, "name":"lost","type":"zoo","x": 1, "y": 1}],
+            "visitors":[{"id":1,"name":"V1","nationality":"AE"}, {"id":2,"name":"V2"}],
+            "visits":[{"visitor_id":1,"poi_id":i,"date":"01/01/2024"} for i in range(1, 30)]
+                     + [{"visitor_id":1,"poi_id":1,"date":"2024-01-01"},
+                        {"visitor_id":2,"poi_id":1,"date":"01/01/2024"},
+                        {"visitor_id":1,"poi_id":2,"date":"01/01/2024","rating":11}],
+        }
+        with tempfile.TemporaryDirectory() as d:
+            jpath = os.path.join(d, "cfg.json")
+            lpath = os.path.join(d, "cfg.jsonl")
+            with open(jpath, "w") as f:
+                json.dump(data, f)
+            with open(lpath, "w") as f:
+                for section, rows in data.items():
+                    for row in rows:
+                        f.write(json.dumps({section: row}) + "\n")
+                f.write(json.dumps({"comments": "ignored"}) + "\n")
+            r1, r2 = POIRegistry(), POIRegistry()
+            w1 = load_config(jpath, r1)
+            w2 = load_config(lpath, r2, chunk_size=4)
+        self.assertEqual(w1, w2)
+        self.assertEqual([len(w1[k]) for k in ("poi_types", "pois", "visitors", "visits")], [2, 3, 1, 3])
+        self.assertEqual(r1.count_pois_per_type(), r2.count_pois_per_type())
+        self.assertEqual(r1.visits_for_visitor(1), r2.visits_for_visitor(1))
+
+    def test_bulk_add_matches_row_by_row(self):
+        pois = [(1, "A", "park", 1, 1, {"a1": 5, "zz": 1}), (1, "A2", "park", 1, 1, None),
+                (2, "B", "zoo", 1, 1, None), (3, "C", "park", 1000, 1, None), (4, "D", "park", 7, 7, None)]
+        visits = [(1, 1, "01/01/2024", 5), (9, 1, "01/01/2024", None), (1, 8, "01/01/2024", None),
+                  (1, 4, "2024-01-01", None), (1, 4, "02/01/2024", 0), (1, 4, "01/01/2024", None)]
+        bulk, single = POIRegistry(), POIRegistry()
+        for r in (bulk, single):
+            r.add_poi_type("park", ["a1"])
+            r.add_visitor(1, "V", "AE")
+
+        errors = [(i, str(e)) for i, e in bulk.bulk_add_pois(pois)]
+        errors += [(i, str(e)) for i, e in bulk.bulk_add_visits(visits)]
+        expected = []
+        for i, row in enumerate(pois):
+            try:
+                single.add_poi(*row)
+            except Exception as e:
+                expected.append((i, str(e)))
+        for i, row in enumerate(visits):
+            try:
+                single.add_visit(*row)
+            except Exception as e:
+                expected.append((i, str(e)))
+
+        self.assertEqual(errors, expected)
+        self.assertEqual(bulk.list_pois_by_type("park"), single.list_pois_by_type("park"))
+        self.assertEqual(bulk.visits_for_visitor(1), single.visits_for_visitor(1))
+        self.assertEqual(bulk.top_k_pois_by_visitor_count(5), single.top_k_pois_by_visitor_count(5))
+        self.assertEqual(bulk.top_k_visitors_by_poi_count(5), single.top_k_visitors_by_poi_count(5))
+        self.assertEqual(bulk.pois_within_radius((0, 0), 20), single.pois_within_radius((0, 0), 20))
+
 if __name__ == "__main__":
     unittest.main()
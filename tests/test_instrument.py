@@ -0,0 +1,50 @@
+import pstats
+import unittest
+from poi_system import POIRegistry
+from poi_system.instrument import format_report
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.r = POIRegistry(cache_size=8)
+        self.r.add_poi_type("t", ["a"])
+        for i in range(1, 101):
+            self.r.add_poi(i, f"P{i}", "t", i * 7 % 100, i * 13 % 100, {"a": i % 3})
+        self.r.create_attribute_index("t", "a")
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(self.r.instrumentation_stats())
+        self.assertNotIn("pois_within_radius", vars(self.r))
+
+    def test_counts_calls_and_rows(self):
+        self.r.enable_instrumentation()
+        rows = self.r.pois_within_radius((50, 50), 20)
+        self.r.pois_within_radius((50, 50), 20)  # cache hit: nothing scanned
+        self.r.k_closest((0, 0), 3)
+        self.r.query_pois((10, 10), k=2, type_name="t", where={"a": 1})
+        self.r.add_poi(500, "new", "t", 1, 1, {})
+        stats = self.r.instrumentation_stats()
+        within = stats["methods"]["pois_within_radius"]
+        self.assertEqual(within["calls"], 2)
+        self.assertEqual(within["rows_returned"], 2 * len(rows))
+        self.assertGreaterEqual(within["rows_scanned"], len(rows))
+        self.assertEqual(sum(within["histogram"].values()), 2)
+        self.assertLessEqual(within["p50_us"], within["max_us"])
+        self.assertEqual(stats["methods"]["add_poi"]["calls"], 1)
+        self.assertEqual(sum(stats["query_plans"].values()), 1)
+        self.assertEqual(stats["cache"]["hits"], 1)
+        self.assertIn("pois_within_radius", format_report(stats))
+
+        self.r.disable_instrumentation()
+        self.assertIsNone(self.r.instrumentation_stats())
+        self.assertNotIn("pois_within_radius", vars(self.r))
+
+    def test_profiler_hook(self):
+        prof = self.r.attach_profiler("closest_pair")
+        self.r.closest_pair()
+        names = {fn for _, _, fn in pstats.Stats(prof).stats}
+        self.assertIn("find_closest_pair", names)
+        with self.assertRaises(ValueError):
+            self.r.attach_profiler("no_such_query")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import random
+import unittest
+from itertools import islice
+from math import hypot
+from poi_system import POIRegistry, POIError
+
+class TestJoins(unittest.TestCase):
+    def setUp(self):
+        self.r = r = POIRegistry()
+        r.add_poi_type("a")
+        r.add_poi_type("b")
+        rnd = random.Random(3)
+        for i in range(1, 301):
+            # a dense corner with repeated coordinates, plus a sparse rest
+            x, y = (rnd.randrange(10), rnd.randrange(10)) if i % 3 else (rnd.randrange(1000), rnd.randrange(1000))
+            r.add_poi(i, f"P{i}", "ab"[i % 2], x, y)
+
+    def test_knn_join_matches_k_closest(self):
+        r = self.r
+        rows = list(r.knn_join(5))
+        self.assertEqual([p[0] for p, _ in rows], sorted(r.pois))
+        for (pid, _, c0), near in rows:
+            expected = [row for row in r.k_closest(c0, 6) if row[0] != pid][:5]
+            self.assertEqual(near, expected)
+        for (pid, _, c0), near in r.knn_join(3, "a", "b"):
+            self.assertEqual(r.pois[pid].type_name, "a")
+            expected = sorted((hypot(q.x - c0[0], q.y - c0[1]), q.id) for q in r.pois.values() if q.type_name == "b")[:3]
+            self.assertEqual([(row[4], row[0]) for row in near], expected)
+
+    def test_radius_join_matches_brute_force(self):
+        r = self.r
+        pois = sorted(r.pois.values(), key=lambda p: p.id)
+        for d in (0, 1, 2.5, 60, float("inf")):
+            expected = [(p.id, q.id) for p in pois for q in pois
+                        if p.id < q.id and hypot(p.x - q.x, p.y - q.y) <= d + r.epsilon]
+            self.assertEqual([(p[0], q[0]) for p, q, _ in r.radius_join(d)], expected)
+        same = [(p[0], q[0]) for p, q, _ in r.radius_join(5, "b")]
+        self.assertEqual(same, [(p[0], q[0]) for p, q, _ in r.radius_join(5)
+                                if r.pois[p[0]].type_name == r.pois[q[0]].type_name == "b"])
+        some_b = [(p[0], q[0]) for p, q, _ in r.radius_join(5, None, "b")]
+        kind = lambda pid: r.pois[pid].type_name
+        self.assertEqual(some_b, sorted((p[0], q[0]) if kind(q[0]) == "b" else (q[0], p[0])
+                                        for p, q, _ in r.radius_join(5) if "b" in (kind(p[0]), kind(q[0]))))
+        cross = list(r.radius_join(5, "a", "b"))
+        self.assertTrue(cross)
+        for p, q, dist in cross:
+            self.assertEqual((r.pois[p[0]].type_name, r.pois[q[0]].type_name), ("a", "b"))
+            self.assertAlmostEqual(dist, hypot(p[2][0] - q[2][0], p[2][1] - q[2][1]))
+
+    def test_streaming_and_errors(self):
+        first = next(self.r.radius_join(2))
+        self.assertEqual(len(list(islice(self.r.knn_join(2), 3))), 3)
+        self.assertEqual(first[0][0], 1)
+        with self.assertRaises(POIError):
+            self.r.knn_join(3, "nope")
+        with self.assertRaises(POIError):
+            self.r.radius_join(3, "a", "nope")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
+import random
 import unittest
 from poi_system import POIRegistry
+from poi_system.utils import distance, feq
 
 class TestNearestQueries(unittest.TestCase):
     def test_closest_pair(self):
@@ -13,6 +15,42 @@ class TestNearestQueries(unittest.TestCase):
         self.assertIn(pair[0][0], (2,3))
         self.assertIn(pair[1][0], (2,3))
 
+    def test_closest_pair_matches_quadratic_scan(self):
+        rnd = random.Random(3)
+        for n in (2, 3, 7, 60, 400):
+            r = POIRegistry()
+            r.add_poi_type("t", [])
+            for i in rnd.sample(range(1, 5000), n):
+                # small grid so duplicates and equal distances are common
+                r.add_poi(i, f"P{i}", "t", rnd.randint(0, 30), rnd.randint(0, 30), {})
+            items = list(r.pois.values())
+            best = None
+            for i in range(len(items)):
+                for j in range(i+1, len(items)):
+                    p1, p2 = items[i], items[j]
+                    d = distance((p1.x,p1.y), (p2.x,p2.y))
+                    key = (min(p1.id,p2.id), max(p1.id,p2.id))
+                    if best is None or d < best[2] - r.epsilon or (feq(d, best[2]) and key < best[3]):
+                        best = (p1, p2, d, key)
+            pair = r.closest_pair()
+            self.assertEqual((pair[0][0], pair[1][0]), (best[0].id, best[1].id))
+            self.assertEqual(pair[2], best[2])
+
+    def test_closest_pair_by_type(self):
+        r = POIRegistry()
+        r.add_poi_type("park", [])
+        r.add_poi_type("museum", [])
+        r.add_poi(1, "P1", "park", 0, 0, {})
+        r.add_poi(2, "P2", "park", 1, 0, {})
+        r.add_poi(3, "M1", "museum", 10, 10, {})
+        r.add_poi(4, "M2", "museum", 13, 14, {})
+        pair = r.closest_pair("museum")
+        self.assertEqual((pair[0][0], pair[1][0], pair[2]), (3, 4, 5.0))
+        r.delete_poi(4)
+        self.assertIsNone(r.closest_pair("museum"))
+        with self.assertRaises(Exception):
+            r.closest_pair("zoo")
+
     def test_within_and_k_closest(self):
         r = POIRegistry()
         r.add_poi_type("t", [])
@@ -0,0 +1,53 @@
+import random
+import unittest
+from poi_system import POIRegistry, ParallelExecutor
+
+class TestParallelExecutor(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(11)
+        self.r = POIRegistry()
+        self.r.add_poi_type("a", [])
+        self.r.add_poi_type("b", [])
+        for i in rnd.sample(range(1, 10000), 800):
+            self.r.add_poi(i, f"P{i}", rnd.choice("ab"), rnd.randint(0, 999), rnd.randint(0, 999), {})
+        for v in range(1, 60):
+            self.r.add_visitor(v * 7, f"V{v}", "X")
+        pids = list(self.r.pois)
+        for _ in range(500):
+            self.r.add_visit(rnd.randint(1, 59) * 7, rnd.choice(pids), "01/01/2024")
+        self.centers = [(rnd.randint(0, 999), rnd.randint(0, 999)) for _ in range(50)]
+        self.ex = ParallelExecutor(self.r, workers=3)
+        self.addCleanup(self.ex.close)
+
+    def check(self):
+        r, ex = self.r, self.ex
+        for t in (None, "a", "b"):
+            self.assertEqual(ex.closest_pair(t), r.closest_pair(t))
+        self.assertEqual(ex.batch_within_radius(self.centers, 60), r.batch_within_radius(self.centers, 60))
+        self.assertEqual(ex.batch_k_closest(self.centers, 7), r.batch_k_closest(self.centers, 7))
+        thresholds = [(1, 1), (3, 2), (0, 0), (50, 1)]
+        self.assertEqual(ex.coverage_fairness_batch(thresholds), r.coverage_fairness_batch(thresholds))
+
+    def test_matches_serial(self):
+        self.check()
+
+    def test_refresh_after_changes(self):
+        self.r.add_poi(20000, "twin", "a", 500, 500, {})
+        self.r.add_poi(20001, "twin", "a", 500, 500, {})
+        self.ex.refresh()
+        self.check()
+        self.assertEqual(self.ex.closest_pair()[2], 0.0)
+
+    def test_small_inputs(self):
+        r = POIRegistry()
+        r.add_poi_type("t", [])
+        with ParallelExecutor(r, workers=2) as ex:
+            self.assertIsNone(ex.closest_pair())
+            self.assertEqual(ex.coverage_fairness_batch([(0, 0)]), [[]])
+            r.add_poi(1, "A", "t", 0, 0, {})
+            r.add_poi(2, "B", "t", 999, 999, {})
+            ex.refresh()
+            self.assertEqual(ex.closest_pair(), r.closest_pair())
+
+if __name__ == "__main__":
+    unittest.main()
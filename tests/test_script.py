@@ -0,0 +1,62 @@
+import io
+import json
+import unittest
+from poi_system import POIRegistry
+from poi_system.ops import execute, run_script
+
+SCRIPT = [
+    {"op": 2, "name": "t", "attributes": ["a"]},
+    {"op": 8, "id": 1, "name": "A", "type": "t", "x": 0, "y": 0, "attributes": {"a": 1}},
+    {"op": 8, "id": 2, "name": "B", "type": "t", "x": 3, "y": 4},
+    {"op": "add_poi", "id": 3, "name": "C", "type": "t", "x": 10, "y": 0},
+    {"op": 15, "x": 0, "y": 0, "r": 5, "seq": "q1"},
+    {"op": 16, "c0": [9, 0], "k": 2},
+    {"op": 15, "x": 2000, "y": 0, "r": 5},
+    {"op": 13},
+    {"op": 15, "x": 0, "y": 0, "r": 5},
+    {"op": 9, "id": 2},
+    {"op": 15, "x": 0, "y": 0, "r": 5},
+    {"op": 10, "id": 1, "name": "V", "nationality": "X"},
+    {"op": 11, "visitor_id": 1, "poi_id": 1, "date": "01/03/2024"},
+    {"op": "21", "k": 1, "date_to": "31/12/2024"},
+    {"op": 99},
+    {"op": 16, "x": 0},
+    {"op": 16, "x": 0, "y": 0, "k": [1]},
+    {"op": 16, "x": 0, "y": 0, "k": 1},
+]
+
+class TestScript(unittest.TestCase):
+    def test_results_match_individual_calls(self):
+        r = POIRegistry()
+        responses = execute(r, SCRIPT)
+        self.assertEqual(len(responses), len(SCRIPT))
+        self.assertEqual(responses[4]["seq"], "q1")
+        self.assertEqual([row[0] for row in responses[4]["result"]], [1, 2])
+        self.assertEqual([row[0] for row in responses[5]["result"]], [3, 2])
+        self.assertIn("error", responses[6])
+        self.assertEqual(responses[8]["result"], responses[4]["result"])
+        self.assertEqual([row[0] for row in responses[10]["result"]], [1])
+        self.assertEqual(responses[13]["result"], [(1, "V", 1)])
+        self.assertIn("Unknown op", responses[14]["error"])
+        self.assertIn("Missing field", responses[15]["error"])
+        self.assertIn("TypeError", responses[16]["error"])
+        self.assertEqual([row[0] for row in responses[17]["result"]], [1])
+
+        # one request at a time nothing is grouped: same answers
+        fresh = POIRegistry()
+        self.assertEqual([execute(fresh, [req])[0] for req in SCRIPT], responses)
+
+    def test_run_script_writes_json_lines(self):
+        r = POIRegistry()
+        src = io.StringIO("\n".join(json.dumps(req) for req in SCRIPT[:5]) + "\nnot json\n\n5\nnull\n")
+        out = io.StringIO()
+        failed = run_script(r, src, out, chunk_size=2)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(lines), 8)
+        self.assertEqual(failed, 3)
+        self.assertIn("Invalid JSON", lines[5]["error"])
+        self.assertEqual(lines[6:], [{"op": None, "error": "Request must be a JSON object."}] * 2)
+        self.assertEqual(lines[4]["result"][1], [2, "B", [3, 4], "t", 5.0])
+
+if __name__ == "__main__":
+    unittest.main()
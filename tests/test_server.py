@@ -0,0 +1,80 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+from poi_system import POIRegistry, ops
+from poi_system.server import POIServer
+
+def registry():
+    r = POIRegistry()
+    r.add_poi_type("t", ["a"])
+    for i in range(1, 60):
+        r.add_poi(i, f"P{i}", "t", (i * 37) % 100, (i * 11) % 100, {})
+    r.add_visitor(1, "V", "X")
+    r.add_visit(1, 5, "01/03/2024")
+    return r
+
+async def ask(address, requests):
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write("".join(json.dumps(req) + "\n" for req in requests).encode())
+    await writer.drain()
+    out = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    return out
+
+class TestServer(unittest.TestCase):
+    def test_concurrent_clients_are_batched(self):
+        r = registry()
+        expected = json.loads(json.dumps([r.pois_within_radius((x, 50), 20) for x in range(0, 100, 5)]))
+
+        async def scenario():
+            server = await POIServer(r, window=0.05).start()
+            try:
+                clients = [ask(server.address, [{"op": 15, "x": x, "y": 50, "r": 20, "seq": x} for x in range(c, 100, 10)])
+                           for c in (0, 5)]
+                clients.append(ask(server.address, [{"op": 13}, {"op": 22, "k": 1}, {"op": 9, "id": 1}, "junk"]))
+                return await asyncio.gather(*clients), server.batcher
+            finally:
+                await server.close()
+
+        (a, b, other), batcher = asyncio.run(scenario())
+        self.assertEqual([resp["seq"] for resp in a], list(range(0, 100, 10)))
+        self.assertEqual([resp["result"] for resp in a], expected[0::2])
+        self.assertEqual([resp["result"] for resp in b], expected[1::2])
+        self.assertEqual(other[0]["result"], json.loads(json.dumps(r.closest_pair())))
+        self.assertEqual(other[1]["result"], [[5, "P5", 1]])
+        self.assertIn("read-only", other[2]["error"])
+        self.assertIn("error", other[3])
+        self.assertIn(1, r.pois)
+        self.assertEqual(batcher.requests, 23)
+        self.assertLess(batcher.batches, 4)
+
+    def test_failed_batch_does_not_stop_the_dispatcher(self):
+        r = registry()
+        calls = []
+
+        def execute(registry, requests):
+            calls.append(requests)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return ops.execute(registry, requests)
+
+        async def scenario():
+            server = await POIServer(r, window=0.01).start()
+            try:
+                # a dead dispatcher would never answer
+                first = await asyncio.wait_for(ask(server.address, [{"op": 16, "x": 1, "y": 1, "k": [1]}]), 5)
+                second = await asyncio.wait_for(ask(server.address, [{"op": 16, "x": 1, "y": 1, "k": [1]},
+                                                                     {"op": 16, "x": 1, "y": 1, "k": 1}]), 5)
+                return first, second
+            finally:
+                await server.close()
+
+        with mock.patch("poi_system.server.execute", execute):
+            first, second = asyncio.run(scenario())
+        self.assertEqual(first, [{"op": None, "error": "RuntimeError: boom"}])
+        self.assertIn("error", second[0])
+        self.assertEqual(second[1]["result"], json.loads(json.dumps(r.k_closest((1, 1), 1))))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import random
+import unittest
+from poi_system import POIRegistry, POIError
+from poi_system.sharding import ShardedRegistry
+
+def populate(r, rnd, n):
+    for i in range(1, n + 1):
+        # clustered near tile borders as well as spread out
+        x = rnd.choice([rnd.randrange(1000), rnd.randrange(490, 510)])
+        y = rnd.choice([rnd.randrange(1000), rnd.randrange(330, 340)])
+        r.add_poi(i, f"P{i % 7}", rnd.choice(["a", "b"]), x, y, {"v": i})
+
+class TestShardedRegistry(unittest.TestCase):
+    def setUp(self):
+        self.single = POIRegistry()
+        self.sharded = ShardedRegistry((2, 3))
+        self.addCleanup(self.sharded.close)
+        for r in (self.single, self.sharded):
+            r.add_poi_type("a", ["v"])
+            r.add_poi_type("b", ["v", "w"])
+            populate(r, random.Random(5), 400)
+            for i in range(1, 400, 9):
+                r.delete_poi(i)
+
+    def test_queries_match_single_registry(self):
+        s, sh = self.single, self.sharded
+        rnd = random.Random(1)
+        for _ in range(40):
+            c0 = (rnd.randrange(1000), rnd.randrange(1000))
+            r = rnd.choice([0, 5, 17.5, 40, 300])
+            self.assertEqual(sh.pois_within_radius(c0, r), s.pois_within_radius(c0, r))
+            self.assertEqual(sh.at_exact_radius(c0, r), s.at_exact_radius(c0, r))
+            k = rnd.choice([0, 1, 7, 50])
+            self.assertEqual(sh.k_closest(c0, k), s.k_closest(c0, k))
+        self.assertEqual(sh.k_closest((500.5, 336.25), 20), s.k_closest((500.5, 336.25), 20))
+        for t in (None, "a", "b"):
+            self.assertEqual(sh.closest_pair(t), s.closest_pair(t))
+        self.assertEqual(sh.count_pois_per_type(), s.count_pois_per_type())
+        self.assertEqual(sh.list_pois_by_type("b"), s.list_pois_by_type("b"))
+        self.assertEqual(len(sh), len(s.pois))
+
+    def test_mutations_and_invariants(self):
+        s, sh = self.single, self.sharded
+        # id 10 was deleted from one tile and cannot come back in another
+        for r in (s, sh):
+            with self.assertRaises(POIError):
+                r.add_poi(10, "again", "a", 990, 990)
+        rows = [(1000, "n", "a", 5, 5, {}), (1001, "n", "nope", 600, 5, {}), (10, "n", "a", 5, 5, {}),
+                (1002, "n", "a", 5000, 5, {}), (1003, "n", "b", 999, 999, {"w": 1})]
+        errors = [[(i, str(e)) for i, e in r.bulk_add_pois(rows)] for r in (s, sh)]
+        self.assertEqual(errors[0], errors[1])
+        with self.assertRaises(POIError):
+            sh.delete_poi_type("a")
+        sh.rename_type("b", "c")
+        s.rename_type("b", "c")
+        sh.rename_attribute("c", "w", "z")
+        s.rename_attribute("c", "w", "z")
+        self.assertEqual(sh.list_pois_by_type("c"), s.list_pois_by_type("c"))
+        self.assertEqual(sh.closest_pair("c"), s.closest_pair("c"))
+        with self.assertRaises(POIError):
+            sh.k_closest((1000, 0), 1)
+
+    def test_from_registry(self):
+        with ShardedRegistry.from_registry(self.single, (3, 1)) as sh:
+            self.assertEqual(sh.closest_pair(), self.single.closest_pair())
+            self.assertEqual(sh.k_closest((250, 250), 30), self.single.k_closest((250, 250), 30))
+            with self.assertRaises(POIError):
+                sh.add_poi(1, "x", "a", 1, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from poi_system import POIRegistry
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        r = POIRegistry(epsilon=1e-5)
+        r.add_poi_type("park", ["size", "playground"])
+        r.add_poi_type("museum", ["theme"])
+        r.add_poi(5, "Green", "park", 10, 10, {"size": "small", "playground": True})
+        r.add_poi(2, "Blue", "museum", 20, 20, {"theme": "art"})
+        r.add_poi(9, "Riverside", "park", 12, 10, {})
+        r.add_poi(7, "Gone", "museum", 999, 0, {})
+        r.add_visitor(1, "Amal", "UAE")
+        r.add_visitor(3, "Omar", "Jordan")
+        r.add_visit(3, 7, "01/06/2024", 9)
+        r.add_visit(1, 5, "1/6/2024")
+        r.add_visit(1, 2, "02/06/2024", 4)
+        r.add_visit(3, 5, "03/06/2024")
+        r.delete_poi(7)
+        r.rename_type("museum", "gallery")
+        self.r = r
+
+    def queries(self, r):
+        return [
+            list(r.poi_types.items()), [(p.id, p.name, p.type_name, p.x, p.y, p.attributes) for p in r.pois.values()],
+            sorted(r.used_poi_ids), r.epsilon, r.closest_pair(), r.count_pois_per_type(),
+            r.k_closest((0, 0), 10), r.visits_for_visitor(1), r.visits_for_visitor(3),
+            r.number_of_visitors_per_poi(), r.number_of_pois_per_visitor(),
+            r.top_k_visitors_by_poi_count(5), r.top_k_pois_by_visitor_count(5), r.coverage_fairness(0, 0),
+        ]
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "reg.snap")
+            self.r.save_snapshot(path)
+            loaded = POIRegistry.load_snapshot(path)
+        self.assertEqual(self.queries(loaded), self.queries(self.r))
+        with self.assertRaises(Exception):
+            loaded.add_poi(7, "Again", "park", 1, 1, {})  # reserved id survives
+
+    def test_visits_load_in_place(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "reg.snap")
+            self.r.save_snapshot(path)
+            loaded = POIRegistry.load_snapshot(path)
+            os.remove(path)
+        self.assertIsInstance(loaded._visits.poi_ids, memoryview)
+        for r in (self.r, loaded):
+            r.add_visit(1, 9, "04/06/2024", 2)
+            r.delete_poi(5)
+            r.bulk_add_visits([(3, 9, "05/06/2024", None), (3, 2, "06/06/2024", 1)])
+        self.assertNotIsInstance(loaded._visits.poi_ids, memoryview)
+        self.assertEqual(self.queries(loaded), self.queries(self.r))
+        self.assertEqual(loaded.number_of_pois_per_visitor("02/06/2024", "05/06/2024"),
+                         self.r.number_of_pois_per_visitor("02/06/2024", "05/06/2024"))
+
+    def test_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "cfg.json")
+            with open(path, "w") as f:
+                f.write('{"poi_types": []}')
+            with self.assertRaises(Exception):
+                POIRegistry.load_snapshot(path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import random
+import unittest
+from poi_system import POIRegistry
+from poi_system.utils import distance, feq, fle
+
+def brute_rows(r, c0, pred):
+    out = []
+    for p in r.pois.values():
+        d = distance(c0, (p.x, p.y))
+        if pred(d):
+            out.append((p.id, p.name, (p.x, p.y), p.type_name, d))
+    out.sort(key=lambda x: (x[4], x[0], x[1]))
+    return out
+
+class TestGridIndex(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(7)
+        self.r = POIRegistry()
+        self.r.add_poi_type("t", [])
+        for i in range(1, 801):
+            self.r.add_poi(i, f"P{i}", "t", rnd.randint(0, 999), rnd.randint(0, 999), {})
+        for i in range(1, 801, 5):
+            self.r.delete_poi(i)
+        self.centers = [(0, 0), (999, 999), (500, 500), (13, 987), (40, 40)]
+
+    def test_within_radius_matches_scan(self):
+        for c0 in self.centers:
+            for rad in (0.0, 5.0, 20.0, 37.5, 150.0, 2000.0, float("inf")):
+                expected = brute_rows(self.r, c0, lambda d: fle(d, rad))
+                self.assertEqual(self.r.pois_within_radius(c0, rad), expected)
+
+    def test_exact_radius_matches_scan(self):
+        for c0 in self.centers:
+            for p in list(self.r.pois.values())[:20]:
+                rad = distance(c0, (p.x, p.y))
+                expected = brute_rows(self.r, c0, lambda d: feq(d, rad))
+                self.assertEqual(self.r.at_exact_radius(c0, rad), expected)
+
+    def test_integer_predicates_match_float_predicates(self):
+        wide = POIRegistry(epsilon=0.75)
+        wide.add_poi_type("t", [])
+        for p in self.r.pois.values():
+            wide.add_poi(p.id, p.name, "t", p.x, p.y, {})
+        for reg in (self.r, wide):
+            eps = reg.epsilon
+            for c0 in self.centers + [(250.5, 10.25)]:
+                for rad in (-1.0, 0, 1, 5, 25, 26.5, 100, 707, 1500, float("nan")):
+                    self.assertEqual(reg.pois_within_radius(c0, rad),
+                                     brute_rows(reg, c0, lambda d: fle(d, rad, eps)))
+                    self.assertEqual(reg.at_exact_radius(c0, rad),
+                                     brute_rows(reg, c0, lambda d: feq(d, rad, eps)))
+
+    def test_k_closest_matches_full_sort(self):
+        for c0 in self.centers:
+            everything = brute_rows(self.r, c0, lambda d: True)
+            for k in (0, 1, 3, 25, 200, len(everything) + 5):
+                self.assertEqual(self.r.k_closest(c0, k), everything[:k])
+
+    def test_k_closest_ties_across_cells(self):
+        r = POIRegistry()
+        r.add_poi_type("t", [])
+        # four points at distance 10 from (20,20), in four different cells
+        for pid, (x, y) in zip((9, 4, 7, 1), ((10, 20), (30, 20), (20, 10), (20, 30))):
+            r.add_poi(pid, f"P{pid}", "t", x, y, {})
+        self.assertEqual([row[0] for row in r.k_closest((20, 20), 3)], [1, 4, 7])
+
+    def test_deleted_poi_leaves_index(self):
+        self.r.add_poi_type("u", [])
+        self.r.add_poi(5000, "X", "u", 700, 700, {})
+        self.assertIn(5000, [row[0] for row in self.r.pois_within_radius((700, 700), 0)])
+        self.r.delete_poi(5000)
+        self.assertNotIn(5000, [row[0] for row in self.r.pois_within_radius((700, 700), 0)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,5 +19,26 @@ class TestTypeAndAttributes(unittest.TestCase):
         self.assertIn("topic", r.pois[1].attributes)
         self.assertNotIn("theme", r.pois[1].attributes)
 
+    def test_type_index_follows_mutations(self):
+        r = POIRegistry()
+        r.add_poi_type("park", ["size"])
+        r.add_poi_type("museum", [])
+        r.add_poi(1, "P1", "park", 1, 1, {})
+        r.add_poi(2, "P2", "park", 2, 2, {})
+        r.add_poi(3, "M", "museum", 3, 3, {})
+        r.delete_poi(1)
+        r.rename_type("park", "garden")
+        self.assertEqual(r.count_pois_per_type(), [("garden", 1), ("museum", 1)])
+        self.assertEqual([p[0] for p in r.list_pois_by_type("garden")], [2])
+        self.assertEqual(r.pois[2].type_name, "garden")
+        r.add_attribute("garden", "shade")
+        self.assertEqual(r.pois[2].attributes, {"size": None, "shade": None})
+        self.assertNotIn("shade", r.pois[3].attributes)
+        with self.assertRaises(Exception):
+            r.delete_poi_type("garden")
+        r.delete_poi(2)
+        r.delete_poi_type("garden")
+        self.assertEqual(r.count_pois_per_type(), [("museum", 1)])
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,28 @@
+import datetime
+import time
+import random
 import unittest
-from poi_system import POIRegistry
+from collections import defaultdict
+from poi_system import POIRegistry, POIError
+
+def rebuild_stats(r, keep=lambda visit: True):
+    # from-scratch reference over the raw visit lists
+    pois, visitors, types = defaultdict(set), defaultdict(set), defaultdict(set)
+    for vid, visits in r.visits_by_visitor.items():
+        for v in filter(keep, visits):
+            pois[vid].add(v.poi_id)
+            visitors[v.poi_id].add(vid)
+            if v.poi_id in r.pois:
+                types[vid].add(r.pois[v.poi_id].type_name)
+    per_poi = sorted((pid, len(visitors[pid])) for pid in r.pois)
+    per_visitor = sorted((vid, len(pois[vid])) for vid in r.visitors)
+    top_visitors = sorted(((vid, v.name, len(pois[vid])) for vid, v in r.visitors.items()),
+                          key=lambda x: (-x[2], x[0], x[1]))
+    top_pois = sorted(((pid, p.name, len(visitors[pid])) for pid, p in r.pois.items()),
+                      key=lambda x: (-x[2], x[0], x[1]))
+    fair = sorted((vid, v.name, v.nationality, len(pois[vid]), len(types[vid]))
+                  for vid, v in r.visitors.items())
+    return per_poi, per_visitor, top_visitors, top_pois, fair
 
 class TestVisitorStats(unittest.TestCase):
     def setUp(self):
@@ -30,5 +53,112 @@ class TestVisitorStats(unittest.TestCase):
         top_pois = self.r.top_k_pois_by_visitor_count(2)
         self.assertEqual(top_pois[0][0], 1) 
 
+    def test_visits_are_column_views(self):
+        self.r.add_visit(2, 2, "3/1/2024")
+        visits = self.r.visits_by_visitor[2]
+        self.assertEqual([(v.poi_id, v.date, v.rating) for v in visits],
+                         [(1, "02/01/2024", 8), (2, "3/1/2024", None)])
+        self.assertEqual(sorted(self.r.visits_by_visitor), [1, 2])
+        self.assertEqual(self.r.visits_for_visitor(2), [(1, "P1", "02/01/2024"), (2, "M1", "3/1/2024")])
+        self.assertFalse(hasattr(self.r.pois[1], "__dict__"))
+        with self.assertRaises(ValueError):
+            self.r.add_visit(2, 2, "31/02/2024")
+
+    def test_ids_fit_the_columns(self):
+        with self.assertRaises(POIError):
+            self.r.add_poi(2**64, "Big", "park", 1, 1, {})
+        with self.assertRaises(POIError):
+            self.r.add_visitor(-2**63 - 1, "Big", "AE")
+        self.r.add_poi("x", "Odd", "park", 1, 1, {})  # not stored in a column until visited
+        with self.assertRaises(TypeError):
+            self.r.add_visit(2, "x", "03/01/2024")
+        self.assertEqual(self.r.visits_for_visitor(2), [(1, "P1", "02/01/2024")])
+        self.assertEqual(len(self.r.visits_by_visitor[1]), 2)
+
+    def test_aggregates_match_rebuild(self):
+        rnd = random.Random(11)
+        r = POIRegistry()
+        for t in ("park", "museum", "beach"):
+            r.add_poi_type(t, [])
+        for pid in range(1, 41):
+            r.add_poi(pid, f"P{pid}", rnd.choice(["park", "museum", "beach"]), pid, pid, {})
+        for vid in range(1, 16):
+            r.add_visitor(vid, f"V{vid}", "AE")
+        for step in range(300):
+            live = list(r.pois)
+            r.add_visit(rnd.randint(1, 15), rnd.choice(live), "01/01/2024")
+            if step % 40 == 39:
+                r.delete_poi(rnd.choice(live))
+            if step == 150:
+                r.rename_type("museum", "gallery")
+        per_poi, per_visitor, top_visitors, top_pois, fair = rebuild_stats(r)
+        self.assertEqual(r.number_of_visitors_per_poi(), per_poi)
+        self.assertEqual(r.number_of_pois_per_visitor(), per_visitor)
+        for k in (-1, 0, 1, 7, 100):
+            self.assertEqual(r.top_k_visitors_by_poi_count(k), top_visitors[:max(0, k)])
+            self.assertEqual(r.top_k_pois_by_visitor_count(k), top_pois[:max(0, k)])
+        grid = [(0, 0), (5, 2), (10, 3), (5, 2), (99, 0)]
+        batch = r.coverage_fairness_batch(grid)
+        for (m, t), rows in zip(grid, batch):
+            expected = [row for row in fair if row[3] >= m and row[4] >= t]
+            self.assertEqual(r.coverage_fairness(m, t), expected)
+            self.assertEqual(rows, expected)
+
+    def test_date_ranges_match_rebuild(self):
+        rnd = random.Random(17)
+        r = POIRegistry()
+        for t in ("park", "museum"):
+            r.add_poi_type(t, [])
+        for pid in range(1, 31):
+            r.add_poi(pid, f"P{pid}", rnd.choice(["park", "museum"]), pid, pid, {})
+        for vid in range(1, 13):
+            r.add_visitor(vid, f"V{vid}", "AE")
+        start = datetime.date(2024, 2, 20)
+        for step in range(250):
+            day = start + datetime.timedelta(days=rnd.randint(0, 60))
+            r.add_visit(rnd.randint(1, 10), rnd.choice(list(r.pois)), f"{day.day}/{day.month:02d}/{day.year}")
+            if step % 50 == 49:
+                r.delete_poi(rnd.choice(list(r.pois)))
+
+        def day_of(v):
+            return datetime.datetime.strptime(v.date, "%d/%m/%Y").date()
+
+        for lo, hi in (("01/03/2024", "31/03/2024"), (None, "29/02/2024"), ("15/04/2024", None), ("01/01/2023", "02/01/2023")):
+            first = datetime.date(1, 1, 1) if lo is None else datetime.datetime.strptime(lo, "%d/%m/%Y").date()
+            last = datetime.date(9999, 1, 1) if hi is None else datetime.datetime.strptime(hi, "%d/%m/%Y").date()
+            per_poi, per_visitor, top_visitors, top_pois, fair = rebuild_stats(r, lambda v: first <= day_of(v) <= last)
+            self.assertEqual(r.number_of_visitors_per_poi(lo, hi), per_poi)
+            self.assertEqual(r.number_of_pois_per_visitor(lo, hi), per_visitor)
+            for k in (0, 3, 100):
+                self.assertEqual(r.top_k_visitors_by_poi_count(k, lo, hi), top_visitors[:k])
+                self.assertEqual(r.top_k_pois_by_visitor_count(k, lo, hi), top_pois[:k])
+            for m, t in ((0, 0), (1, 1), (3, 2)):
+                self.assertEqual(r.coverage_fairness(m, t, lo, hi), [row for row in fair if row[3] >= m and row[4] >= t])
+        self.assertEqual(r.number_of_visitors_per_poi(), r.number_of_visitors_per_poi("01/01/2000", None))
+        with self.assertRaises(POIError):
+            r.top_k_visitors_by_poi_count(3, "2024-03-01")
+
+    def test_visit_cost_does_not_grow_with_population(self):
+        # idle ids are not bucketed, so a first visit does not move them around
+        def per_visit(n):
+            r = POIRegistry()
+            r.add_poi_type("park", [])
+            r.bulk_add_pois((i, "P", "park", i % 1000, i // 1000 % 1000, {}) for i in range(1, n + 1))
+            for vid in range(1, n + 1):
+                r.add_visitor(vid, "V", "AE")
+            t0 = time.perf_counter()
+            for i in range(1, 2001):
+                r.add_visit(i * 7 % n + 1, i * 13 % n + 1, "01/01/2024")
+            return (time.perf_counter() - t0) / 2000, r
+
+        small, _ = per_visit(2000)
+        large, r = per_visit(200000)
+        self.assertLess(large, small * 4 + 2e-5)
+        self.assertEqual(sum(len(b) for b in r._visitor_board.buckets.values()), 2000)
+        top = r.top_k_pois_by_visitor_count(2005)
+        self.assertEqual([c for _, _, c in top].count(1), 2000)
+        visited = {i * 13 % 200000 + 1 for i in range(1, 2001)}
+        self.assertEqual([pid for pid, _, c in top if c == 0], [pid for pid in range(1, 10) if pid not in visited][:5])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+import unittest
+from poi_system import POIRegistry
+from poi_system.wal import LOG_FILE, SNAPSHOT_FILE, OperationLog, read_log
+
+def state(r):
+    return (list(r.poi_types.items()), [(p.id, p.name, p.type_name, p.x, p.y, p.attributes) for p in r.pois.values()],
+            sorted(r.used_poi_ids), r.number_of_pois_per_visitor(), r.coverage_fairness(0, 0),
+            r.visits_for_visitor(1))
+
+class TestOperationLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def mutate(self, r):
+        r.add_poi_type("park", ["size"])
+        r.add_poi(1, "A", "park", 1, 1, {"size": "s"})
+        r.bulk_add_pois([(2, "B", "park", 2, 2, {}), (2, "dup", "park", 3, 3, {})])
+        r.add_visitor(1, "V", "AE")
+        r.add_visit(1, 1, "01/01/2024", 3)
+        r.bulk_add_visits([(1, 2, "02/01/2024", None), (1, 99, "02/01/2024", None)])
+        r.delete_poi(2)
+        r.rename_attribute("park", "size", "area")
+        r.rename_type("park", "garden")
+
+    def test_recover_from_log_only(self):
+        r = POIRegistry.open(self.dir, sync_interval=0)
+        self.mutate(r)
+        r.close()
+        self.assertFalse(os.path.exists(os.path.join(self.dir, SNAPSHOT_FILE)))
+        again = POIRegistry.open(self.dir)
+        self.assertEqual(state(again), state(r))
+        with self.assertRaises(Exception):
+            again.add_poi(2, "reuse", "garden", 5, 5, {})
+        again.close()
+
+    def test_checkpoint_and_tail_replay(self):
+        r = POIRegistry.open(self.dir, sync_interval=0, compact_every=4)
+        self.mutate(r)  # crosses the compaction threshold twice
+        r.add_poi(3, "C", "garden", 9, 9, {})
+        r.close()
+        self.assertTrue(os.path.exists(os.path.join(self.dir, SNAPSHOT_FILE)))
+        again = POIRegistry.open(self.dir)
+        self.assertEqual(state(again), state(r))
+        again.close()
+
+    def test_torn_tail_is_dropped(self):
+        r = POIRegistry.open(self.dir, sync_interval=0)
+        self.mutate(r)
+        r.close()
+        with open(os.path.join(self.dir, LOG_FILE), "ab") as f:
+            f.write(b"\x40\x00\x00\x00garbage")  # half-written record
+        again = POIRegistry.open(self.dir, sync_interval=0)
+        self.assertEqual(state(again), state(r))
+        again.add_poi(7, "D", "garden", 7, 7, {})
+        again.close()
+        third = POIRegistry.open(self.dir)
+        self.assertIn(7, third.pois)
+        third.close()
+
+    def test_appends_are_durable_when_they_return(self):
+        r = POIRegistry.open(self.dir)
+        self.mutate(r)
+        logged = [op for _, _, op, _ in read_log(os.path.join(self.dir, LOG_FILE))]
+        self.assertEqual(logged[-2:], ["rename_attribute", "rename_type"])
+        r.close()
+
+        log = OperationLog(self.dir, lsn=len(logged))
+        threads = [threading.Thread(target=lambda: [log.append("add_visitor", (i, "V", "AE")) for i in range(50)])
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(log.synced, len(logged) + 200)
+        lsns = [lsn for _, lsn, _, _ in read_log(log.path)]
+        self.assertEqual(lsns, list(range(1, len(logged) + 201)))
+        log.close()
+
+    def test_failed_write_is_cut_before_the_retry(self):
+        log = OperationLog(self.dir, synchronous=False, sync_interval=0)
+        log.append("add_visitor", (1, "V", "AE"))
+        log.sync()
+        real = log._file
+
+        class Torn:
+            def write(self, data):
+                real.write(data[:len(data) // 2])
+                real.flush()
+                raise OSError("disk full")
+
+            def close(self):
+                real.close()
+
+        log._file = Torn()
+        log.append("add_visitor", (2, "W", "AE"))
+        with self.assertRaises(OSError):
+            log.sync()
+        log.append("add_visitor", (3, "X", "AE"))
+        log.close()
+        self.assertEqual([args[0] for _, _, _, args in read_log(log.path)], [1, 2, 3])
+
+    def test_bulk_rows_count_toward_compaction(self):
+        r = POIRegistry.open(self.dir, compact_every=50)
+        r.add_poi_type("t")
+        r.bulk_add_pois([(i, "P", "t", i, i) for i in range(60)])
+        self.assertTrue(os.path.exists(os.path.join(self.dir, SNAPSHOT_FILE)))
+        r.close()
+
+if __name__ == "__main__":
+    unittest.main()